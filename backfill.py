@@ -0,0 +1,328 @@
+"""Догрузка статусов домашек за прошедший период, например после простоя.
+
+Диапазон from_date разбивается на окна. Аккаунты запрашиваются
+параллельно в рамках общего бюджета запросов к API, по одному запросу
+с начала первого необработанного окна: API отдаёт всё, что изменилось
+после from_date, поэтому ответ раскладывается по окнам на клиенте.
+Домашки окон объединяются без повторов и рассылаются по порядку окон.
+Обработанные окна отмечаются в отдельной таблице хранилища
+состояния (StateStore.mark_backfilled), поэтому прерванная
+догрузка при повторном запуске продолжается с первого необработанного
+окна. Сообщения отправляются, как в engine.py: через outbox и очередь
+доставки с лимитами Telegram; перед выходом outbox досылается.
+Запуск: python backfill.py --since 2024-01-01T00:00:00Z
+"""
+import argparse
+import asyncio
+import bisect
+import logging
+import math
+import threading
+import time
+
+from telebot import TeleBot
+
+import engine
+import exceptions as EX
+import homework
+import lag
+import logging_setup
+import outbox as OB
+import retry_policy
+import storage
+
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 24 * 3600
+CONCURRENCY = 8
+ATTEMPTS = 3
+BACKOFF_BASE = 1
+BACKOFF_MAX = 30
+DRAIN_TIMEOUT = 600
+
+
+def split_windows(start, end, size=WINDOW):
+    """Разбивает промежуток [start, end) на окна не длиннее size секунд."""
+    if size <= 0:
+        raise ValueError('Размер окна должен быть положительным')
+    windows = []
+    while start < end:
+        windows.append((start, min(start + size, end)))
+        start += size
+    return windows
+
+
+def retry_delay(error, attempts):
+    """Возвращает паузу догрузки перед попыткой номер attempts + 1.
+
+    В отличие от паузы опроса из retry_policy, она короткая: догрузку
+    запускают вручную, и ждать повтора по 10 минут незачем. Пауза
+    Retry-After учитывается, но не дольше BACKOFF_MAX.
+    """
+    delay = BACKOFF_BASE * 2 ** max(attempts - 1, 0)
+    delay = max(delay, getattr(error, 'retry_after', None) or 0)
+    return min(delay, BACKOFF_MAX)
+
+
+def split_by_windows(homeworks, windows):
+    """Раскладывает домашки по упорядоченным окнам windows.
+
+    Возвращает список списков домашек, по одному на окно. Домашки,
+    проверенные вне окон, отбрасываются, домашки без даты попадают
+    в первое окно.
+    """
+    starts = [window[0] for window in windows]
+    batches = [[] for _ in windows]
+    for homework_data in homeworks:
+        updated = None
+        if isinstance(homework_data, dict):
+            updated = lag.parse_date(homework_data.get('date_updated'))
+        if updated is None:
+            batches[0].append(homework_data)
+            continue
+        position = bisect.bisect_right(starts, updated) - 1
+        if position >= 0 and updated < windows[position][1]:
+            batches[position].append(homework_data)
+    return batches
+
+
+def merge_homeworks(homeworks, seen):
+    """Возвращает домашки без повторов по id и date_updated.
+
+    Ключи уже встреченных домашек хранятся в seen, домашки без id
+    не объединяются. Результат упорядочен по date_updated.
+    """
+    merged = []
+    for homework_data in homeworks:
+        if isinstance(homework_data, dict) and 'id' in homework_data:
+            key = (
+                str(homework_data['id']), homework_data.get('date_updated')
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+        merged.append(homework_data)
+    return sorted(
+        merged,
+        key=lambda item: lag.parse_date(
+            item.get('date_updated') if isinstance(item, dict) else None
+        ) or 0
+    )
+
+
+def request_homeworks(token, from_date):
+    """Запрашивает ответ API для токена token с from_date.
+
+    Как и в engine.py, при API_STREAM_JSON ответ разбирается потоково.
+    """
+    return homework.request_statuses(from_date, homework.make_headers(token))
+
+
+class Backfill(engine.PollingEngine):
+    """Догрузка статусов домашек аккаунтов accounts за [start, end).
+
+    Ответы берутся из fetch(token, from_date), по умолчанию из API через
+    общий клиент homework. Одновременно выполняется не больше
+    concurrency запросов, по одному на аккаунт; временные ошибки
+    повторяются до attempts раз с короткими паузами retry_delay, а
+    ошибки, которые retry_policy не повторяет, сразу завершают запрос
+    аккаунта. Аккаунт,
+    запрос которого не удался, не рассылается: следующий запуск начнёт
+    с его первого необработанного окна. Доставка, outbox и его повторы
+    - те же, что у PollingEngine; недоставленные сообщения досылаются
+    не дольше drain_timeout секунд.
+    """
+
+    def __init__(self, bot, store, accounts, start, end, window=WINDOW,
+                 concurrency=CONCURRENCY, attempts=ATTEMPTS, fetch=None,
+                 sleep=time.sleep, outbound=None,
+                 drain_timeout=DRAIN_TIMEOUT):
+        super().__init__(
+            bot, accounts, concurrency, store=store, outbound=outbound
+        )
+        self.windows = split_windows(start, end, window)
+        self.attempts = attempts
+        self.fetch = fetch or request_homeworks
+        self.sleep = sleep
+        self.drain_timeout = drain_timeout
+        self.requests = 0
+        self.skipped = 0
+        self.delivered = 0
+        self.invalid = []
+        self.failed = set()
+        self._lock = threading.Lock()
+
+    def pending(self, key):
+        """Возвращает окна аккаунта, ещё не обработанные раньше."""
+        pending = []
+        for window in self.windows:
+            if not self.store.is_backfilled(key, *window):
+                pending.append(window)
+            else:
+                self.skipped += 1
+        return pending
+
+    def fetch_homeworks(self, account, from_date):
+        """Запрашивает домашки аккаунта, проверенные начиная с from_date."""
+        attempt = 0
+        while True:
+            attempt += 1
+            with self._lock:
+                self.requests += 1
+            try:
+                response = self.fetch(account.practicum_token, from_date)
+                return homework.check_response(response)
+            except Exception as error:
+                rule = retry_policy.rule_for(error)
+                if attempt >= self.attempts or rule.exhausted(attempt):
+                    raise
+                logger.warning(
+                    'Повтор запроса аккаунта %s после ошибки: %s',
+                    account.chat_id, error
+                )
+                self.sleep(retry_delay(error, attempt))
+
+    def _on_sent(self, message, future):
+        """Отмечает результат отправки и считает доставленные сообщения."""
+        super()._on_sent(message, future)
+        if not future.cancelled() and future.result():
+            self.delivered += 1
+
+    async def backfill_account(self, account):
+        """Запрашивает домашки аккаунта и рассылает их по окнам."""
+        key = storage.account_key(account.practicum_token)
+        pending = self.pending(key)
+        if not pending:
+            return
+        try:
+            homeworks = await self._call(
+                self.fetch_homeworks, account, pending[0][0]
+            )
+        except Exception as error:
+            logger.error(
+                'Не удалось догрузить аккаунт %s: %s', account.chat_id, error
+            )
+            self.failed.add(account)
+            return
+        seen = set()
+        batches = split_by_windows(homeworks, pending)
+        for window, batch in zip(pending, batches):
+            self.invalid.extend(await self._deliver(
+                account, key, merge_homeworks(batch, seen)
+            ))
+            self.store.mark_backfilled(key, *window)
+        self.store.flush()
+
+    def undelivered(self):
+        """Проверяет, остались ли в outbox недоставленные сообщения."""
+        return bool(self.store.due_outbox(math.inf, 1))
+
+    async def drain_outbox(self):
+        """Досылает сообщения из outbox, пока они не кончатся или не
+        выйдет drain_timeout.
+        """
+        deadline = time.monotonic() + self.drain_timeout
+        await self.outbound.join()
+        while self.undelivered() and time.monotonic() < deadline:
+            await asyncio.sleep(OB.POLL_INTERVAL)
+            await self.outbound.join()
+        if self.undelivered():
+            logger.warning(
+                'В outbox остались недоставленные сообщения, '
+                'их дошлёт бот при следующем запуске'
+            )
+
+    async def run(self):
+        """Выполняет догрузку и возвращает число доставленных сообщений.
+
+        Окна аккаунта рассылаются по порядку, и каждое отмечается
+        обработанным, как только его сообщения сохранены в outbox.
+        """
+        self._start()
+        try:
+            await asyncio.gather(
+                *(self.backfill_account(account) for account in self.accounts)
+            )
+            await self.drain_outbox()
+        finally:
+            await self._stop()
+        return self.delivered
+
+
+def parse_moment(value):
+    """Переводит unix-время или дату ISO 8601 в unix-время."""
+    if value.isdigit():
+        return int(value)
+    moment = lag.parse_date(value)
+    if moment is None:
+        raise argparse.ArgumentTypeError(f'Некорректная дата: "{value}"')
+    return int(moment)
+
+
+def load_accounts(path):
+    """Возвращает аккаунты из файла path или единственный аккаунт main()."""
+    if path:
+        return engine.load_accounts(path)
+    homework.check_tokens()
+    return [
+        engine.Account(homework.PRACTICUM_TOKEN, homework.TELEGRAM_CHAT_ID)
+    ]
+
+
+def main():
+    """Запускает догрузку по аргументам командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--since', type=parse_moment, required=True)
+    parser.add_argument('--until', type=parse_moment, default=None)
+    parser.add_argument('--window', type=int, default=WINDOW)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument(
+        '--drain-timeout', type=float, default=DRAIN_TIMEOUT
+    )
+    parser.add_argument(
+        '--accounts', default=None,
+        help='файл аккаунтов engine.py; по умолчанию аккаунт из окружения'
+    )
+    args = parser.parse_args()
+    if not homework.TELEGRAM_TOKEN:
+        raise EX.ErrorCheckTokens('Отсутствие переменной TELEGRAM_TOKEN')
+    accounts = load_accounts(args.accounts)
+    until = args.until if args.until is not None else int(time.time())
+    homework.configure_telegram_api()
+    bot = TeleBot(token=homework.TELEGRAM_TOKEN)
+    homework.configure_api_client(
+        pool_maxsize=max(args.concurrency, homework.API_POOL_SIZE)
+    )
+    store = storage.open_state_store(homework.STATE_STORE)
+    backfill = Backfill(
+        bot, store, accounts, args.since, until, args.window,
+        args.concurrency, drain_timeout=args.drain_timeout
+    )
+    try:
+        asyncio.run(engine.serve(backfill))
+    finally:
+        homework.get_api_client().close()
+        store.close()
+    print(f'Окон: {len(backfill.windows) * len(accounts)}, '
+          f'пропущено обработанных: {backfill.skipped}')
+    print(
+        f'Запросов: {backfill.requests}, '
+        f'статусов отправлено: {backfill.delivered}'
+    )
+    if backfill.invalid:
+        print(f'Пропущено домашек с неразобранным статусом: '
+              f'{len(backfill.invalid)}')
+    if backfill.failed:
+        print(f'Не догружено аккаунтов: {len(backfill.failed)}, '
+              'повторный запуск продолжит с места ошибки')
+
+
+if __name__ == '__main__':
+    listener = logging_setup.configure_logging(
+        'backfill.log', json_lines=homework.LOG_JSON
+    )
+    try:
+        main()
+    finally:
+        listener.stop()
@@ -0,0 +1,290 @@
+"""Сквозной бенчмарк движка опроса на локальных заменителях API.
+
+Движок опрашивает 1/100/1k/10k аккаунтов через fake_servers.py,
+запущенные в отдельном процессе, и отправляет уведомления в фейковый
+Telegram. Каждый сценарий выполняется в своём процессе, поэтому CPU,
+пиковый RSS и сокеты относятся только к боту. Результаты пишутся в
+JSON для сравнения коммитов. Запуск из корня репозитория:
+python benchmarks/bench_e2e.py --output before.json
+python benchmarks/bench_e2e.py --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import delivery  # noqa: E402
+import engine  # noqa: E402
+import fake_servers  # noqa: E402
+import homework  # noqa: E402
+import lag  # noqa: E402
+import metrics  # noqa: E402
+import scheduler  # noqa: E402
+import storage  # noqa: E402
+from telebot import TeleBot, apihelper  # noqa: E402
+
+
+ACCOUNT_COUNTS = (1, 100, 1000, 10000)
+DURATION = 10.0
+PERIOD = 1.0
+CONCURRENCY = 100
+CHANGE_RATE = 0.05
+TELEGRAM_GLOBAL_RATE = 1000
+SAMPLE_INTERVAL = 0.1
+TIMEOUT = 5
+COMPARED = ('polls_per_second', 'cpu_ms_per_poll', 'lag_p50', 'lag_p99',
+            'peak_rss_mb', 'peak_sockets')
+
+
+def homework_payload(change_rate):
+    """Возвращает генератор домашек с date_updated до микросекунд.
+
+    Точное время изменения статуса нужно, чтобы задержка уведомления
+    не округлялась до секунды, как в настоящем API.
+    """
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def homeworks(token, from_date):
+        with rng_lock:
+            if rng.random() >= change_rate:
+                return []
+        now = datetime.now(timezone.utc)
+        return [{
+            'id': token,
+            'status': 'approved',
+            'homework_name': f'{token}.zip',
+            'date_updated': now.isoformat().replace('+00:00', 'Z'),
+        }]
+
+    return homeworks
+
+
+def serve(change_rate, telegram_rate, addresses, stop):
+    """Запускает фейковые серверы до установки события stop."""
+    practicum = fake_servers.FakePracticum(
+        homeworks=homework_payload(change_rate)
+    )
+    telegram = fake_servers.FakeTelegram(global_rate=telegram_rate)
+    with practicum, telegram:
+        addresses.put((practicum.endpoint, telegram.api_url))
+        stop.wait()
+
+
+def open_sockets():
+    """Возвращает число открытых сокетов процесса (только Linux)."""
+    try:
+        descriptors = os.listdir('/proc/self/fd')
+    except OSError:
+        return None
+    count = 0
+    for descriptor in descriptors:
+        try:
+            if os.readlink(f'/proc/self/fd/{descriptor}').startswith(
+                'socket:'
+            ):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+async def sample_sockets(samples):
+    """Периодически замеряет число открытых сокетов."""
+    while True:
+        samples.append(open_sockets() or 0)
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+async def drive(polling_engine, duration, samples):
+    """Запускает движок на duration секунд."""
+    sampler = asyncio.create_task(sample_sockets(samples))
+    try:
+        await asyncio.wait_for(polling_engine.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        sampler.cancel()
+
+
+def run_scenario(accounts, options, endpoint, api_url, results):
+    """Прогоняет один сценарий и кладёт результат в очередь results."""
+    logging.disable(logging.CRITICAL)
+    homework.ENDPOINT = endpoint
+    apihelper.API_URL = api_url
+    apihelper.CONNECT_TIMEOUT = apihelper.READ_TIMEOUT = TIMEOUT
+    homework.configure_api_client(
+        pool_maxsize=options.concurrency, rate_limit=1e9, dns_ttl=0,
+        connect_timeout=TIMEOUT, read_timeout=TIMEOUT
+    )
+    bot = TeleBot(token='1234:bench')
+    polling_engine = engine.PollingEngine(
+        bot,
+        [
+            engine.Account(f'token{index}', index)
+            for index in range(accounts)
+        ],
+        concurrency=options.concurrency,
+        policy=scheduler.PollPolicy({}, default_period=options.period),
+        store=storage.MemoryStateStore(),
+        outbound=delivery.DeliveryQueue(
+            bot, global_rate=options.telegram_rate
+        )
+    )
+    samples = []
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    asyncio.run(drive(polling_engine, options.duration, samples))
+    elapsed = time.perf_counter() - started
+    finished = resource.getrusage(resource.RUSAGE_SELF)
+    polls = metrics.POLLS.value()
+    cpu = (
+        finished.ru_utime - usage.ru_utime
+        + finished.ru_stime - usage.ru_stime
+    )
+    percentiles = lag.LAGS.percentiles()
+    results.put({
+        'accounts': accounts,
+        'duration': elapsed,
+        'polls': polls,
+        'polls_per_second': polls / elapsed,
+        'notifications': metrics.NOTIFICATION_LAG.count(),
+        'cpu_seconds': cpu,
+        'cpu_ms_per_poll': cpu * 1000 / polls if polls else None,
+        'lag_p50': percentiles[0.5],
+        'lag_p90': percentiles[0.9],
+        'lag_p99': percentiles[0.99],
+        'peak_rss_mb': finished.ru_maxrss / 1024,
+        'peak_sockets': max(samples, default=0),
+    })
+    # Запросы, оставшиеся в потоках пула после остановки движка, не
+    # должны задерживать выход процесса и следующий сценарий.
+    results.close()
+    results.join_thread()
+    os._exit(0)
+
+
+def git_commit():
+    """Возвращает хэш текущего коммита или None."""
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    """Прогоняет все сценарии и возвращает отчёт."""
+    context = multiprocessing.get_context('spawn')
+    addresses = context.Queue()
+    stop = context.Event()
+    server = context.Process(
+        target=serve,
+        args=(options.change_rate, options.telegram_rate, addresses, stop)
+    )
+    server.start()
+    endpoint, api_url = addresses.get()
+    scenarios = []
+    try:
+        for accounts in options.accounts:
+            results = context.Queue()
+            worker = context.Process(
+                target=run_scenario,
+                args=(accounts, options, endpoint, api_url, results)
+            )
+            worker.start()
+            scenarios.append(results.get())
+            worker.join()
+            print_scenario(scenarios[-1])
+    finally:
+        stop.set()
+        server.join()
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {
+            'duration': options.duration,
+            'period': options.period,
+            'concurrency': options.concurrency,
+            'change_rate': options.change_rate,
+            'telegram_rate': options.telegram_rate,
+        },
+        'scenarios': scenarios,
+    }
+
+
+def format_number(value):
+    """Форматирует значение для таблицы."""
+    return '-' if value is None else f'{value:.2f}'
+
+
+def print_scenario(scenario):
+    """Печатает строку таблицы результатов сценария."""
+    print(
+        f'{scenario["accounts"]:>8} '
+        + ' '.join(f'{format_number(scenario[key]):>15}' for key in COMPARED)
+    )
+
+
+def compare(report, baseline):
+    """Печатает отношение метрик отчёта к базовому отчёту."""
+    previous = {
+        scenario['accounts']: scenario for scenario in baseline['scenarios']
+    }
+    print(f'\nОтносительно {baseline.get("commit")}:')
+    for scenario in report['scenarios']:
+        base = previous.get(scenario['accounts'])
+        if base is None:
+            continue
+        ratios = []
+        for key in COMPARED:
+            if scenario[key] is None or not base[key]:
+                ratios.append(f'{"-":>15}')
+            else:
+                ratios.append(f'{scenario[key] / base[key]:>14.2f}x')
+        print(f'{scenario["accounts"]:>8} ' + ' '.join(ratios))
+
+
+def main():
+    """Разбирает аргументы, прогоняет сценарии и сохраняет отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--accounts', type=int, nargs='+', default=ACCOUNT_COUNTS
+    )
+    parser.add_argument('--duration', type=float, default=DURATION)
+    parser.add_argument('--period', type=float, default=PERIOD)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--change-rate', type=float, default=CHANGE_RATE)
+    parser.add_argument(
+        '--telegram-rate', type=float, default=TELEGRAM_GLOBAL_RATE
+    )
+    parser.add_argument('--output', default='bench_e2e.json')
+    parser.add_argument('--compare')
+    options = parser.parse_args()
+    print(f'{"accounts":>8} ' + ' '.join(f'{key:>15}' for key in COMPARED))
+    report = run(options)
+    with open(options.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as file:
+            compare(report, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
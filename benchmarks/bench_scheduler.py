@@ -0,0 +1,59 @@
+"""Накладные расходы расписания опросов на один шаг цикла движка.
+
+На каждом шаге из расписания извлекаются аккаунты, срок опроса которых
+наступил, и каждому назначается следующий срок. Запуск из корня
+репозитория: python benchmarks/bench_scheduler.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduler  # noqa: E402
+
+
+ACCOUNT_COUNTS = (1000, 10000, 100000)
+TICKS = 1000
+PERIOD = 600.0
+
+
+def bench(accounts, ticks=TICKS, period=PERIOD, seed=0):
+    """Возвращает среднее время шага и число опросов за шаг."""
+    rng = random.Random(seed)
+    poll_scheduler = scheduler.PollScheduler()
+    for account in range(accounts):
+        poll_scheduler.schedule(account, rng.uniform(0, period))
+    step = period / ticks
+    polled = 0
+    started = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        now = tick * step
+        for account in poll_scheduler.pop_due(now):
+            poll_scheduler.schedule(
+                account, now + rng.uniform(0.9, 1.1) * period
+            )
+            polled += 1
+        poll_scheduler.next_deadline()
+    elapsed = time.perf_counter() - started
+    return elapsed / ticks, polled / ticks
+
+
+def main():
+    """Печатает таблицу результатов."""
+    print(
+        f'{"accounts":>10} {"polls/tick":>12} '
+        f'{"us/tick":>10} {"us/poll":>10}'
+    )
+    for accounts in ACCOUNT_COUNTS:
+        per_tick, polls_per_tick = bench(accounts)
+        per_poll = per_tick / polls_per_tick if polls_per_tick else 0
+        print(
+            f'{accounts:>10} {polls_per_tick:>12.1f} '
+            f'{per_tick * 1e6:>10.1f} {per_poll * 1e6:>10.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
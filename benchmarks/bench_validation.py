@@ -0,0 +1,111 @@
+"""Проверка ответа API и рассылка статусов на больших списках домашек.
+
+При догрузке истории список homeworks может содержать сотни записей,
+и для каждой выполняется путь Poller.poll: check_response, разбор
+статуса, индекс доставленных, outbox и отправка (в заменитель бота).
+Бенчмарк прогоняет синтетические ответы от 10 до 100k домашек с разной
+долей некорректных записей и завершается с кодом 1, если время на
+домашку превысило порог или растёт с размером ответа быстрее линейного.
+Запуск из корня репозитория: python benchmarks/bench_validation.py
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup  # noqa: E402
+import homework  # noqa: E402
+import lag  # noqa: E402
+import outbox as OB  # noqa: E402
+import storage  # noqa: E402
+from tests.fakes import RecordingBot  # noqa: E402
+from tests.payloads import make_homeworks  # noqa: E402
+
+
+SIZES = (10, 100, 1000, 10000, 100000)
+# Каждая MALFORMED_EVERY-я домашка некорректна: 0%, 10% и 50%.
+MALFORMED_EVERY = (0, 10, 2)
+REPEAT = 3
+# Порог времени на одну домашку в микросекундах.
+THRESHOLD = 50.0
+# Во сколько раз время на домашку в самом большом ответе может
+# превышать время в ответе из BASE_SIZE домашек.
+MAX_SCALING = 3.0
+BASE_SIZE = 1000
+
+
+def deliver(response, store):
+    """Проверяет ответ и рассылает статусы, как Poller.poll.
+
+    Возвращает список ошибок пропущенных домашек.
+    """
+    return homework.deliver_homeworks(
+        RecordingBot(),
+        homework.check_response(response),
+        dedup.DeliveryIndex(store, homework.DEDUP_INDEX_SIZE),
+        'account',
+        OB.Outbox(store, lags=lag.LagTracker())
+    )
+
+
+def bench(size, malformed_every, repeat=REPEAT):
+    """Возвращает лучшее из repeat время на одну домашку в секундах.
+
+    Каждый прогон начинается с пустого хранилища, иначе все статусы
+    оказались бы уже доставленными.
+    """
+    response = {
+        'homeworks': make_homeworks(size, malformed_every),
+        'current_date': 0,
+    }
+    best = None
+    for _ in range(repeat):
+        store = storage.MemoryStateStore()
+        started = time.perf_counter()
+        deliver(response, store)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / size
+
+
+def main():
+    """Печатает таблицу результатов и проверяет пороги."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--max-scaling', type=float, default=MAX_SCALING)
+    options = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    print(f'{"homeworks":>10} {"malformed":>10} {"us/homework":>12}')
+    failures = []
+    for malformed_every in MALFORMED_EVERY:
+        share = 1 / malformed_every if malformed_every else 0.0
+        results = {}
+        for size in options.sizes:
+            results[size] = bench(size, malformed_every) * 1e6
+            print(f'{size:>10} {share:>10.0%} {results[size]:>12.2f}')
+            if results[size] > options.threshold:
+                failures.append(
+                    f'{size} домашек, {share:.0%} некорректных: '
+                    f'{results[size]:.2f} мкс на домашку '
+                    f'при пороге {options.threshold}'
+                )
+        largest = max(options.sizes)
+        if BASE_SIZE in results and largest > BASE_SIZE:
+            scaling = results[largest] / results[BASE_SIZE]
+            if scaling > options.max_scaling:
+                failures.append(
+                    f'{share:.0%} некорректных: время на домашку при '
+                    f'{largest} домашек в {scaling:.1f} раза больше, '
+                    f'чем при {BASE_SIZE}'
+                )
+    for failure in failures:
+        print(f'Регрессия: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
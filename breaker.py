@@ -0,0 +1,82 @@
+import threading
+import time
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 60
+PROBE_WAIT = 5
+
+
+class CircuitBreaker:
+    """Автомат размыкания цепи для общего эндпоинта.
+
+    После failure_threshold ошибок подряд цепь размыкается, и запросы
+    не выполняются reset_timeout секунд. Затем пропускается один
+    пробный запрос: успех замыкает цепь для всех, ошибка снова
+    размыкает её.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, probe_wait=PROBE_WAIT,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_wait = probe_wait
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Проверяет, можно ли выполнить запрос сейчас.
+
+        В полуоткрытом состоянии разрешает только один пробный запрос.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if (
+                self.state == OPEN
+                and self.clock() - self.opened_at >= self.reset_timeout
+            ):
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def remaining(self):
+        """Возвращает, через сколько секунд имеет смысл повторить запрос."""
+        with self._lock:
+            if self.state == OPEN:
+                return max(
+                    self.opened_at + self.reset_timeout - self.clock(), 0
+                )
+            if self.state == HALF_OPEN:
+                return self.probe_wait
+            return 0
+
+    def record_success(self):
+        """Замыкает цепь после успешного запроса."""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Учитывает ошибку и размыкает цепь при превышении порога."""
+        with self._lock:
+            self.failures += 1
+            if (
+                self.state == HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self._probing = False
@@ -0,0 +1,258 @@
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+import storage
+
+
+logger = logging.getLogger(__name__)
+
+# Заголовки транспорта не записываются: тело хранится уже
+# распакованным, а куки не нужны для воспроизведения.
+SKIPPED_HEADERS = frozenset((
+    'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie',
+))
+
+
+class CassetteExhausted(requests.RequestException):
+    """Записанные ответы закончились."""
+
+
+class CassetteMismatch(requests.RequestException):
+    """Параметры запроса не совпадают с записанными."""
+
+
+def open_cassette(path, mode):
+    """Открывает файл кассеты; файлы *.gz сжимаются gzip."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def request_account(headers):
+    """Возвращает ключ аккаунта по заголовку Authorization запроса."""
+    authorization = (headers or {}).get('Authorization')
+    if not authorization:
+        return None
+    return storage.account_key(authorization.split(' ', 1)[-1])
+
+
+class CassetteRecorder:
+    """Дописывает ответы API в кассету - файл по строке JSON на ответ.
+
+    В строке сохраняются время начала запроса, его длительность, ключ
+    аккаунта (не токен), параметры, статус, заголовки и тело ответа
+    или класс и текст исключения, если ответа не было.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open_cassette(path, 'a')
+        self._lock = threading.Lock()
+
+    def record(self, started, latency, headers, params, response=None,
+               error=None):
+        """Записывает один обмен с API."""
+        entry = {
+            'time': started,
+            'latency': latency,
+            'account': request_account(headers),
+            'params': params,
+        }
+        if error is not None:
+            entry['error'] = type(error).__name__
+            entry['message'] = str(error)
+        else:
+            entry['status'] = response.status_code
+            entry['headers'] = {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in SKIPPED_HEADERS
+            }
+            entry['body'] = response.content.decode('utf-8', 'replace')
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        """Закрывает файл кассеты."""
+        with self._lock:
+            self._file.close()
+
+
+class RecordingClient:
+    """Клиент API, записывающий каждый ответ клиента client в кассету."""
+
+    def __init__(self, client, recorder):
+        self.client = client
+        self.recorder = recorder
+        self.budget = client.budget
+
+    def get(self, url, headers=None, params=None, stream=False):
+        """Выполняет запрос через client и записывает результат.
+
+        Тело читается целиком даже при stream=True, чтобы попасть
+        в кассету.
+        """
+        started = time.time()
+        began = time.perf_counter()
+        try:
+            response = self.client.get(url, headers=headers, params=params)
+        except http_client.CircuitOpenError:
+            raise
+        except requests.RequestException as error:
+            self.recorder.record(
+                started, time.perf_counter() - began, headers, params,
+                error=error
+            )
+            raise
+        self.recorder.record(
+            started, time.perf_counter() - began, headers, params, response
+        )
+        return response
+
+    def warm_up(self, url):
+        """Прогревает соединение клиента client."""
+        self.client.warm_up(url)
+
+    def close(self):
+        """Закрывает клиент и кассету."""
+        self.client.close()
+        self.recorder.close()
+
+
+def load_cassette(path):
+    """Читает записи кассеты в порядке записи."""
+    with open_cassette(path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def normalize_params(params):
+    """Приводит параметры запроса к виду, в котором они лежат в кассете."""
+    return json.loads(json.dumps(params or {}))
+
+
+def make_response(entry, url):
+    """Собирает requests.Response из записи кассеты."""
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry.get('headers') or {})
+    response._content = entry.get('body', '').encode('utf-8')
+    response._content_consumed = True
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
+
+
+def make_error(entry):
+    """Создаёт записанное в кассету исключение requests."""
+    error_class = getattr(requests.exceptions, entry['error'], None)
+    if not (
+        isinstance(error_class, type)
+        and issubclass(error_class, requests.RequestException)
+    ):
+        error_class = requests.RequestException
+    return error_class(entry.get('message', ''))
+
+
+class ReplayClient:
+    """Клиент API, отдающий ответы из кассеты вместо сети.
+
+    Запрос аккаунта, который есть в кассете, получает следующий
+    записанный ответ этого аккаунта, остальные - следующий ещё не
+    отданный ответ кассеты по порядку. Каждый ответ отдаётся один раз.
+    Ответ отдаётся не раньше, чем он был получен при записи
+    относительно первого запроса, и с записанной длительностью; speed
+    ускоряет время воспроизведения, при speed=0 ответы отдаются сразу.
+    Если параметры запроса не совпадают с записанными, в лог пишется
+    предупреждение, а при strict запрос завершается CassetteMismatch.
+    Когда ответы заканчиваются, запрос завершается CassetteExhausted.
+    """
+
+    def __init__(self, path, speed=1.0, clock=time.monotonic,
+                 sleep=time.sleep, strict=False):
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        self.strict = strict
+        self.budget = http_client.RequestBudget()
+        self.entries = load_cassette(path)
+        self.origin = self.entries[0]['time'] if self.entries else 0
+        self._all = deque(range(len(self.entries)))
+        self._accounts = {}
+        for number, entry in enumerate(self.entries):
+            self._accounts.setdefault(entry.get('account'), deque()).append(
+                number
+            )
+        self._accounts.pop(None, None)
+        self._replayed = set()
+        self._started = None
+        self._lock = threading.Lock()
+
+    def _next_entry(self, headers):
+        """Возвращает следующую запись для запроса с заголовками headers.
+
+        Номер отданной записи запоминается, и из другой очереди она
+        уже не отдаётся.
+        """
+        account = request_account(headers)
+        with self._lock:
+            if self._started is None:
+                self._started = self.clock()
+            queue = self._accounts.get(account, self._all)
+            while queue and queue[0] in self._replayed:
+                queue.popleft()
+            if not queue:
+                raise CassetteExhausted('в кассете не осталось ответов')
+            number = queue.popleft()
+            self._replayed.add(number)
+            return self.entries[number]
+
+    def _check_params(self, entry, params):
+        """Сверяет параметры запроса с записанными в кассете."""
+        recorded = normalize_params(entry.get('params'))
+        requested = normalize_params(params)
+        if recorded == requested:
+            return
+        message = (
+            f'параметры запроса {requested} не совпадают '
+            f'с записанными {recorded}'
+        )
+        if self.strict:
+            raise CassetteMismatch(message)
+        logger.warning('Кассета: %s', message)
+
+    def _wait(self, entry):
+        """Ждёт момента, в который ответ был получен при записи."""
+        if not self.speed:
+            return
+        due = self._started + (
+            entry['time'] - self.origin + entry['latency']
+        ) / self.speed
+        delay = due - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+
+    def get(self, url, headers=None, params=None, stream=False):
+        """Возвращает следующий записанный ответ."""
+        entry = self._next_entry(headers)
+        self._check_params(entry, params)
+        self._wait(entry)
+        if 'error' in entry:
+            raise make_error(entry)
+        response = make_response(entry, url)
+        http_client.record_exchange(response)
+        return response
+
+    def warm_up(self, url):
+        """Ничего не делает: сеть при воспроизведении не нужна."""
+
+    def close(self):
+        """Ничего не делает: кассета прочитана целиком при создании."""
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+INDEX_SIZE = 100000
+
+
+def homework_key(homework):
+    """Возвращает ключ перехода статуса домашки: id, status, date_updated."""
+    return (
+        str(homework['id']),
+        homework.get('status'),
+        homework.get('date_updated')
+    )
+
+
+class DeliveryIndex:
+    """Индекс уже доставленных переходов статусов домашек.
+
+    Ключи хранятся в OrderedDict с вытеснением давно не использованных,
+    поэтому память ограничена maxsize записями. При промахе индекс
+    сверяется с хранилищем состояния, если оно передано, и туда же
+    записываются доставленные статусы. Домашки без id не индексируются.
+    """
+
+    def __init__(self, store=None, maxsize=INDEX_SIZE):
+        self.store = store
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _remember(self, key):
+        """Добавляет ключ в индекс, вытесняя самый старый при переполнении."""
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+    def is_delivered(self, account, homework):
+        """Проверяет, доставлялся ли уже этот статус домашки."""
+        if 'id' not in homework:
+            return False
+        key = (account,) + homework_key(homework)
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        if self.store is None:
+            return False
+        if self.store.get_status(account, key[1]) == key[2:]:
+            self._remember(key)
+            return True
+        return False
+
+    def mark_delivered(self, account, homework):
+        """Отмечает статус домашки доставленным."""
+        if 'id' not in homework:
+            return
+        key = (account,) + homework_key(homework)
+        self._remember(key)
+        if self.store is not None:
+            self.store.set_status(account, *key[1:])
@@ -0,0 +1,173 @@
+import asyncio
+import contextvars
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import ratelimit
+import tracing
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 10000
+WORKERS = 8
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+TOO_MANY_REQUESTS = 429
+
+
+def retry_after(error):
+    """Извлекает retry_after из ответа Telegram с кодом 429 или None."""
+    if getattr(error, 'error_code', None) != TOO_MANY_REQUESTS:
+        return None
+    result_json = getattr(error, 'result_json', None) or {}
+    parameters = result_json.get('parameters') or {}
+    return parameters.get('retry_after', 1)
+
+
+class DeliveryQueue:
+    """Ограниченная очередь исходящих сообщений в Telegram.
+
+    Сообщения копятся в очереди своего чата и отправляются воркерами
+    с учётом общего лимита Telegram и лимита на чат. Чат, исчерпавший
+    лимит, откладывается, не занимая воркер. Ответ 429 ставит чат на
+    паузу на retry_after секунд, сообщение отправляется повторно.
+    Любая другая ошибка отправки завершает доставку сообщения с
+    результатом False, не останавливая воркер.
+    """
+
+    def __init__(self, bot, maxsize=QUEUE_SIZE, workers=WORKERS,
+                 global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE):
+        self.bot = bot
+        self.maxsize = maxsize
+        self.workers = workers
+        self.global_bucket = ratelimit.TokenBucket(global_rate)
+        self.chat_buckets = ratelimit.KeyedTokenBuckets(chat_rate)
+        self._chats = {}
+        self._ready = None
+        self._slots = None
+        self._drained = None
+        self._tasks = []
+        self._executor = None
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def start(self):
+        """Запускает воркеры доставки в текущем цикле событий."""
+        self._ready = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.maxsize)
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Останавливает воркеры доставки."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, chat_id, text):
+        """Ставит сообщение в очередь, ожидая места, если она заполнена.
+
+        Возвращает future, в который запишется True после успешной
+        доставки или False при ошибке. Отправка попадает в трассу,
+        текущую на момент вызова.
+        """
+        await self._slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        entry = (text, future, tracing.current_span())
+        self._pending += 1
+        self._drained.clear()
+        messages = self._chats.get(chat_id)
+        if messages is None:
+            self._chats[chat_id] = deque([entry])
+            self._ready.put_nowait(chat_id)
+        else:
+            messages.append(entry)
+        return future
+
+    async def join(self):
+        """Дожидается, пока очередь опустеет."""
+        await self._drained.wait()
+
+    async def send(self, chat_id, text):
+        """Ставит сообщение в очередь и дожидается результата доставки."""
+        return await (await self.submit(chat_id, text))
+
+    def _defer(self, chat_id, delay):
+        """Возвращает чат в очередь готовых через delay секунд."""
+        asyncio.get_running_loop().call_later(
+            delay, self._ready.put_nowait, chat_id
+        )
+
+    def _finish(self, chat_id, future, result):
+        """Завершает доставку сообщения и освобождает место в очереди."""
+        self._pending -= 1
+        self._slots.release()
+        if not future.done():
+            future.set_result(result)
+        if self._chats[chat_id]:
+            self._ready.put_nowait(chat_id)
+        else:
+            del self._chats[chat_id]
+        if not self._pending:
+            self._drained.set()
+
+    async def _acquire_global(self):
+        """Дожидается токена общего лимита Telegram."""
+        wait = self.global_bucket.reserve()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self.global_bucket.reserve()
+
+    async def _worker(self):
+        """Отправляет сообщения из очередей готовых чатов."""
+        loop = asyncio.get_running_loop()
+        send_message = metrics.timed('send_message')(self.bot.send_message)
+        while True:
+            chat_id = await self._ready.get()
+            bucket = self.chat_buckets.get(chat_id)
+            wait = bucket.reserve()
+            if wait:
+                self._defer(chat_id, wait)
+                continue
+            await self._acquire_global()
+            entry = self._chats[chat_id].popleft()
+            text, future, parent = entry
+            try:
+                logger.debug('Начало отправки сообщения в Telegram')
+                with tracing.span('send_message', parent):
+                    await loop.run_in_executor(
+                        self._executor,
+                        contextvars.copy_context().run,
+                        send_message, chat_id, text
+                    )
+                logger.debug('удачная отправка сообщения в Telegram')
+            except asyncio.CancelledError:
+                self._chats[chat_id].appendleft(entry)
+                self._ready.put_nowait(chat_id)
+                raise
+            except Exception as error:
+                delay = retry_after(error)
+                if delay is None:
+                    logger.error(error, exc_info=True)
+                    self._finish(chat_id, future, False)
+                    continue
+                logger.warning(
+                    'Telegram ограничил отправку в чат %s на %s с',
+                    chat_id, delay
+                )
+                self._chats[chat_id].appendleft(entry)
+                bucket.pause(delay)
+                self._defer(chat_id, delay)
+                continue
+            self._finish(chat_id, future, True)
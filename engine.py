@@ -0,0 +1,420 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import signal
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from telebot import TeleBot
+
+import dedup
+import delivery
+import exceptions as EX
+import homework
+import logging_setup
+import metrics
+import outbox as OB
+import scheduler
+import storage
+import tracing
+
+
+load_dotenv()
+
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE', 'accounts.json')
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 100))
+DELIVERY_QUEUE_SIZE = int(
+    os.getenv('DELIVERY_QUEUE_SIZE', delivery.QUEUE_SIZE)
+)
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', delivery.WORKERS))
+TELEGRAM_GLOBAL_RATE = float(
+    os.getenv('TELEGRAM_GLOBAL_RATE', delivery.GLOBAL_RATE)
+)
+TELEGRAM_CHAT_RATE = float(
+    os.getenv('TELEGRAM_CHAT_RATE', delivery.CHAT_RATE)
+)
+IDLE_WAIT = 60
+DIGEST_CHECK_INTERVAL = 60
+# Отпечатков ошибок на аккаунт: отпечатки хранятся отдельно по аккаунтам,
+# и у одного аккаунта одновременно бывает несколько разных ошибок.
+FINGERPRINTS_PER_ACCOUNT = 4
+
+Account = namedtuple('Account', ('practicum_token', 'chat_id'))
+
+
+def load_accounts(path):
+    """Читает список аккаунтов из json-файла.
+
+    Файл содержит список объектов с ключами practicum_token и chat_id.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            raw_accounts = json.load(file)
+    except (OSError, ValueError) as error:
+        raise EX.ErrorLoadAccounts(
+            f'Не удалось прочитать аккаунты из "{path}": {error}'
+        )
+    if not isinstance(raw_accounts, list):
+        raise EX.ErrorLoadAccounts(
+            f'В "{path}" ожидается список, получен {type(raw_accounts)}'
+        )
+    accounts = []
+    for raw_account in raw_accounts:
+        try:
+            accounts.append(Account(
+                practicum_token=raw_account['practicum_token'],
+                chat_id=raw_account['chat_id']
+            ))
+        except (KeyError, TypeError):
+            raise EX.ErrorLoadAccounts(
+                f'Некорректное описание аккаунта в "{path}": {raw_account}'
+            )
+    return accounts
+
+
+class PollingEngine:
+    """Опрашивает API практикума по множеству аккаунтов в одном процессе.
+
+    Запросы к API блокирующие, поэтому выполняются в пуле потоков;
+    одновременно выполняется не больше concurrency запросов. Сообщения
+    отправляются через отдельную очередь доставки с ограничением
+    частоты. Точку опроса, статус и повторы после ошибок каждого
+    аккаунта ведёт homework.PollState, как и в main(); начальная точка
+    опроса берётся из clock.
+    """
+
+    def __init__(self, bot, accounts, concurrency=POLL_CONCURRENCY,
+                 policy=None, store=None, outbound=None, clock=time.time):
+        self.bot = bot
+        self.outbound = outbound if outbound is not None else (
+            delivery.DeliveryQueue(
+                bot,
+                maxsize=DELIVERY_QUEUE_SIZE,
+                workers=DELIVERY_WORKERS,
+                global_rate=TELEGRAM_GLOBAL_RATE,
+                chat_rate=TELEGRAM_CHAT_RATE
+            )
+        )
+        self.accounts = list(accounts)
+        self.concurrency = concurrency
+        self.policy = policy if policy is not None else (
+            scheduler.PollPolicy(default_period=homework.RETRY_PERIOD)
+        )
+        self.clock = clock
+        self.states = {}
+        self.scheduler = scheduler.PollScheduler()
+        self._wakeup = None
+        self.store = store if store is not None else (
+            storage.MemoryStateStore()
+        )
+        self.index = dedup.DeliveryIndex(
+            self.store, homework.DEDUP_INDEX_SIZE
+        )
+        self.outbox = OB.Outbox(self.store)
+        self.suppressor = homework.make_error_suppressor(
+            maxsize=max(
+                homework.ERROR_FINGERPRINTS,
+                FINGERPRINTS_PER_ACCOUNT * len(self.accounts)
+            )
+        )
+        self._digest_task = None
+        self._executor = None
+        self._semaphore = None
+        self._retry_task = None
+        self._in_flight = 0
+        self._outboxed = set()
+        self.profiler = None
+
+    def state(self, account):
+        """Возвращает состояние опроса аккаунта, создавая его при нужде."""
+        state = self.states.get(account)
+        if state is None:
+            state = self.states[account] = homework.PollState(
+                self.store,
+                storage.account_key(account.practicum_token),
+                self.suppressor,
+                clock=self.clock,
+                policy=self.policy,
+                scope=account,
+                chat_id=account.chat_id
+            )
+        return state
+
+    async def _call(self, func, *args):
+        """Выполняет блокирующую функцию в пуле потоков движка.
+
+        Функция выполняется в копии текущего контекста, чтобы этапы
+        в потоке попадали в трассу опроса.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                return await loop.run_in_executor(
+                    self._executor, context.run, func, *args
+                )
+            finally:
+                self._in_flight -= 1
+
+    async def _notify(self, account, message):
+        """Отправляет сообщение в чат аккаунта через очередь доставки."""
+        return await self.outbound.send(account.chat_id, message)
+
+    def _on_sent(self, message, future):
+        """Отмечает результат отправки сообщения из outbox."""
+        self._outboxed.discard(message.id)
+        if future.cancelled():
+            return
+        if future.result():
+            self.outbox.delivered(message)
+        else:
+            self.outbox.failed(message)
+
+    async def _send_outboxed(self, message):
+        """Ставит сообщение из outbox в очередь доставки.
+
+        Пока сообщение ждёт в очереди, оно считается отправляемым и не
+        забирается повторно из outbox по истечении аренды.
+        """
+        self._outboxed.add(message.id)
+        future = await self.outbound.submit(message.chat_id, message.text)
+        future.add_done_callback(lambda done: self._on_sent(message, done))
+
+    async def _deliver(self, account, key, homeworks):
+        """Сохраняет в outbox и ставит в очередь доставки новые статусы
+        всех домашек из ответа.
+
+        Outbox и пропуск отправленных статусов - общие с main():
+        homework.outbox_new_statuses. Возвращает ошибки разбора
+        пропущенных домашек.
+        """
+        errors = []
+        with tracing.span('deliver'):
+            for outboxed in homework.outbox_new_statuses(
+                homeworks, self.index, key, account.chat_id, self.outbox,
+                errors
+            ):
+                await self._send_outboxed(outboxed)
+        return errors
+
+    async def _retry_outbox(self):
+        """Повторяет отправку сообщений из outbox, не дожидаясь опросов.
+
+        Заодно раз в интервал фиксирует накопленные записи хранилища,
+        в том числе outbox, чтобы они не ждали следующей записи или
+        остановки движка, и удаляет старые доставленные сообщения.
+        """
+        while True:
+            await asyncio.sleep(OB.POLL_INTERVAL)
+            self.outbox.prune()
+            self.store.flush()
+            for message in self.outbox.claim_due():
+                if message.id not in self._outboxed:
+                    await self._send_outboxed(message)
+
+    async def poll_account(self, account):
+        """Выполняет один опрос API для аккаунта."""
+        with tracing.trace('poll_account', account=str(account.chat_id)):
+            await self._poll_account(account)
+
+    async def _poll_account(self, account):
+        """Запрашивает статусы аккаунта и ставит уведомления в очередь."""
+        state = self.state(account)
+        try:
+            response = await self._call(
+                homework.request_statuses,
+                state.timestamp,
+                homework.make_headers(account.practicum_token)
+            )
+            homeworks = state.accept(response)
+            errors = []
+            if homeworks:
+                errors = await self._deliver(
+                    account, state.account, homeworks
+                )
+            state.delivered(response, homeworks, errors)
+        except Exception as error:
+            await self._handle_error(account, error)
+
+    async def _handle_error(self, account, error):
+        """Применяет к ошибке опроса правило повтора из retry_policy.
+
+        Аккаунт с постоянной ошибкой перестаёт опрашиваться до
+        перезапуска движка.
+        """
+        message = self.state(account).failed(error)
+        if message is not None:
+            await self._notify(account, message)
+
+    async def _send_digests(self):
+        """Периодически отправляет аккаунтам сводки подавленных ошибок."""
+        while True:
+            await asyncio.sleep(DIGEST_CHECK_INTERVAL)
+            for account, digest in self.suppressor.digests().items():
+                await self.outbound.submit(account.chat_id, digest)
+
+    def next_delay(self, account):
+        """Возвращает задержку до следующего опроса аккаунта.
+
+        После ошибки задержка берётся из правила повтора retry_policy.
+        Пока цепь к API разомкнута, аккаунт откладывается до пробного
+        запроса, чтобы после восстановления все опросы возобновились
+        вместе.
+        """
+        return self.state(account).next_delay()
+
+    async def _poll_and_reschedule(self, account):
+        """Опрашивает аккаунт и назначает время его следующего опроса."""
+        try:
+            await self.poll_account(account)
+        finally:
+            if self.profiler is not None:
+                self.profiler.tick()
+            if not self.state(account).stopped:
+                self.scheduler.schedule(
+                    account, time.monotonic() + self.next_delay(account)
+                )
+            self._wakeup.set()
+
+    async def _wait_next_deadline(self):
+        """Спит до ближайшего срока опроса или до перепланирования."""
+        deadline = self.scheduler.next_deadline()
+        if deadline is None:
+            timeout = IDLE_WAIT
+        else:
+            timeout = max(deadline - time.monotonic(), 0)
+        # Не wait_for: в Python 3.11 он теряет отмену, если ожидание
+        # завершилось одновременно с ней, и run() не останавливается.
+        timer = asyncio.get_running_loop().call_later(
+            timeout, self._wakeup.set
+        )
+        try:
+            await self._wakeup.wait()
+        finally:
+            timer.cancel()
+        self._wakeup.clear()
+
+    def queue_depths(self):
+        """Возвращает глубину очередей движка для метрик."""
+        return {
+            ('delivery',): len(self.outbound),
+            ('scheduled',): len(self.scheduler),
+            ('polls_in_flight',): self._in_flight,
+        }
+
+    def _start(self):
+        """Создаёт пул потоков и семафор для ограничения параллелизма."""
+        metrics.QUEUE_DEPTH.set_function(self.queue_depths)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self.outbound.start()
+        self._retry_task = asyncio.create_task(self._retry_outbox())
+        self._digest_task = asyncio.create_task(self._send_digests())
+
+    async def _stop(self):
+        """Останавливает доставку, освобождает пул и фиксирует состояние."""
+        self._retry_task.cancel()
+        self._digest_task.cancel()
+        metrics.QUEUE_DEPTH.remove_function(self.queue_depths)
+        await self.outbound.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.store.flush()
+
+    async def poll_all(self):
+        """Выполняет один опрос всех аккаунтов."""
+        self._start()
+        try:
+            await asyncio.gather(
+                *(self.poll_account(account) for account in self.accounts)
+            )
+            await self.outbound.join()
+        finally:
+            await self._stop()
+
+    async def run(self):
+        """Опрашивает все аккаунты до остановки процесса.
+
+        Аккаунты хранятся в расписании по времени следующего опроса;
+        на каждом шаге запускаются только те, чей срок наступил.
+        """
+        self._start()
+        now = time.monotonic()
+        for account in self.accounts:
+            self.scheduler.schedule(account, now)
+        tasks = set()
+        try:
+            while True:
+                for account in self.scheduler.pop_due(time.monotonic()):
+                    task = asyncio.create_task(
+                        self._poll_and_reschedule(account)
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await self._wait_next_deadline()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self._stop()
+
+
+async def serve(engine):
+    """Выполняет engine.run() до сигнала SIGTERM.
+
+    По SIGTERM задача отменяется, поэтому движок успевает остановить
+    доставку и зафиксировать состояние.
+    """
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        await engine.run()
+    except asyncio.CancelledError:
+        logger.info('Движок остановлен по SIGTERM')
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+
+
+def main():
+    """Запускает опрос всех аккаунтов из ACCOUNTS_FILE."""
+    if not homework.TELEGRAM_TOKEN:
+        logger.critical(
+            'Отсутствует обязательная переменная окружения: '
+            'TELEGRAM_TOKEN. Программа принудительно остановлена.'
+        )
+        raise EX.ErrorCheckTokens('Отсутствие переменной TELEGRAM_TOKEN')
+    accounts = load_accounts(ACCOUNTS_FILE)
+    homework.configure_telegram_api()
+    bot = TeleBot(token=homework.TELEGRAM_TOKEN)
+    homework.configure_api_client(
+        pool_maxsize=max(POLL_CONCURRENCY, homework.API_POOL_SIZE)
+    ).warm_up(homework.ENDPOINT)
+    store = storage.open_state_store(homework.STATE_STORE)
+    engine = PollingEngine(bot, accounts, store=store)
+    engine.profiler = homework.make_profiler()
+    metrics_server = homework.start_metrics_server()
+    tracing.configure(homework.TRACE_SAMPLE_RATE, homework.TRACE_FILE)
+    try:
+        asyncio.run(serve(engine))
+    finally:
+        engine.profiler.uninstall()
+        homework.stop_metrics_server(metrics_server)
+        tracing.close()
+        store.close()
+
+
+if __name__ == '__main__':
+    listener = logging_setup.configure_logging(
+        'engine.log', json_lines=homework.LOG_JSON
+    )
+    try:
+        main()
+    finally:
+        listener.stop()
@@ -0,0 +1,90 @@
+import re
+import time
+from collections import OrderedDict
+
+
+WINDOW = 3600
+DIGEST_INTERVAL = 3600
+MAXSIZE = 1000
+
+NUMBER_PATTERN = re.compile(r'\d+(\.\d+)?')
+QUOTED_PATTERN = re.compile(r'"[^"]*"|\'[^\']*\'')
+SPACE_PATTERN = re.compile(r'\s+')
+
+
+def fingerprint(error):
+    """Возвращает отпечаток ошибки: класс и нормализованный текст.
+
+    Числа и значения в кавычках заменяются заглушками, чтобы ошибки,
+    отличающиеся только timestamp или адресом, считались одной.
+    """
+    text = QUOTED_PATTERN.sub('"_"', str(error))
+    text = NUMBER_PATTERN.sub('N', text)
+    text = SPACE_PATTERN.sub(' ', text).strip().lower()
+    return type(error).__name__, text
+
+
+class ErrorSuppressor:
+    """Подавляет повторные уведомления об ошибках.
+
+    О каждой ошибке с новым отпечатком сообщается сразу, повторы
+    в пределах window секунд только подсчитываются. Раз в
+    digest_interval секунд подсчитанные повторы собираются в сводку.
+    Отпечатки хранятся в LRU ограниченного размера maxsize. Ошибки
+    разных аккаунтов разделяются параметром scope.
+    """
+
+    def __init__(self, window=WINDOW, digest_interval=DIGEST_INTERVAL,
+                 maxsize=MAXSIZE, clock=time.monotonic):
+        self.window = window
+        self.digest_interval = digest_interval
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._last_digest = clock()
+
+    def should_notify(self, error, scope=None):
+        """Учитывает ошибку и решает, нужно ли сообщить о ней сейчас."""
+        now = self.clock()
+        key = (scope, fingerprint(error))
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {'notified_at': None, 'count': 0}
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        if (
+            entry['notified_at'] is None
+            or now - entry['notified_at'] >= self.window
+        ):
+            entry['notified_at'] = now
+            return True
+        entry['count'] += 1
+        return False
+
+    def digests(self):
+        """Возвращает сводки подавленных ошибок по scope, если пора.
+
+        Результат - словарь scope: текст сводки; пустой, если время
+        сводки ещё не пришло или подавленных ошибок не было.
+        """
+        now = self.clock()
+        if now - self._last_digest < self.digest_interval:
+            return {}
+        period = round((now - self._last_digest) / 60)
+        self._last_digest = now
+        lines = {}
+        for (scope, (name, _)), entry in self._entries.items():
+            if entry['count']:
+                lines.setdefault(scope, {}).setdefault(name, 0)
+                lines[scope][name] += entry['count']
+                entry['count'] = 0
+        return {
+            scope: 'Сводка ошибок за последние {} мин: {}'.format(
+                period,
+                ', '.join(
+                    f'{name} x{count}' for name, count in counts.items()
+                )
+            )
+            for scope, counts in lines.items()
+        }
@@ -40,3 +40,35 @@ class ErrorDictKeyStatusInParseStatus(ValueError):
 
 class ErrorDictKeyHomeworkNameInParseStatus(ValueError):
     """Исключение отсутствия ключа домашки"""
+
+
+class ErrorLoadAccounts(ValueError):
+    """Исключение некорректного файла со списком аккаунтов"""
+
+
+class ErrorStateStore(Exception):
+    """Исключение ошибки хранилища состояния бота"""
+
+
+class ErrorRequestGetApiUnauthorized(ErrorRequestGetApiHttpsStatus):
+    """Исключение отказа API в доступе по токену (401, 403)"""
+
+
+class ErrorRequestGetApiTooManyRequests(ErrorRequestGetApiHttpsStatus):
+    """Исключение превышения квоты запросов к API (429)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ErrorRequestGetApiServer(ErrorRequestGetApiHttpsStatus):
+    """Исключение ошибки на стороне сервера API (5xx)"""
+
+
+class ErrorCircuitOpen(ErrorRequestGetApi):
+    """Исключение пропуска запроса к API при разомкнутой цепи"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -0,0 +1,372 @@
+"""Локальные заменители API практикума и Telegram Bot API.
+
+Нужны для нагрузочного тестирования без сети: бот направляется на них
+переменными окружения PRACTICUM_ENDPOINT и TELEGRAM_API_URL. Запуск:
+python fake_servers.py --practicum-port 8001 --telegram-port 8002
+"""
+import argparse
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import ratelimit
+
+
+PRACTICUM_PATH = '/api/user_api/homework_statuses/'
+STATUSES = ('reviewing', 'approved', 'rejected')
+RETRY_AFTER = 1
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_RATE = 1
+POLL_INTERVAL = 0.05
+
+
+class FakeHTTPServer(ThreadingHTTPServer):
+    """HTTP-сервер с keep-alive, работающий в фоновом потоке."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler, host='127.0.0.1', port=0):
+        super().__init__((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        """Возвращает адрес сервера вида http://host:port."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Запускает обработку запросов в фоновом потоке."""
+        self._thread = threading.Thread(
+            target=self.serve_forever,
+            args=(POLL_INTERVAL,),
+            name=type(self).__name__,
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def handle_error(self, request, client_address):
+        """Не печатает обрывы соединений клиентами при остановке."""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def stop(self):
+        """Останавливает сервер и закрывает сокет."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Обработчик, отвечающий JSON через keep-alive соединение."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, data, headers=None):
+        """Отправляет ответ со статусом status и телом data."""
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if getattr(self.server, 'compress', False) and 'gzip' in (
+            self.headers.get('Accept-Encoding', '')
+        ):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_params(self):
+        """Возвращает параметры из строки запроса и тела формы."""
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8')
+            if self.headers.get('Content-Type', '').startswith(
+                'application/json'
+            ):
+                return {
+                    key: str(value) for key, value in json.loads(body).items()
+                }
+            params.update(parse_qs(body))
+        return {key: values[-1] for key, values in params.items()}
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PracticumHandler(JSONHandler):
+    """Эмулирует эндпоинт статусов домашних работ."""
+
+    def do_HEAD(self):
+        """Отвечает на HEAD, например прогрев соединения, без тела."""
+        self.send_response(HTTPStatus.UNAUTHORIZED)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        if urlsplit(self.path).path != PRACTICUM_PATH:
+            self.send_json(HTTPStatus.NOT_FOUND, {'code': 'not_found'})
+            return
+        if server.latency:
+            time.sleep(server.latency)
+        authorization = self.headers.get('Authorization', '')
+        if not authorization.startswith('OAuth '):
+            server.count(HTTPStatus.UNAUTHORIZED)
+            self.send_json(
+                HTTPStatus.UNAUTHORIZED, {'code': 'not_authenticated'}
+            )
+            return
+        roll = server.roll()
+        if roll < server.too_many_rate:
+            server.count(HTTPStatus.TOO_MANY_REQUESTS)
+            self.send_json(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                {'code': 'throttled'},
+                {'Retry-After': str(server.retry_after)}
+            )
+            return
+        if roll < server.too_many_rate + server.error_rate:
+            server.count(HTTPStatus.INTERNAL_SERVER_ERROR)
+            self.send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR, {'code': 'server_error'}
+            )
+            return
+        params = self.read_params()
+        try:
+            from_date = int(params.get('from_date', 0))
+        except ValueError:
+            server.count(HTTPStatus.BAD_REQUEST)
+            self.send_json(HTTPStatus.BAD_REQUEST, {'code': 'bad_request'})
+            return
+        server.count(HTTPStatus.OK)
+        self.send_json(HTTPStatus.OK, {
+            'homeworks': server.homeworks(
+                authorization.split(' ', 1)[1], from_date
+            ),
+            'current_date': int(server.clock()),
+        })
+
+
+class FakePracticum(FakeHTTPServer):
+    """Заменитель API практикума.
+
+    На каждый запрос с вероятностью change_rate возвращает одну
+    домашку токена с новым статусом, иначе пустой список. Вместо этого
+    можно передать homeworks - функцию (token, from_date) -> список
+    домашек. latency задаёт задержку ответа в секундах, error_rate и
+    too_many_rate - доли ответов 500 и 429 (с Retry-After). При
+    compress=True ответы сжимаются gzip, если клиент его принимает.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, homeworks=None,
+                 change_rate=0.1, latency=0.0, error_rate=0.0,
+                 too_many_rate=0.0, retry_after=RETRY_AFTER, seed=None,
+                 clock=time.time, compress=False):
+        super().__init__(PracticumHandler, host, port)
+        self.compress = compress
+        self.change_rate = change_rate
+        self.latency = latency
+        self.error_rate = error_rate
+        self.too_many_rate = too_many_rate
+        self.retry_after = retry_after
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.responses = {}
+        self._homeworks = homeworks
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        """Возвращает адрес эндпоинта для PRACTICUM_ENDPOINT."""
+        return self.url + PRACTICUM_PATH
+
+    def roll(self):
+        """Возвращает случайное число для выбора ответа."""
+        with self._lock:
+            return self.rng.random()
+
+    def count(self, status):
+        """Учитывает ответ со статусом status."""
+        with self._lock:
+            self.responses[int(status)] = (
+                self.responses.get(int(status), 0) + 1
+            )
+
+    def homeworks(self, token, from_date):
+        """Возвращает список домашек для ответа."""
+        if self._homeworks is not None:
+            return self._homeworks(token, from_date)
+        if self.roll() >= self.change_rate:
+            return []
+        now = datetime.fromtimestamp(self.clock(), timezone.utc)
+        with self._lock:
+            status = self.rng.choice(STATUSES)
+        return [{
+            'id': zlib.crc32(token.encode()) % 100000,
+            'status': status,
+            'homework_name': f'{token}__homework.zip',
+            'reviewer_comment': '',
+            'date_updated': now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'lesson_name': 'Итоговый проект',
+        }]
+
+
+class TelegramHandler(JSONHandler):
+    """Эмулирует методы sendMessage и getMe Bot API."""
+
+    def do_GET(self):
+        self.handle_method()
+
+    def do_POST(self):
+        self.handle_method()
+
+    def handle_method(self):
+        server = self.server
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) != 2 or not parts[0].startswith('bot'):
+            self.send_json(HTTPStatus.NOT_FOUND, {
+                'ok': False, 'error_code': 404, 'description': 'Not Found'
+            })
+            return
+        method = parts[1]
+        params = self.read_params()
+        if method == 'getMe':
+            self.send_json(HTTPStatus.OK, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'fake',
+                'username': 'fake_bot',
+            }})
+            return
+        if method != 'sendMessage':
+            self.send_json(HTTPStatus.NOT_FOUND, {
+                'ok': False, 'error_code': 404, 'description': 'Not Found'
+            })
+            return
+        if server.latency:
+            time.sleep(server.latency)
+        chat_id = params.get('chat_id')
+        retry_after = server.throttle(chat_id)
+        if retry_after:
+            self.send_json(HTTPStatus.TOO_MANY_REQUESTS, {
+                'ok': False,
+                'error_code': 429,
+                'description': (
+                    f'Too Many Requests: retry after {retry_after}'
+                ),
+                'parameters': {'retry_after': retry_after},
+            })
+            return
+        message = server.record(chat_id, params.get('text', ''))
+        self.send_json(HTTPStatus.OK, {'ok': True, 'result': message})
+
+
+class FakeTelegram(FakeHTTPServer):
+    """Заменитель Telegram Bot API с лимитами частоты.
+
+    Сообщение сверх global_rate в секунду на весь бот или chat_rate
+    в секунду на чат получает ответ 429 с retry_after, как настоящий
+    Telegram. Принятые сообщения копятся в messages.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0,
+                 global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate=TELEGRAM_CHAT_RATE, latency=0.0,
+                 clock=time.time):
+        super().__init__(TelegramHandler, host, port)
+        self.latency = latency
+        self.clock = clock
+        self.global_bucket = ratelimit.TokenBucket(global_rate)
+        self.chat_buckets = ratelimit.KeyedTokenBuckets(chat_rate)
+        self.messages = []
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def api_url(self):
+        """Возвращает шаблон адреса для TELEGRAM_API_URL."""
+        return self.url + '/bot{0}/{1}'
+
+    def throttle(self, chat_id):
+        """Возвращает retry_after, если сообщение превышает лимит.
+
+        Токены забираются из обоих бакетов, только если оба пропускают
+        сообщение: отклонённый запрос квоту не расходует.
+        """
+        with self._lock:
+            chat_bucket = self.chat_buckets.get(chat_id)
+            wait = max(
+                chat_bucket.wait_time(), self.global_bucket.wait_time()
+            )
+            if wait:
+                self.throttled += 1
+            else:
+                chat_bucket.reserve()
+                self.global_bucket.reserve()
+        return max(int(wait + 0.999), 1) if wait else 0
+
+    def record(self, chat_id, text):
+        """Сохраняет принятое сообщение и возвращает его описание."""
+        with self._lock:
+            self.messages.append((chat_id, text, self.clock()))
+            message_id = len(self.messages)
+        return {
+            'message_id': message_id,
+            'date': int(self.clock()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': text,
+        }
+
+
+def main():
+    """Запускает оба сервера до прерывания по Ctrl+C."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--practicum-port', type=int, default=8001)
+    parser.add_argument('--telegram-port', type=int, default=8002)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--too-many-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--gzip', action='store_true')
+    args = parser.parse_args()
+    practicum = FakePracticum(
+        args.host, args.practicum_port, change_rate=args.change_rate,
+        latency=args.latency, error_rate=args.error_rate,
+        too_many_rate=args.too_many_rate, compress=args.gzip
+    )
+    telegram = FakeTelegram(
+        args.host, args.telegram_port, latency=args.telegram_latency
+    )
+    with practicum, telegram:
+        print(f'PRACTICUM_ENDPOINT={practicum.endpoint}')
+        print(f'TELEGRAM_API_URL={telegram.api_url}')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
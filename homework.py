@@ -1,14 +1,32 @@
 import logging
 import os
+import signal
 import time
+from contextlib import contextmanager
+from functools import partial
 from http import HTTPStatus
-from logging.handlers import RotatingFileHandler
 
 import requests
 from dotenv import load_dotenv
 from telebot import TeleBot, apihelper
 
+import breaker
+import cassette
+import dedup
+import error_digest
 import exceptions as EX
+import http_client
+import json_stream
+import lag
+import logging_setup
+import metrics
+import outbox as OB
+import profiling
+import response_cache
+import retry_policy
+import scheduler
+import storage
+import tracing
 
 
 load_dotenv()
@@ -21,9 +39,68 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
+API_POOL_SIZE = int(os.getenv('API_POOL_SIZE', http_client.POOL_MAXSIZE))
+API_CONNECT_TIMEOUT = float(
+    os.getenv('API_CONNECT_TIMEOUT', http_client.CONNECT_TIMEOUT)
+)
+API_READ_TIMEOUT = float(
+    os.getenv('API_READ_TIMEOUT', http_client.READ_TIMEOUT)
+)
+API_DNS_TTL = int(os.getenv('API_DNS_TTL', http_client.DNS_TTL))
+API_RATE_LIMIT = float(os.getenv('API_RATE_LIMIT', http_client.RATE_LIMIT))
+API_BREAKER_THRESHOLD = int(
+    os.getenv('API_BREAKER_THRESHOLD', breaker.FAILURE_THRESHOLD)
+)
+API_BREAKER_RESET = float(
+    os.getenv('API_BREAKER_RESET', breaker.RESET_TIMEOUT)
+)
+API_CASSETTE_RECORD = os.getenv('API_CASSETTE_RECORD')
+API_CASSETTE_REPLAY = os.getenv('API_CASSETTE_REPLAY')
+API_CASSETTE_SPEED = float(os.getenv('API_CASSETTE_SPEED', 1))
+API_CASSETTE_STRICT = os.getenv('API_CASSETTE_STRICT', '').lower() in (
+    '1', 'true', 'yes'
+)
+API_CLIENT = None
+API_STREAM_JSON = os.getenv('API_STREAM_JSON', '').lower() in (
+    '1', 'true', 'yes'
+)
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 16 * 1024))
+API_SKIP_UNCHANGED = os.getenv('API_SKIP_UNCHANGED', '1').lower() in (
+    '1', 'true', 'yes'
+)
+RESPONSE_CACHE = response_cache.ResponseCache(
+    int(os.getenv('RESPONSE_CACHE_SIZE', response_cache.MAXSIZE))
+)
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0))
+TRACE_FILE = os.getenv('TRACE_FILE', 'traces.jsonl')
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+PROFILE_ITERATIONS = int(
+    os.getenv('PROFILE_ITERATIONS', profiling.ITERATIONS)
+)
+
+LOG_JSON = os.getenv('LOG_JSON', '').lower() in ('1', 'true', 'yes')
+
+STATE_STORE = os.getenv('STATE_STORE', 'sqlite:///homework_bot.db')
+DEDUP_INDEX_SIZE = int(os.getenv('DEDUP_INDEX_SIZE', dedup.INDEX_SIZE))
+ERROR_WINDOW = int(os.getenv('ERROR_WINDOW', error_digest.WINDOW))
+ERROR_DIGEST_INTERVAL = int(
+    os.getenv('ERROR_DIGEST_INTERVAL', error_digest.DIGEST_INTERVAL)
+)
+ERROR_FINGERPRINTS = int(
+    os.getenv('ERROR_FINGERPRINTS', error_digest.MAXSIZE)
+)
+
 
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -32,6 +109,16 @@ HOMEWORK_VERDICTS = {
 }
 
 
+def configure_telegram_api():
+    """Направляет запросы telebot на TELEGRAM_API_URL, если он задан.
+
+    Адрес - шаблон вида http://host:port/bot{0}/{1}, где {0} - токен,
+    {1} - метод Bot API.
+    """
+    if TELEGRAM_API_URL:
+        apihelper.API_URL = TELEGRAM_API_URL
+
+
 def check_tokens():
     """Проверяет доступность переменных окружения."""
     result = {
@@ -45,7 +132,7 @@ def check_tokens():
             errors += [key]
             logger.critical(
                 'Отсутствует обязательная переменная окружения: '
-                f'{key}. Программа принудительно остановлена.'
+                '%s. Программа принудительно остановлена.', key
             )
     if errors:
         raise EX.ErrorCheckTokens(
@@ -55,24 +142,129 @@ def check_tokens():
 
 def send_message(bot, message):
     """Отправляет сообщение в Telegram-чат, опр-й переменной окружения."""
+    return send_message_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+@tracing.traced('send_message')
+@metrics.timed('send_message')
+def send_message_to_chat(bot, chat_id, message):
+    """Отправляет сообщение в указанный Telegram-чат."""
     try:
         logger.debug('Начало отправки сообщения в Telegram')
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(chat_id, message)
         logger.debug('удачная отправка сообщения в Telegram')
         return True
     except (apihelper.ApiException, requests.RequestException) as error:
+        metrics.STAGE_ERRORS.inc('send_message', type(error).__name__)
         logger.error(error, exc_info=True)
         return False
 
 
+def make_headers(token):
+    """Формирует заголовки запроса к API для токена практикума."""
+    return {'Authorization': f'OAuth {token}'}
+
+
+def configure_api_client(**kwargs):
+    """Создаёт общий HTTP-клиент API с настройками из окружения.
+
+    При заданном API_CASSETTE_REPLAY ответы берутся из кассеты вместо
+    сети, при API_CASSETTE_RECORD - записываются в кассету.
+    """
+    global API_CLIENT
+    options = {
+        'pool_maxsize': API_POOL_SIZE,
+        'connect_timeout': API_CONNECT_TIMEOUT,
+        'read_timeout': API_READ_TIMEOUT,
+        'dns_ttl': API_DNS_TTL,
+        'rate_limit': API_RATE_LIMIT,
+        'breaker_threshold': API_BREAKER_THRESHOLD,
+        'breaker_reset': API_BREAKER_RESET,
+    }
+    options.update(kwargs)
+    if API_CLIENT is not None:
+        API_CLIENT.close()
+    if API_CASSETTE_REPLAY:
+        API_CLIENT = cassette.ReplayClient(
+            API_CASSETTE_REPLAY, API_CASSETTE_SPEED,
+            strict=API_CASSETTE_STRICT
+        )
+    elif API_CASSETTE_RECORD:
+        API_CLIENT = cassette.RecordingClient(
+            http_client.PracticumClient(**options),
+            cassette.CassetteRecorder(API_CASSETTE_RECORD)
+        )
+    else:
+        API_CLIENT = http_client.PracticumClient(**options)
+    return API_CLIENT
+
+
+def get_api_client():
+    """Возвращает общий HTTP-клиент API, создавая его при необходимости."""
+    if API_CLIENT is None:
+        return configure_api_client()
+    return API_CLIENT
+
+
+def api_budget_usage():
+    """Возвращает использование бюджета запросов для метрик."""
+    if API_CLIENT is None:
+        return {}
+    return {
+        (field,): value
+        for field, value in API_CLIENT.budget.snapshot().items()
+    }
+
+
+def start_metrics_server():
+    """Запускает эндпоинт метрик, если задан порт METRICS_PORT."""
+    metrics.API_BUDGET.set_function(api_budget_usage)
+    if not METRICS_PORT:
+        return None
+    return metrics.serve(METRICS_PORT)
+
+
+def stop_metrics_server(server):
+    """Останавливает эндпоинт метрик, запущенный start_metrics_server."""
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
 def get_api_answer(timestamp):
     """Делает запрос к единственному эндпоинту API-сервиса."""
+    return request_api_answer(timestamp, HEADERS)
+
+
+def get_api_stream(timestamp):
+    """Открывает ответ API для потокового разбора, см. open_api_stream."""
+    return open_api_stream(timestamp, HEADERS)
+
+
+def request_statuses(timestamp, headers):
+    """Запрашивает статусы домашек и возвращает ответ API словарём.
+
+    При API_STREAM_JSON тело разбирается потоково, иначе целиком.
+    """
+    if API_STREAM_JSON:
+        return request_api_stream(timestamp, headers)
+    return request_api_answer(timestamp, headers)
+
+
+def fetch_statuses(timestamp, headers, stream=False):
+    """Выполняет запрос статусов и возвращает успешный ответ API."""
     try:
         logger.debug('Начало запроса к эндпоинту API-сервиса')
-        homework_statuses = requests.get(
+        homework_statuses = get_api_client().get(
             ENDPOINT,
-            headers=HEADERS,
-            params={'from_date': timestamp}
+            headers=headers,
+            params={'from_date': timestamp},
+            stream=stream
+        )
+    except http_client.CircuitOpenError as error:
+        raise EX.ErrorCircuitOpen(
+            f'запрос c from_date "{timestamp}" пропущен: {error}',
+            error.retry_after
         )
     except requests.RequestException as error:
         raise EX.ErrorRequestGetApi(
@@ -81,12 +273,81 @@ def get_api_answer(timestamp):
         )
 
     if homework_statuses.status_code == HTTPStatus.OK:
-        return homework_statuses.json()
-    raise EX.ErrorRequestGetApiHttpsStatus(
-        'Ошибка статуса при запросе к эндпоинту API-сервиса'
+        return homework_statuses
+    if stream:
+        homework_statuses.close()
+    raise api_status_error(homework_statuses)
+
+
+@tracing.traced('poll')
+@metrics.timed('poll')
+def request_api_answer(timestamp, headers):
+    """Делает запрос к эндпоинту API-сервиса с заголовками аккаунта.
+
+    Если тело ответа совпало с прошлым телом аккаунта, JSON не
+    разбирается: ответ собирается из RESPONSE_CACHE.
+    """
+    metrics.POLLS.inc()
+    homework_statuses = fetch_statuses(timestamp, headers)
+    body = getattr(homework_statuses, 'content', None)
+    with tracing.span('json_decode'):
+        if not API_SKIP_UNCHANGED or not isinstance(body, bytes):
+            return homework_statuses.json()
+        return RESPONSE_CACHE.decode(
+            headers.get('Authorization'), body, homework_statuses.json
+        )
+
+
+@contextmanager
+def open_api_stream(timestamp, headers):
+    """Запрашивает статусы домашек без чтения тела ответа.
+
+    Блок with получает json_stream.HomeworkStream: домашки разбираются
+    по мере получения тела. Спан и замер этапа poll длятся до конца
+    блока, то есть до конца разбора ответа, а соединение
+    освобождается при выходе из блока.
+    """
+    with tracing.span('poll'), metrics.stage_timer('poll'):
+        metrics.POLLS.inc()
+        homework_statuses = fetch_statuses(timestamp, headers, stream=True)
+        try:
+            yield json_stream.HomeworkStream(
+                http_client.iter_body(homework_statuses, STREAM_CHUNK_SIZE)
+            )
+        finally:
+            homework_statuses.close()
+
+
+def request_api_stream(timestamp, headers):
+    """Запрашивает статусы домашек с потоковым разбором ответа.
+
+    Возвращает словарь, как request_api_answer, но тело не держится
+    в памяти целиком, а разбирается по кускам STREAM_CHUNK_SIZE.
+    """
+    with open_api_stream(timestamp, headers) as stream:
+        homeworks = list(stream)
+    return dict(stream.fields, homeworks=homeworks)
+
+
+def api_status_error(response):
+    """Подбирает исключение по классу статус кода ответа API."""
+    status = response.status_code
+    message = (
+        f'Ошибка статуса {status} при запросе к эндпоинту API-сервиса'
     )
+    if status in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+        return EX.ErrorRequestGetApiUnauthorized(message)
+    if status == HTTPStatus.TOO_MANY_REQUESTS:
+        return EX.ErrorRequestGetApiTooManyRequests(
+            message, http_client.retry_after(response)
+        )
+    if status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        return EX.ErrorRequestGetApiServer(message)
+    return EX.ErrorRequestGetApiHttpsStatus(message)
 
 
+@tracing.traced('check_response')
+@metrics.timed('check_response')
 def check_response(response):
     """Проверяет ответ API на соответствие документации из урока."""
     if not isinstance(response, dict):
@@ -106,6 +367,29 @@ def check_response(response):
     return homeworks
 
 
+def is_unchanged(response, validated):
+    """Проверяет, что homeworks ответа - уже проверенный список validated.
+
+    Тот же объект списка возвращает RESPONSE_CACHE, когда тело ответа
+    не изменилось, поэтому проверять и рассылать его повторно не нужно.
+    """
+    return (
+        validated is not None
+        and isinstance(response, dict)
+        and response.get('homeworks') is validated
+    )
+
+
+PARSE_ERRORS = (
+    EX.ErrorDictParseStatus,
+    EX.ErrorDictKeyParseStatus,
+    EX.ErrorDictKeyStatusInParseStatus,
+    EX.ErrorDictKeyHomeworkNameInParseStatus,
+)
+
+
+@tracing.traced('parse_status')
+@metrics.timed('parse_status')
 def parse_status(homework):
     """Извлекает из инф-ю о конкретной домашней работе статус этой работы."""
     if not isinstance(homework, dict):
@@ -131,45 +415,329 @@ def parse_status(homework):
             '"{}". {}'.format(homework_name, verdict))
 
 
+def parse_status_or_skip(homework, errors):
+    """Возвращает сообщение о статусе домашки или None для битой домашки.
+
+    Ошибка разбора одной домашки не прерывает рассылку остальных: она
+    логируется, учитывается в метрике пропущенных домашек и
+    добавляется в список errors.
+    """
+    try:
+        return parse_status(homework)
+    except PARSE_ERRORS as error:
+        logger.error('Домашка пропущена: %s: %r', error, homework)
+        metrics.SKIPPED_HOMEWORKS.inc(type(error).__name__)
+        errors.append(error)
+        return None
+
+
+def outbox_new_statuses(homeworks, index, account, chat_id, outbox, errors):
+    """Сохраняет в outbox сообщения о новых статусах домашек.
+
+    Сообщения возвращаются по одному, как только домашка разобрана,
+    поэтому отправлять их можно синхронно (deliver_homeworks) или через
+    очередь доставки (PollingEngine). Уже отправленные статусы
+    пропускаются, ошибки разбора домашек добавляются в errors.
+    """
+    for homework in homeworks:
+        message = parse_status_or_skip(homework, errors)
+        if message is None:
+            continue
+        if index.is_delivered(account, homework):
+            logger.debug(
+                'Статус домашки уже был отправлен', extra={'account': chat_id}
+            )
+            continue
+        outboxed = outbox.put(
+            account,
+            chat_id,
+            message,
+            OB.outbox_key(account, homework),
+            lag.parse_date(homework.get('date_updated'))
+        )
+        index.mark_delivered(account, homework)
+        if outboxed is not None:
+            yield outboxed
+
+
+@tracing.traced('deliver')
+def deliver_homeworks(bot, homeworks, index, account, outbox):
+    """Отправляет сообщения о новых статусах всех домашек из ответа API.
+
+    Каждое сообщение сначала сохраняется в outbox, поэтому неудачная
+    отправка будет повторена. Домашки с неразобранным статусом
+    пропускаются, возвращает список их ошибок.
+    """
+    errors = []
+    for outboxed in outbox_new_statuses(
+        homeworks, index, account, TELEGRAM_CHAT_ID, outbox, errors
+    ):
+        if send_message(bot, outboxed.text):
+            outbox.delivered(outboxed)
+        else:
+            outbox.failed(outboxed)
+    return errors
+
+
+def make_error_suppressor(clock=time.monotonic, maxsize=None):
+    """Создаёт подавитель повторных уведомлений об ошибках.
+
+    maxsize - число хранимых отпечатков ошибок, по умолчанию
+    ERROR_FINGERPRINTS.
+    """
+    return error_digest.ErrorSuppressor(
+        ERROR_WINDOW, ERROR_DIGEST_INTERVAL,
+        maxsize=ERROR_FINGERPRINTS if maxsize is None else maxsize,
+        clock=clock
+    )
+
+
+def make_profiler():
+    """Создаёт профилировщик по сигналам SIGUSR1/SIGUSR2."""
+    profiler = profiling.SignalProfiler(PROFILE_DIR, PROFILE_ITERATIONS)
+    profiler.install()
+    return profiler
+
+
+def send_error_digest(bot, suppressor):
+    """Отправляет сводку подавленных ошибок, если подошло её время."""
+    digest = suppressor.digests().get(None)
+    if digest:
+        send_message(bot, digest)
+
+
+class PollState:
+    """Состояние опроса одного аккаунта и выбор паузы до следующего.
+
+    Общее ядро Poller и PollingEngine: проверяет ответы API, хранит
+    точку опроса в store под ключом account, статус аккаунта и счётчик
+    ошибок подряд, применяет к ошибкам правила retry_policy. Запросов
+    ядро не делает и само не ждёт: время берётся из clock, а паузу
+    next_delay() выдерживает вызывающий код - time.sleep в main(),
+    расписание движка или виртуальные часы simulation.py. Без policy
+    опрос идёт раз в RETRY_PERIOD без разброса. Уведомления об ошибках
+    подавляются suppressor в разрезе scope, chat_id попадает в логи.
+    """
+
+    def __init__(self, store, account, suppressor, clock=time.time,
+                 policy=None, scope=None, chat_id=None):
+        """Начинает опрос с сохранённой точки или с текущего времени.
+
+        Начальная точка сразу сохраняется, чтобы после перезапуска
+        без новых статусов опрос продолжился с неё, а не с нового
+        текущего времени.
+        """
+        self.store = store
+        self.account = account
+        self.suppressor = suppressor
+        self.policy = policy if policy is not None else (
+            scheduler.fixed_policy(RETRY_PERIOD)
+        )
+        self.scope = scope
+        self.extra = {} if chat_id is None else {'account': chat_id}
+        self.status = None
+        self.attempts = 0
+        self.retry = None
+        self.stopped = False
+        self.validated = None
+        self.timestamp = store.get_checkpoint(account)
+        if self.timestamp is None:
+            self.checkpoint(int(clock()))
+
+    def accept(self, response):
+        """Проверяет ответ API и возвращает домашки для рассылки.
+
+        Для ответа, не изменившегося с прошлого опроса, и для ответа
+        без домашек возвращает пустой список.
+        """
+        if is_unchanged(response, self.validated):
+            logger.debug(
+                'Ответ API не изменился, проверка пропущена',
+                extra=self.extra
+            )
+            return []
+        homeworks = check_response(response)
+        if homeworks:
+            self.status = self.policy.account_status(homeworks, self.status)
+        else:
+            logger.debug('Пустое сообщение не отправлено', extra=self.extra)
+        self.validated = homeworks
+        return homeworks
+
+    def delivered(self, response, homeworks, errors):
+        """Завершает опрос после рассылки homeworks из ответа response.
+
+        Ошибка разбора пропущенной домашки выбрасывается после рассылки
+        остальных, чтобы к ней применилось правило повтора; счётчик
+        ошибок сбрасывается только после успешной рассылки.
+        """
+        if homeworks:
+            self.checkpoint(response.get('current_date', self.timestamp))
+        if errors:
+            raise errors[0]
+        self.attempts = 0
+
+    def checkpoint(self, timestamp):
+        """Сохраняет точку, с которой продолжится опрос."""
+        self.timestamp = timestamp
+        self.store.set_checkpoint(self.account, timestamp)
+
+    def failed(self, error):
+        """Применяет к ошибке опроса правило повтора из retry_policy.
+
+        Возвращает текст уведомления об ошибке или None, если сообщать
+        о ней не нужно. Пока цепь к API разомкнута, опрос откладывается
+        до пробного запроса без учёта ошибки. После постоянной ошибки
+        опрос аккаунта останавливается: stopped становится True.
+        """
+        self.validated = None
+        if (
+            isinstance(error, EX.ErrorCircuitOpen)
+            and error.retry_after is not None
+        ):
+            logger.debug(
+                'Опрос аккаунта отложен: %s', error, extra=self.extra
+            )
+            self.retry = error.retry_after
+            return None
+        message = f'Возникла ошибка {error}'
+        logger.error(message, extra=self.extra)
+        self.attempts += 1
+        rule = retry_policy.rule_for(error)
+        self.retry = retry_policy.retry_delay(error, self.attempts)
+        if not rule.retryable:
+            logger.critical(
+                'Опрос аккаунта остановлен: %s', error, extra=self.extra
+            )
+            self.stopped = True
+        elif rule.exhausted(self.attempts):
+            logger.critical(
+                'Ошибка не устраняется повтором: %s', error, extra=self.extra
+            )
+        if rule.notify and self.suppressor.should_notify(error, self.scope):
+            return message
+        return None
+
+    def next_delay(self):
+        """Возвращает паузу до следующего опроса.
+
+        После ошибки это задержка повтора, иначе пауза по статусу
+        аккаунта; к обеим policy добавляет разброс.
+        """
+        if self.retry is not None:
+            delay, self.retry = self.retry, None
+            return self.policy.jittered(delay)
+        return self.policy.next_delay(self.status)
+
+
+class Poller(PollState):
+    """Опрос API для одного аккаунта по одной итерации за вызов.
+
+    iteration() не ждёт сама, а возвращает паузу до следующего опроса,
+    поэтому цикл можно прогонять и в реальном времени (main), и в
+    виртуальном (simulation.py). Ответы API берутся из fetch(timestamp),
+    по умолчанию get_api_answer; паузы и повторы выбирает PollState,
+    как в PollingEngine.
+    """
+
+    def __init__(self, bot, store, account, outbox, suppressor,
+                 fetch=None, clock=time.time, policy=None):
+        """Начинает опрос аккаунта account, см. PollState."""
+        super().__init__(store, account, suppressor, clock, policy)
+        self.bot = bot
+        self.outbox = outbox
+        self.fetch = fetch
+        self.index = dedup.DeliveryIndex(store, DEDUP_INDEX_SIZE)
+
+    def iteration(self):
+        """Опрашивает API, рассылает новые статусы и возвращает паузу."""
+        try:
+            with tracing.trace('poll_iteration', account=self.account):
+                if API_STREAM_JSON and self.fetch is None:
+                    self.poll_stream()
+                else:
+                    self.poll()
+        except Exception as error:
+            message = self.failed(error)
+            if message is not None:
+                send_message(self.bot, message)
+        finally:
+            send_error_digest(self.bot, self.suppressor)
+            self.store.flush()
+        return self.next_delay()
+
+    def poll(self):
+        """Получает ответ API целиком, проверяет и рассылает статусы."""
+        response = (self.fetch or get_api_answer)(self.timestamp)
+        homeworks = self.accept(response)
+        errors = []
+        if homeworks:
+            errors = deliver_homeworks(
+                self.bot, homeworks, self.index, self.account, self.outbox
+            )
+        self.delivered(response, homeworks, errors)
+
+    def poll_stream(self):
+        """Рассылает статусы по мере чтения ответа API.
+
+        Первое сообщение уходит до получения всего тела. Если ответ
+        оборвётся, уже доставленные статусы не повторятся: они отмечены
+        в индексе доставленных.
+        """
+        with get_api_stream(self.timestamp) as stream:
+            errors = deliver_homeworks(
+                self.bot, stream, self.index, self.account, self.outbox
+            )
+        if stream.count:
+            self.checkpoint(stream.fields.get('current_date', self.timestamp))
+        else:
+            logger.debug('Пустое сообщение не отправлено')
+        if errors:
+            raise errors[0]
+        self.attempts = 0
+
+
+def stop_on_sigterm(signum, frame):
+    """Завершает процесс по SIGTERM с выполнением блоков finally."""
+    raise SystemExit(128 + signum)
+
+
 def main():
     """Основная логика работы бота."""
     check_tokens()
+    configure_telegram_api()
     bot = TeleBot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    message_error = ''
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                message = parse_status(homeworks[0])
-                if send_message(bot, message):
-                    timestamp = response.get('current_date', timestamp)
-                    message_error = ''
-            else:
-                logger.debug('Пустое сообщение не отправлено')
-        except Exception as error:
-            message = f'Возникла ошибка {error}'
-            logger.error(message)
-            if message_error != message:
-                send_message(bot, message)
-                message_error = message
-        finally:
-            time.sleep(RETRY_PERIOD)
+    get_api_client().warm_up(ENDPOINT)
+    store = storage.open_state_store(STATE_STORE)
+    outbox = OB.Outbox(store)
+    retry_worker = OB.OutboxWorker(outbox, partial(send_message_to_chat, bot))
+    retry_worker.start()
+    metrics_server = start_metrics_server()
+    tracing.configure(TRACE_SAMPLE_RATE, TRACE_FILE)
+    profiler = make_profiler()
+    poller = Poller(
+        bot, store, storage.account_key(PRACTICUM_TOKEN), outbox,
+        make_error_suppressor()
+    )
+    try:
+        while True:
+            delay = poller.iteration()
+            profiler.tick()
+            if poller.stopped:
+                break
+            time.sleep(delay)
+    finally:
+        retry_worker.stop()
+        stop_metrics_server(metrics_server)
+        tracing.close()
+        profiler.uninstall()
+        store.close()
 
 
 if __name__ == '__main__':
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s'
-    )
-    handler = RotatingFileHandler(
-        'main.log',
-        maxBytes=50000000,
-        backupCount=5,
-        encoding='utf-8'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    main()
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+    listener = logging_setup.configure_logging('main.log', json_lines=LOG_JSON)
+    try:
+        main()
+    finally:
+        listener.stop()
@@ -0,0 +1,386 @@
+import logging
+import socket
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.poolmanager import PoolManager
+
+import breaker
+import metrics
+import ratelimit
+import tracing
+
+
+logger = logging.getLogger(__name__)
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+DNS_TTL = 300
+RATE_LIMIT = 10
+DEFAULT_RETRY_AFTER = 60
+
+
+def parse_retry_after(value, now=None):
+    """Переводит заголовок Retry-After в секунды ожидания.
+
+    Заголовок содержит либо число секунд, либо дату HTTP. Если значение
+    не удалось разобрать, возвращает None.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(retry_at.timestamp() - now, 0)
+
+
+class RequestBudget:
+    """Общий для всех аккаунтов бюджет запросов к API.
+
+    Ограничивает частоту запросов к эндпоинту token bucket'ом и ведёт
+    счётчики для метрик: сколько запросов пропущено, сколько из них
+    ждали и сколько секунд ожидания набралось.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, capacity=None):
+        self.bucket = ratelimit.TokenBucket(rate, capacity)
+        self.granted = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Дожидается разрешения на запрос."""
+        wait = self.bucket.reserve()
+        waited = 0.0
+        while wait:
+            time.sleep(wait)
+            waited += wait
+            wait = self.bucket.reserve()
+        with self._lock:
+            self.granted += 1
+            if waited:
+                self.throttled += 1
+                self.waited += waited
+
+    def pause(self, seconds):
+        """Приостанавливает запросы всех аккаунтов на seconds секунд."""
+        with self._lock:
+            self.rejected += 1
+        self.bucket.pause(seconds)
+
+    def snapshot(self):
+        """Возвращает текущее использование бюджета."""
+        tokens, paused_for = self.bucket.state()
+        with self._lock:
+            return {
+                'rate': self.bucket.rate,
+                'capacity': self.bucket.capacity,
+                'available': tokens,
+                'paused_for': paused_for,
+                'granted': self.granted,
+                'throttled': self.throttled,
+                'wait_seconds': self.waited,
+                'rejected': self.rejected,
+            }
+
+
+class DNSCache:
+    """Кэширует результаты socket.getaddrinfo на ttl секунд.
+
+    Глобальный socket.getaddrinfo не подменяется: через кэш резолвят
+    имена только соединения CachedDNSAdapter, которому он передан.
+    """
+
+    def __init__(self, ttl=DNS_TTL):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, *args, **kwargs):
+        """Возвращает адреса из кэша либо резолвит и запоминает их."""
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        with tracing.span('dns_lookup', host=str(args[0] if args else '')):
+            result = socket.getaddrinfo(*args, **kwargs)
+        with self._lock:
+            self._cache[key] = (now + self.ttl, result)
+        return result
+
+    def addresses(self, host, port):
+        """Возвращает IP-адреса хоста для TCP-соединения без повторов."""
+        addresses = []
+        infos = self.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        for *_, sockaddr in infos:
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        return addresses
+
+    def clear(self):
+        """Очищает кэш."""
+        with self._lock:
+            self._cache.clear()
+
+
+class CachedDNSConnectionMixin:
+    """Примесь к соединению urllib3, резолвящая хост через dns_cache.
+
+    Соединение открывается по адресам из кэша по очереди, а имя хоста
+    по-прежнему используется для SNI и проверки сертификата.
+    """
+
+    def __init__(self, *args, dns_cache=None, **kwargs):
+        self.dns_cache = dns_cache
+        super().__init__(*args, **kwargs)
+
+    def _new_conn(self):
+        """Открывает сокет по первому доступному адресу хоста."""
+        host = self._dns_host
+        try:
+            addresses = self.dns_cache.addresses(host, self.port)
+        except OSError as error:
+            raise NewConnectionError(
+                self, f'Failed to establish a new connection: {error}'
+            )
+        error = NewConnectionError(
+            self, f'Failed to establish a new connection: no address {host}'
+        )
+        for address in addresses:
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except ConnectTimeoutError as connect_error:
+                error = connect_error
+            finally:
+                self._dns_host = host
+        raise error
+
+
+class CachedDNSHTTPConnection(CachedDNSConnectionMixin, HTTPConnection):
+    """HTTP-соединение с резолвом хоста через DNSCache."""
+
+
+class CachedDNSHTTPSConnection(CachedDNSConnectionMixin, HTTPSConnection):
+    """HTTPS-соединение с резолвом хоста через DNSCache."""
+
+
+CACHED_DNS_CONNECTIONS = {
+    'http': CachedDNSHTTPConnection,
+    'https': CachedDNSHTTPSConnection,
+}
+
+
+class CachedDNSPoolManager(PoolManager):
+    """PoolManager, пулы которого открывают соединения через dns_cache."""
+
+    def __init__(self, dns_cache, **kwargs):
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        """Создаёт пул с соединениями, резолвящими хост через кэш."""
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.ConnectionCls = CACHED_DNS_CONNECTIONS[scheme]
+        pool.conn_kw['dns_cache'] = self.dns_cache
+        return pool
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    """HTTPAdapter, соединения которого резолвят хост через dns_cache."""
+
+    def __init__(self, dns_cache, **kwargs):
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False,
+                         **pool_kwargs):
+        """Создаёт CachedDNSPoolManager вместо PoolManager."""
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = CachedDNSPoolManager(
+            self.dns_cache, num_pools=connections, maxsize=maxsize,
+            block=block, strict=True, **pool_kwargs
+        )
+
+
+def retry_after(response):
+    """Возвращает паузу в секундах, запрошенную сервером в ответе 429."""
+    headers = getattr(response, 'headers', None) or {}
+    seconds = parse_retry_after(headers.get('Retry-After'))
+    return DEFAULT_RETRY_AFTER if seconds is None else seconds
+
+
+def request_size(request):
+    """Оценивает размер подготовленного запроса в байтах."""
+    if request is None:
+        return 0
+    size = len(request.method or '') + len(request.url or '')
+    for name, value in request.headers.items():
+        size += len(name) + len(value) + 4
+    body = request.body or b''
+    return size + len(body)
+
+
+def wire_size(response):
+    """Возвращает число байт тела, прочитанных из сети, до распаковки.
+
+    Для ответов без соединения (например, из кассеты) возвращает 0.
+    """
+    tell = getattr(getattr(response, 'raw', None), 'tell', None)
+    if tell is None:
+        return 0
+    try:
+        return tell()
+    except (OSError, ValueError):
+        return 0
+
+
+def record_exchange(response, streamed=False):
+    """Учитывает ответ API в метриках трафика и статус кодов.
+
+    Тело потокового ответа учитывает iter_body по мере чтения.
+    """
+    metrics.REQUEST_BYTES.inc(
+        amount=request_size(getattr(response, 'request', None))
+    )
+    if not streamed:
+        metrics.RESPONSE_BYTES.inc(
+            amount=len(getattr(response, 'content', None) or b'')
+        )
+        metrics.RESPONSE_WIRE_BYTES.inc(amount=wire_size(response))
+    metrics.RESPONSES.inc(response.status_code)
+
+
+def iter_body(response, chunk_size):
+    """Отдаёт тело ответа кусками и закрывает ответ после чтения."""
+    try:
+        for chunk in response.iter_content(chunk_size):
+            metrics.RESPONSE_BYTES.inc(amount=len(chunk))
+            yield chunk
+    finally:
+        metrics.RESPONSE_WIRE_BYTES.inc(amount=wire_size(response))
+        response.close()
+
+
+class CircuitOpenError(requests.RequestException):
+    """Запрос не выполнен: цепь к эндпоинту разомкнута."""
+
+    def __init__(self, retry_after):
+        super().__init__(
+            f'Эндпоинт недоступен, повтор через {retry_after:.0f} с'
+        )
+        self.retry_after = retry_after
+
+
+class PracticumClient:
+    """HTTP-клиент API практикума с пулом keep-alive соединений.
+
+    Все запросы идут через общую requests.Session, поэтому TCP и TLS
+    соединения переиспользуются между опросами и аккаунтами. Частоту
+    запросов ограничивает общий бюджет; ответ 429 приостанавливает
+    его на время из Retry-After. Сетевые ошибки и ответы 5xx считает
+    общий автомат размыкания цепи. При dns_ttl имена резолвятся через
+    кэш DNSCache только в соединениях этого клиента.
+    """
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, dns_ttl=DNS_TTL,
+                 rate_limit=RATE_LIMIT,
+                 breaker_threshold=breaker.FAILURE_THRESHOLD,
+                 breaker_reset=breaker.RESET_TIMEOUT):
+        self.timeout = (connect_timeout, read_timeout)
+        self.budget = RequestBudget(rate_limit)
+        self.breaker = breaker.CircuitBreaker(
+            breaker_threshold, breaker_reset
+        )
+        self.session = requests.Session()
+        self.dns_cache = DNSCache(dns_ttl) if dns_ttl else None
+        pool_kwargs = dict(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False
+        )
+        if self.dns_cache is None:
+            adapter = HTTPAdapter(**pool_kwargs)
+        else:
+            adapter = CachedDNSAdapter(self.dns_cache, **pool_kwargs)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, headers=None, params=None, stream=False):
+        """Выполняет GET-запрос через пул соединений в рамках бюджета.
+
+        При разомкнутой цепи сразу выбрасывает CircuitOpenError. При
+        stream=True тело ответа не читается до обращения к нему.
+        """
+        return self._send(
+            self.session.get, url, stream,
+            headers=headers, params=params
+        )
+
+    def _send(self, send, url, stream=False, **kwargs):
+        """Выполняет запрос send с учётом цепи, бюджета и метрик."""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.remaining())
+        with tracing.span('budget_wait'):
+            self.budget.acquire()
+        try:
+            with tracing.span('http_request') as request_span:
+                response = send(
+                    url, timeout=self.timeout, stream=stream, **kwargs
+                )
+                request_span.set_attribute(
+                    'http.status_code', response.status_code
+                )
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        record_exchange(response, stream)
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            self.budget.pause(retry_after(response))
+        return response
+
+    def warm_up(self, url):
+        """Заранее резолвит имя хоста и открывает соединение с ним.
+
+        Для этого отправляется HEAD-запрос: он тратит бюджет и
+        учитывается автоматом цепи, как обычные запросы, но не
+        получает тела ответа. Ошибки прогрева только логируются:
+        первый настоящий запрос повторит попытку соединения.
+        """
+        try:
+            self._send(self.session.head, url)
+            logger.debug(
+                'Соединение с %s установлено заранее', urlsplit(url).netloc
+            )
+        except requests.RequestException as error:
+            logger.warning('Не удалось прогреть соединение: %s', error)
+
+    def close(self):
+        """Закрывает соединения пула."""
+        self.session.close()
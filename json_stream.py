@@ -0,0 +1,132 @@
+import codecs
+import json
+
+import exceptions as EX
+
+
+WHITESPACE = ' \t\n\r'
+DECODER = json.JSONDecoder()
+
+
+class HomeworkStream:
+    """Потоковый разбор ответа API вида {"homeworks": [...], ...}.
+
+    Итерация отдаёт домашки из списка homeworks по одной по мере чтения
+    тела из chunks (итерируемого по кускам bytes), поэтому в памяти
+    держатся только текущая домашка и непрочитанный остаток буфера.
+    Остальные поля ответа, например current_date, попадают в fields
+    по мере разбора; count - число отданных домашек. Нарушения
+    структуры ответа вызывают те же исключения, что и check_response,
+    ошибки синтаксиса - json.JSONDecodeError.
+    """
+
+    def __init__(self, chunks):
+        self.fields = {}
+        self.count = 0
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Дочитывает кусок тела в буфер; в конце тела возвращает False."""
+        if self._eof:
+            return False
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._decoder.decode(b'', final=True)
+            return False
+        self._buffer += self._decoder.decode(chunk)
+        return True
+
+    def _peek(self):
+        """Пропускает пробелы и возвращает следующий символ или ''."""
+        while True:
+            while (
+                self._pos < len(self._buffer)
+                and self._buffer[self._pos] in WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _error(self, message):
+        """Возвращает ошибку синтаксиса в текущей позиции."""
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def _separator(self, closing):
+        """Читает запятую или closing; возвращает True после closing."""
+        char = self._peek()
+        if char not in (',', closing):
+            raise self._error(f'ожидался символ "," или "{closing}"')
+        self._pos += 1
+        return char == closing
+
+    def _value(self):
+        """Разбирает следующее значение JSON целиком."""
+        self._peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Значение в конце буфера (например, число) могло
+            # оборваться на границе куска.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _homeworks(self):
+        """Отдаёт элементы списка homeworks по одному."""
+        self._pos += 1
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            homework = self._value()
+            self.count += 1
+            yield homework
+            if self._separator(']'):
+                return
+
+    def __iter__(self):
+        if self._peek() != '{':
+            raise EX.ErrorResponseNotDict('В response находится не dict')
+        self._pos += 1
+        found = False
+        closed = self._peek() == '}'
+        if closed:
+            self._pos += 1
+        while not closed:
+            key = self._value()
+            if self._peek() != ':':
+                raise self._error('ожидался символ ":"')
+            self._pos += 1
+            if key != 'homeworks':
+                self.fields[key] = self._value()
+            elif self._peek() == '[':
+                found = True
+                yield from self._homeworks()
+            elif self._value() is None:
+                break
+            else:
+                raise EX.ErrorResponseNotList(
+                    'Значение словаря response с ключом "homeworks"'
+                    ' не является list'
+                )
+            closed = self._separator('}')
+        if not found:
+            raise EX.ErrorResponseDictKey(
+                'Словарь response не содержит ключ "homeworks"'
+            )
+        if self._peek():
+            raise self._error('лишние данные после ответа')
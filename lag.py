@@ -0,0 +1,116 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 1000
+GLOBAL_WINDOW = 10000
+MAX_ACCOUNTS = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def parse_date(value):
+    """Переводит date_updated из ответа API в unix-время.
+
+    Ожидается дата ISO 8601, например 2021-04-11T10:31:09Z. Если
+    значение не удалось разобрать, возвращает None.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(
+            value.replace('Z', '+00:00')
+        ).timestamp()
+    except ValueError:
+        return None
+
+
+def percentile(values, quantile):
+    """Возвращает перцентиль отсортированного списка методом nearest rank."""
+    if not values:
+        return None
+    rank = max(math.ceil(quantile * len(values)), 1)
+    return values[rank - 1]
+
+
+class LagTracker:
+    """Задержка доставки уведомлений от проверки работы до Telegram.
+
+    Задержка - время доставки минус date_updated домашки. Для каждого
+    аккаунта хранятся последние window значений, для всех вместе -
+    последние global_window; по ним считаются перцентили. Аккаунты
+    хранятся в LRU размера max_accounts.
+    """
+
+    def __init__(self, window=WINDOW, global_window=GLOBAL_WINDOW,
+                 max_accounts=MAX_ACCOUNTS, quantiles=QUANTILES):
+        self.window = window
+        self.max_accounts = max_accounts
+        self.quantiles = quantiles
+        self._global = deque(maxlen=global_window)
+        self._accounts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, account, origin, delivered_at=None):
+        """Учитывает доставку уведомления о статусе с временем origin.
+
+        Возвращает задержку в секундах или None, если origin неизвестен.
+        """
+        if origin is None:
+            return None
+        delivered_at = time.time() if delivered_at is None else delivered_at
+        lag = max(delivered_at - origin, 0)
+        account = str(account)
+        with self._lock:
+            self._global.append(lag)
+            values = self._accounts.get(account)
+            if values is None:
+                values = self._accounts[account] = deque(maxlen=self.window)
+                if len(self._accounts) > self.max_accounts:
+                    self._accounts.popitem(last=False)
+            self._accounts.move_to_end(account)
+            values.append(lag)
+        metrics.NOTIFICATION_LAG.observe(lag)
+        logger.info(
+            'Уведомление доставлено через %.0f с после проверки', lag,
+            extra={'account': account, 'lag': lag}
+        )
+        return lag
+
+    def percentiles(self, account=None):
+        """Возвращает перцентили задержки аккаунта или всех аккаунтов."""
+        with self._lock:
+            if account is None:
+                values = list(self._global)
+            else:
+                values = list(self._accounts.get(str(account), ()))
+        values.sort()
+        return {
+            quantile: percentile(values, quantile)
+            for quantile in self.quantiles
+        }
+
+    def samples(self):
+        """Возвращает перцентили для метрик: {(account, quantile): lag}.
+
+        Перцентили по всем аккаунтам отдаются с account="all".
+        """
+        with self._lock:
+            accounts = list(self._accounts)
+        result = {}
+        for account in [None] + accounts:
+            for quantile, value in self.percentiles(account).items():
+                if value is not None:
+                    result[(account or 'all', quantile)] = value
+        return result
+
+
+LAGS = LagTracker()
+metrics.NOTIFICATION_LAG_QUANTILES.set_function(LAGS.samples)
@@ -0,0 +1,93 @@
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+MAX_BYTES = 50000000
+BACKUP_COUNT = 5
+QUEUE_SIZE = 100000
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+QUIET_LOGGERS = ('urllib3', 'TeleBot')
+
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord(
+    '', logging.INFO, '', 0, '', (), None
+))) | {'message', 'asctime', 'taskName'}
+
+
+class LazyQueueHandler(QueueHandler):
+    """Передаёт записи в очередь, не форматируя их.
+
+    Стандартный QueueHandler подставляет аргументы в сообщение ещё в
+    потоке, который пишет в лог. Здесь запись уходит в очередь как есть
+    и форматируется уже в потоке QueueListener. Аргументы записи должны
+    оставаться неизменными после вызова логгера.
+    """
+
+    def prepare(self, record):
+        """Возвращает запись без предварительного форматирования."""
+        return record
+
+    def enqueue(self, record):
+        """Кладёт запись в очередь, отбрасывая её при переполнении."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись как одну строку JSON.
+
+    Помимо времени, уровня, логгера и сообщения в строку попадают
+    дополнительные поля, переданные через extra, например account.
+    """
+
+    def format(self, record):
+        """Возвращает запись в виде строки JSON."""
+        data = {
+            'time': datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_logging(filename, level=logging.DEBUG, json_lines=False,
+                      max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+    """Настраивает запись логов в файл через фоновый поток.
+
+    Корневой логгер получает LazyQueueHandler, а запись в
+    RotatingFileHandler, включая ротацию файла, выполняет
+    QueueListener. Возвращает запущенный listener, который нужно
+    остановить при завершении программы.
+    """
+    log_queue = queue.Queue(QUEUE_SIZE)
+    file_handler = RotatingFileHandler(
+        filename,
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(
+        JsonFormatter() if json_lines else logging.Formatter(FORMAT)
+    )
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(LazyQueueHandler(log_queue))
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    listener = QueueListener(
+        log_queue, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    return listener
@@ -0,0 +1,397 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+LAG_BUCKETS = (
+    5, 15, 30, 60, 120, 300, 600, 900, 1200, 1800, 3600, 7200, 21600, 86400
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(labelnames, values):
+    """Возвращает метки в формате Prometheus: {name="value",...}."""
+    if not labelnames:
+        return ''
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n')
+        )
+        for name, value in zip(labelnames, values)
+    )
+    return '{' + ','.join(pairs) + '}'
+
+
+def format_value(value):
+    """Возвращает значение метрики в текстовом формате Prometheus."""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """Базовый класс метрики с метками.
+
+    Значения хранятся по кортежу значений меток labelnames в том же
+    порядке. Все изменения выполняются под блокировкой, поэтому метрику
+    можно обновлять из пула потоков и цикла событий одновременно.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f'{self.name}: ожидаются метки {self.labelnames}, '
+                f'получено {labels}'
+            )
+        return tuple(str(label) for label in labels)
+
+    def samples(self):
+        """Возвращает пары (суффикс имени и метки, значение)."""
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            (format_labels(self.labelnames, labels), value)
+            for labels, value in sorted(items)
+        ]
+
+    def render(self):
+        """Возвращает метрику в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for suffix, value in self.samples():
+            lines.append(f'{self.name}{suffix} {format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        """Увеличивает счётчик с метками labels на amount."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        """Возвращает текущее значение счётчика."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Значение, которое может как расти, так и уменьшаться.
+
+    Вместо явного set() значение можно вычислять при каждом чтении
+    функцией, переданной в set_function(). Функция возвращает число
+    или, для метрики с метками, словарь {кортеж меток: значение}.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = []
+
+    def set(self, value, *labels):
+        """Устанавливает значение с метками labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """Добавляет функцию, вычисляющую значения при чтении."""
+        with self._lock:
+            if function not in self._functions:
+                self._functions.append(function)
+
+    def remove_function(self, function):
+        """Убирает функцию, добавленную set_function()."""
+        with self._lock:
+            if function in self._functions:
+                self._functions.remove(function)
+
+    def samples(self):
+        """Возвращает значения, включая вычисленные функциями."""
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions)
+        for function in functions:
+            try:
+                result = function()
+            except Exception as error:
+                logger.warning(
+                    'Не удалось вычислить метрику %s: %s', self.name, error
+                )
+                continue
+            if not isinstance(result, dict):
+                result = {(): result}
+            for labels, value in result.items():
+                values[self._key(labels)] = value
+        return [
+            (format_labels(self.labelnames, labels), value)
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам с накопительными счётчиками."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        """Учитывает значение value в распределении с метками labels."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *labels):
+        """Возвращает контекстный менеджер, замеряющий время блока."""
+        return Timer(self, labels)
+
+    def count(self, *labels):
+        """Возвращает число учтённых значений."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    def render(self):
+        """Возвращает гистограмму в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self._lock:
+            items = sorted(
+                (labels, (list(counts), total))
+                for labels, (counts, total) in self._values.items()
+            )
+        for labels, (counts, total) in items:
+            cumulative = 0
+            bounds = self.buckets + (float('inf'),)
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                suffix = format_labels(
+                    self.labelnames + ('le',),
+                    labels + (format_value(float(bound)),)
+                )
+                lines.append(f'{self.name}_bucket{suffix} {cumulative}')
+            suffix = format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{suffix} {format_value(total)}')
+            lines.append(f'{self.name}_count{suffix} {cumulative}')
+        return '\n'.join(lines)
+
+
+class Timer:
+    """Замеряет время блока with и записывает его в гистограмму."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(
+            time.perf_counter() - self.started, *self.labels
+        )
+
+
+class Registry:
+    """Набор метрик, отдаваемых одним эндпоинтом."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Добавляет метрику в реестр и возвращает её."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Метрика {metric.name} уже существует')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        """Возвращает метрику по имени или None."""
+        return self._metrics.get(name)
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'homework_bot_stage_seconds',
+    'Длительность этапов обработки: poll, check_response, '
+    'parse_status, send_message.',
+    ('stage',)
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    'homework_bot_errors_total',
+    'Ошибки по этапам и классам исключений.',
+    ('stage', 'error')
+))
+SKIPPED_HOMEWORKS = REGISTRY.register(Counter(
+    'homework_bot_skipped_homeworks_total',
+    'Домашки из ответа API, статус которых не удалось разобрать.',
+    ('error',)
+))
+POLLS = REGISTRY.register(Counter(
+    'homework_bot_polls_total',
+    'Выполненные опросы API; polls/s считается как rate().'
+))
+REQUEST_BYTES = REGISTRY.register(Counter(
+    'homework_bot_http_request_bytes_total',
+    'Размер запросов к API практикума в байтах.'
+))
+RESPONSE_BYTES = REGISTRY.register(Counter(
+    'homework_bot_http_response_bytes_total',
+    'Размер тел ответов API практикума в байтах после распаковки.'
+))
+RESPONSE_WIRE_BYTES = REGISTRY.register(Counter(
+    'homework_bot_http_response_wire_bytes_total',
+    'Размер тел ответов API практикума в байтах, полученных по сети.'
+))
+UNCHANGED_RESPONSES = REGISTRY.register(Counter(
+    'homework_bot_unchanged_responses_total',
+    'Ответы API, совпавшие с предыдущим ответом аккаунта: разбор JSON '
+    'и проверка пропущены.'
+))
+UNCHANGED_BYTES = REGISTRY.register(Counter(
+    'homework_bot_unchanged_response_bytes_total',
+    'Размер тел ответов API, разбор которых пропущен, в байтах.'
+))
+RESPONSES = REGISTRY.register(Counter(
+    'homework_bot_http_responses_total',
+    'Ответы API практикума по статус коду.',
+    ('status',)
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'homework_bot_queue_depth',
+    'Глубина внутренних очередей.',
+    ('queue',)
+))
+NOTIFICATION_LAG = REGISTRY.register(Histogram(
+    'homework_bot_notification_lag_seconds',
+    'Задержка от date_updated домашки до доставки уведомления.',
+    buckets=LAG_BUCKETS
+))
+NOTIFICATION_LAG_QUANTILES = REGISTRY.register(Gauge(
+    'homework_bot_notification_lag_quantile_seconds',
+    'Перцентили задержки уведомлений по аккаунтам и в целом (all).',
+    ('account', 'quantile')
+))
+API_BUDGET = REGISTRY.register(Gauge(
+    'homework_bot_api_budget',
+    'Использование общего бюджета запросов к API.',
+    ('field',)
+))
+
+
+@contextmanager
+def stage_timer(stage):
+    """Замеряет длительность и ошибки этапа stage в блоке with.
+
+    Исключение учитывается в счётчике ошибок по имени класса и
+    пробрасывается дальше.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as error:
+        STAGE_ERRORS.inc(stage, type(error).__name__)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+
+def timed(stage):
+    """Декоратор: замеряет длительность и ошибки этапа stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдаёт метрики реестра сервера по GET /metrics."""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug('metrics: ' + format, *args)
+
+
+def serve(port, host='127.0.0.1', registry=REGISTRY):
+    """Запускает HTTP-эндпоинт метрик в фоновом потоке.
+
+    Возвращает сервер; для остановки нужно вызвать shutdown() и
+    server_close().
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    logger.info(
+        'Метрики доступны на http://%s:%s/metrics', *server.server_address
+    )
+    return server
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import lag
+
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 1
+BACKOFF_MAX = 300
+LEASE = 30
+BATCH_SIZE = 100
+POLL_INTERVAL = 1
+RETENTION = 7 * 24 * 3600
+PRUNE_INTERVAL = 3600
+
+OutboxMessage = namedtuple(
+    'OutboxMessage', ('id', 'chat_id', 'text', 'attempts', 'origin'),
+    defaults=(None,)
+)
+
+
+def outbox_key(account, homework):
+    """Возвращает ключ идемпотентности сообщения о статусе домашки."""
+    if 'id' not in homework:
+        return None
+    return '{}:{}:{}:{}'.format(
+        account,
+        homework['id'],
+        homework.get('status'),
+        homework.get('date_updated')
+    )
+
+
+class Outbox:
+    """Исходящие сообщения, сохранённые до отправки в Telegram.
+
+    Сообщение записывается в хранилище до первой попытки отправки и
+    удерживается за отправителем на lease секунд. Если отправка не
+    удалась или процесс упал, сообщение повторяется с экспоненциальной
+    задержкой от backoff_base до backoff_max секунд. Для сообщений
+    с известным временем проверки работы origin при доставке
+    учитывается задержка уведомления. Доставленные сообщения хранятся
+    retention секунд, их ключи всё это время защищают от повторов.
+    """
+
+    def __init__(self, store, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, lease=LEASE, clock=time.time,
+                 lags=lag.LAGS, retention=RETENTION,
+                 prune_interval=PRUNE_INTERVAL):
+        self.store = store
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._pruned_at = None
+        self.lags = lags
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def put(self, account, chat_id, text, key=None, origin=None):
+        """Сохраняет сообщение и возвращает его для немедленной отправки.
+
+        origin - unix-время проверки работы, о которой сообщение. Если
+        сообщение с таким key уже было сохранено, возвращает None.
+        """
+        with self._lock:
+            message_id = self.store.add_outbox(
+                account, chat_id, text, key, self.clock() + self.lease,
+                origin
+            )
+        if message_id is None:
+            return None
+        return OutboxMessage(message_id, str(chat_id), text, 0, origin)
+
+    def claim_due(self, limit=BATCH_SIZE):
+        """Забирает на отправку сообщения, срок повтора которых наступил."""
+        with self._lock:
+            now = self.clock()
+            messages = [
+                OutboxMessage(*row)
+                for row in self.store.due_outbox(now, limit)
+            ]
+            for message in messages:
+                self.store.update_outbox(
+                    message.id, message.attempts, now + self.lease
+                )
+        return messages
+
+    def delivered(self, message):
+        """Отмечает сообщение доставленным и учитывает его задержку."""
+        delivered_at = self.clock()
+        with self._lock:
+            self.store.mark_outbox_delivered(message.id, delivered_at)
+        self.lags.record(message.chat_id, message.origin, delivered_at)
+
+    def failed(self, message):
+        """Назначает повторную отправку сообщения с задержкой."""
+        attempts = message.attempts + 1
+        delay = min(
+            self.backoff_base * 2 ** (attempts - 1), self.backoff_max
+        )
+        logger.debug(
+            'Повторная отправка сообщения %s через %s с', message.id, delay
+        )
+        with self._lock:
+            self.store.update_outbox(
+                message.id, attempts, self.clock() + delay
+            )
+
+    def prune(self):
+        """Удаляет из хранилища доставленные сообщения старше retention.
+
+        Очистка выполняется не чаще раза в prune_interval секунд,
+        поэтому prune можно вызывать на каждом шаге цикла повторов.
+        Возвращает число удалённых сообщений.
+        """
+        now = self.clock()
+        if (
+            self._pruned_at is not None
+            and now - self._pruned_at < self.prune_interval
+        ):
+            return 0
+        self._pruned_at = now
+        with self._lock:
+            pruned = self.store.prune_outbox(now - self.retention)
+        if pruned:
+            logger.debug('Из outbox удалено доставленных: %s', pruned)
+        return pruned
+
+    def deliver(self, message, send):
+        """Отправляет сообщение функцией send(chat_id, text)."""
+        if send(message.chat_id, message.text):
+            self.delivered(message)
+            return True
+        self.failed(message)
+        return False
+
+    def deliver_due(self, send):
+        """Отправляет все сообщения, срок повтора которых наступил."""
+        return sum(
+            self.deliver(message, send) for message in self.claim_due()
+        )
+
+
+class OutboxWorker(threading.Thread):
+    """Фоновый поток, повторяющий отправку сообщений из outbox."""
+
+    def __init__(self, outbox, send, interval=POLL_INTERVAL):
+        super().__init__(name='outbox', daemon=True)
+        self.outbox = outbox
+        self.send = send
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        """Раз в interval секунд отправляет сообщения из outbox.
+
+        Заодно фиксирует накопленные записи хранилища и удаляет
+        старые доставленные сообщения.
+        """
+        while not self._stopped.wait(self.interval):
+            try:
+                self.outbox.deliver_due(self.send)
+                self.outbox.prune()
+                self.outbox.store.flush()
+            except Exception as error:
+                logger.error('Ошибка повтора отправки: %s', error)
+
+    def stop(self):
+        """Останавливает поток и дожидается его завершения."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,150 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import time
+import tracemalloc
+
+
+logger = logging.getLogger(__name__)
+
+ITERATIONS = 10
+TOP = 30
+TRACEMALLOC_FRAMES = 1
+FOCUS = 'homework.py'
+
+
+class SignalProfiler:
+    """Профилирование работающего процесса по сигналам.
+
+    SIGUSR1 запускает cProfile на iterations итераций цикла опроса
+    (итерацию отмечает вызов tick()); повторный SIGUSR1 останавливает
+    сессию раньше. Результат пишется в directory как .prof для pstats
+    и snakeviz и как текстовый отчёт: топ функций всего процесса и
+    отдельно функций из файла focus.
+
+    Первый SIGUSR2 включает tracemalloc и запоминает снимок памяти,
+    каждый следующий пишет в directory топ изменений относительно
+    предыдущего снимка.
+
+    cProfile видит только поток, в котором работает цикл опроса.
+    """
+
+    def __init__(self, directory='.', iterations=ITERATIONS, top=TOP,
+                 focus=FOCUS, clock=time.time):
+        self.directory = directory
+        self.iterations = iterations
+        self.top = top
+        self.focus = focus
+        self.clock = clock
+        self.profile = None
+        self.profiled_iterations = 0
+        self.snapshot = None
+        self._previous_handlers = {}
+
+    def install(self):
+        """Устанавливает обработчики SIGUSR1 и SIGUSR2, если они есть."""
+        handlers = {
+            'SIGUSR1': self.toggle_profile,
+            'SIGUSR2': self.dump_memory,
+        }
+        for name, handler in handlers.items():
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            self._previous_handlers[signum] = signal.signal(
+                signum, lambda signum, frame, handler=handler: handler()
+            )
+
+    def uninstall(self):
+        """Возвращает прежние обработчики и завершает активную сессию."""
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers = {}
+        if self.profile is not None:
+            self.stop_profile()
+
+    def _path(self, prefix, suffix):
+        """Возвращает путь файла отчёта с меткой времени."""
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.clock()))
+        return os.path.join(
+            self.directory, f'{prefix}-{stamp}-{os.getpid()}{suffix}'
+        )
+
+    def toggle_profile(self):
+        """Запускает сессию cProfile или досрочно завершает текущую."""
+        if self.profile is not None:
+            self.stop_profile()
+            return
+        self.profile = cProfile.Profile()
+        self.profiled_iterations = 0
+        self.profile.enable()
+        logger.info(
+            'Профилирование запущено на %s итераций', self.iterations
+        )
+
+    def tick(self):
+        """Отмечает итерацию цикла и завершает сессию после последней."""
+        if self.profile is None:
+            return
+        self.profiled_iterations += 1
+        if self.profiled_iterations >= self.iterations:
+            self.stop_profile()
+
+    def stop_profile(self):
+        """Останавливает cProfile и пишет результаты на диск.
+
+        Возвращает путь к текстовому отчёту.
+        """
+        profile, self.profile = self.profile, None
+        profile.disable()
+        path = self._path('profile', '.prof')
+        profile.dump_stats(path)
+        report = io.StringIO()
+        stats = pstats.Stats(profile, stream=report)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        report.write(
+            f'Итераций: {self.profiled_iterations}\n\n'
+            f'Функции из {self.focus}:\n'
+        )
+        stats.print_stats(self.focus, self.top)
+        report.write('\nВесь процесс:\n')
+        stats.print_stats(self.top)
+        report_path = path[:-len('.prof')] + '.txt'
+        with open(report_path, 'w', encoding='utf-8') as file:
+            file.write(report.getvalue())
+        logger.info('Профиль сохранён в %s и %s', path, report_path)
+        return report_path
+
+    def dump_memory(self):
+        """Снимает снимок tracemalloc и пишет разницу с предыдущим.
+
+        При первом вызове только включает tracemalloc. Возвращает путь
+        к отчёту или None.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        previous, self.snapshot = self.snapshot, snapshot
+        if previous is None:
+            logger.info('tracemalloc включён, снимок памяти сохранён')
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f'Отслеживается: {current} байт, пик: {peak} байт',
+            f'Топ {self.top} изменений с предыдущего снимка:',
+        ]
+        lines += [
+            str(stat)
+            for stat in snapshot.compare_to(previous, 'lineno')[:self.top]
+        ]
+        path = self._path('tracemalloc', '.txt')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        logger.info('Разница снимков памяти сохранена в %s', path)
+        return path
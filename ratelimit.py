@@ -0,0 +1,107 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Ограничитель частоты по алгоритму token bucket.
+
+    Бакет пополняется со скоростью rate токенов в секунду и вмещает не
+    больше capacity токенов. Методы не блокируют вызывающего: reserve()
+    либо забирает токен, либо сообщает, сколько секунд нужно подождать.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Начисляет токены за время, прошедшее с прошлого обращения."""
+        elapsed = max(now - self._updated, 0)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def _wait(self, now, tokens):
+        """Возвращает, сколько секунд ждать tokens токенов, или 0."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= tokens:
+            return 0
+        return (tokens - self._tokens) / self.rate
+
+    def reserve(self, tokens=1):
+        """Забирает токены и возвращает 0 либо возвращает время ожидания."""
+        with self._lock:
+            wait = self._wait(self.clock(), tokens)
+            if not wait:
+                self._tokens -= tokens
+            return wait
+
+    def wait_time(self, tokens=1):
+        """Возвращает время ожидания токенов, не забирая их."""
+        with self._lock:
+            return self._wait(self.clock(), tokens)
+
+    def pause(self, seconds):
+        """Запрещает выдачу токенов на seconds секунд."""
+        with self._lock:
+            self._paused_until = max(
+                self._paused_until, self.clock() + seconds
+            )
+
+    def state(self):
+        """Возвращает число доступных токенов и остаток паузы в секундах."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            return self._tokens, max(self._paused_until - now, 0)
+
+    def is_idle(self):
+        """Проверяет, что бакет полон и не на паузе."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            return (
+                self._tokens >= self.capacity and now >= self._paused_until
+            )
+
+
+class KeyedTokenBuckets:
+    """Набор бакетов с одинаковыми параметрами, по одному на ключ.
+
+    Полные бакеты неотличимы от новых, поэтому при росте набора больше
+    max_keys они удаляются.
+    """
+
+    def __init__(self, rate, capacity=None, max_keys=10000,
+                 clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def get(self, key):
+        """Возвращает бакет ключа, создавая его при необходимости."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self.prune()
+            bucket = TokenBucket(self.rate, self.capacity, self.clock)
+            self._buckets[key] = bucket
+        return bucket
+
+    def prune(self):
+        """Удаляет бакеты, которые не отличаются от новых."""
+        for key in [
+            key for key, bucket in self._buckets.items() if bucket.is_idle()
+        ]:
+            del self._buckets[key]
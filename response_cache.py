@@ -0,0 +1,76 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import metrics
+
+
+MAXSIZE = 10000
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(-?\d+)')
+
+
+def body_digest(body):
+    """Возвращает хэш тела ответа без значения current_date и само значение.
+
+    current_date - время сервера, оно меняется в каждом ответе, поэтому
+    в хэш не входит, иначе одинаковых ответов не было бы.
+    """
+    match = CURRENT_DATE.search(body)
+    current_date = None
+    if match is not None:
+        current_date = int(match.group(1))
+        body = body[:match.start(1)] + body[match.end(1):]
+    return hashlib.blake2b(body, digest_size=16).digest(), current_date
+
+
+class ResponseCache:
+    """Последние разобранные ответы API по аккаунтам.
+
+    Если тело ответа совпало с предыдущим телом аккаунта (без учёта
+    current_date), JSON не разбирается: возвращается копия прошлого
+    ответа с новым current_date и тем же объектом списка homeworks,
+    по которому вызывающий код может пропустить уже выполненную
+    проверку. Аккаунты хранятся в LRU размера maxsize.
+    """
+
+    def __init__(self, maxsize=MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def decode(self, account, body, decode):
+        """Возвращает ответ по телу body, вызывая decode() только при
+        изменении тела.
+        """
+        digest, current_date = body_digest(body)
+        with self._lock:
+            entry = self._entries.get(account)
+            if entry is not None and entry[0] == digest:
+                self._entries.move_to_end(account)
+                cached = entry[1]
+            else:
+                cached = None
+        if cached is not None:
+            metrics.UNCHANGED_RESPONSES.inc()
+            metrics.UNCHANGED_BYTES.inc(amount=len(body))
+            response = dict(cached)
+            if current_date is not None:
+                response['current_date'] = current_date
+            return response
+        response = decode()
+        if isinstance(response, dict):
+            with self._lock:
+                self._entries[account] = (digest, dict(response))
+                self._entries.move_to_end(account)
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return response
+
+    def clear(self):
+        """Очищает кэш."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+import exceptions as EX
+
+
+class RetryRule(namedtuple(
+    'RetryRule',
+    ('retryable', 'backoff_base', 'backoff_max', 'max_attempts', 'notify')
+)):
+    """Правило повтора после ошибки.
+
+    retryable - имеет ли смысл повторять запрос; backoff_base и
+    backoff_max - границы экспоненциальной задержки в секундах;
+    max_attempts - число попыток, после которого ошибка считается
+    постоянной (None - без ограничения); notify - сообщать ли об ошибке
+    в Telegram.
+    """
+
+    def exhausted(self, attempts):
+        """Проверяет, что повторять запрос больше не нужно."""
+        return not self.retryable or (
+            self.max_attempts is not None and attempts >= self.max_attempts
+        )
+
+    def delay(self, attempts):
+        """Возвращает задержку перед попыткой номер attempts + 1."""
+        if self.exhausted(attempts):
+            return self.backoff_max
+        return min(
+            self.backoff_base * 2 ** max(attempts - 1, 0), self.backoff_max
+        )
+
+
+TRANSIENT = RetryRule(True, 5, 600, None, True)
+SCHEMA = RetryRule(True, 600, 6 * 3600, 5, True)
+FATAL = RetryRule(False, 3600, 6 * 3600, None, True)
+
+POLICIES = {
+    EX.ErrorCheckTokens: FATAL,
+    EX.ErrorLoadAccounts: FATAL,
+    EX.ErrorStateStore: TRANSIENT,
+    EX.ErrorRequestGetApi: TRANSIENT,
+    EX.ErrorCircuitOpen: RetryRule(True, 5, 600, None, False),
+    EX.ErrorRequestGetApiHttpsStatus: RetryRule(True, 60, 3600, 10, True),
+    EX.ErrorRequestGetApiServer: RetryRule(True, 15, 1800, None, True),
+    EX.ErrorRequestGetApiTooManyRequests: RetryRule(
+        True, 60, 3600, None, False
+    ),
+    EX.ErrorRequestGetApiUnauthorized: FATAL,
+    EX.ErrorResponseNone: SCHEMA,
+    EX.ErrorResponseNotDict: SCHEMA,
+    EX.ErrorResponseDictKey: SCHEMA,
+    EX.ErrorResponseNotList: SCHEMA,
+    EX.ErrorDictParseStatus: SCHEMA,
+    EX.ErrorDictKeyParseStatus: SCHEMA,
+    EX.ErrorDictKeyStatusInParseStatus: SCHEMA,
+    EX.ErrorDictKeyHomeworkNameInParseStatus: SCHEMA,
+}
+DEFAULT = RetryRule(True, 60, 3600, None, True)
+
+
+def rule_for(error, policies=POLICIES):
+    """Возвращает правило повтора для исключения.
+
+    Правило ищется по цепочке базовых классов исключения, поэтому
+    подкласс без своей записи наследует правило родителя.
+    """
+    for error_class in type(error).__mro__:
+        if error_class in policies:
+            return policies[error_class]
+    return DEFAULT
+
+
+def retry_delay(error, attempts, policies=POLICIES):
+    """Возвращает задержку до повтора после attempts ошибок подряд.
+
+    Задержка не меньше паузы retry_after, если её указывает исключение.
+    """
+    delay = rule_for(error, policies).delay(attempts)
+    return max(delay, getattr(error, 'retry_after', None) or 0)
@@ -0,0 +1,134 @@
+import heapq
+import itertools
+import random
+
+
+# Паузы не длиннее RETRY_PERIOD main(), чтобы уведомления не опаздывали
+# сильнее, чем при опросе раз в 10 минут, и не короче 400 с: частота
+# запросов аккаунта не больше чем в 1,5 раза выше, чем у main().
+STATUS_PERIODS = {
+    'reviewing': 400,
+    'rejected': 500,
+    'approved': 600,
+}
+DEFAULT_PERIOD = 600
+JITTER = 0.1
+
+
+class PollPolicy:
+    """Вычисляет задержку до следующего опроса аккаунта.
+
+    Пока работа на ревью, аккаунт опрашивается чаще, когда все работы
+    приняты - реже. Задержки после ошибок задаёт retry_policy.
+    Случайный разброс jitter не даёт аккаунтам синхронизироваться
+    в пачки запросов.
+    """
+
+    def __init__(self, status_periods=None, default_period=DEFAULT_PERIOD,
+                 jitter=JITTER, rng=None):
+        self.status_periods = dict(
+            STATUS_PERIODS if status_periods is None else status_periods
+        )
+        self.default_period = default_period
+        self.jitter = jitter
+        self.rng = rng if rng is not None else random.Random()
+
+    def account_status(self, homeworks, previous=None):
+        """Определяет статус аккаунта по домашкам из ответа API.
+
+        Из нескольких статусов выбирается тот, что требует самого
+        частого опроса. Если домашек в ответе нет, сохраняется
+        предыдущий статус.
+        """
+        statuses = [
+            homework.get('status') for homework in homeworks
+            if isinstance(homework, dict)
+            and homework.get('status') in self.status_periods
+        ]
+        if not statuses:
+            return previous
+        return min(statuses, key=self.status_periods.get)
+
+    def base_delay(self, status=None):
+        """Возвращает задержку до следующего опроса без разброса."""
+        return self.status_periods.get(status, self.default_period)
+
+    def next_delay(self, status=None):
+        """Возвращает задержку до следующего опроса со случайным разбросом."""
+        return self.jittered(self.base_delay(status))
+
+    def jittered(self, delay):
+        """Добавляет к задержке случайный разброс."""
+        return delay * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def fixed_policy(period):
+    """Возвращает политику с одной паузой period для всех статусов.
+
+    Разброса у такой политики нет: так опрашивает main() по умолчанию.
+    """
+    return PollPolicy(status_periods={}, default_period=period, jitter=0)
+
+
+class PollScheduler:
+    """Очередь аккаунтов, упорядоченная по времени следующего опроса.
+
+    Основана на двоичной куче: постановка и перепланирование аккаунта
+    стоят O(log n), ближайший срок доступен за O(1). Перепланированные
+    записи не удаляются из кучи сразу, а помечаются устаревшими и
+    отбрасываются при извлечении.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, due):
+        """Назначает ключу время следующего опроса due."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[-1] = False
+        entry = [due, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+    def remove(self, key):
+        """Убирает ключ из расписания."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[-1] = False
+
+    def _compact(self):
+        """Перестраивает кучу без устаревших записей."""
+        self._heap = [entry for entry in self._heap if entry[-1]]
+        heapq.heapify(self._heap)
+
+    def _drop_stale(self):
+        """Снимает с вершины кучи устаревшие записи."""
+        while self._heap and not self._heap[0][-1]:
+            heapq.heappop(self._heap)
+
+    def next_deadline(self):
+        """Возвращает ближайшее время опроса или None, если очередь пуста."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Извлекает из расписания ключи, срок опроса которых наступил."""
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            del self._entries[entry[2]]
+            due.append(entry[2])
+            self._drop_stale()
+        return due
@@ -0,0 +1,278 @@
+"""Ускоренная симуляция опроса API в виртуальном времени.
+
+Каждый аккаунт опрашивается homework.Poller, но паузы между опросами
+не ждутся: виртуальные часы сразу переводятся на срок ближайшего
+опроса. Паузы, повторы и остановку аккаунта выбирает то же ядро
+homework.PollState, что и в engine.py и main(), а запросы к API
+проходят через общий автомат размыкания цепи; с --fixed-period
+аккаунты опрашиваются циклом main() раз в RETRY_PERIOD.
+Ответы API и отправка в Telegram подменяются моделями, поэтому дни
+опроса тысяч аккаунтов проходят за секунды.
+Запуск: python simulation.py --accounts 1000 --days 7 --outage 12 1
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+import breaker
+import exceptions as EX
+import homework
+import lag
+import outbox as OB
+import scheduler
+import storage
+
+
+START = 1700000000.0
+DAY = 24 * 3600
+CHANGE_INTERVAL = 6 * 3600
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class VirtualClock:
+    """Часы, время которых идёт только по вызовам sleep и advance_to.
+
+    time и monotonic совпадают, поэтому часы подходят любому параметру
+    clock в модулях бота.
+    """
+
+    def __init__(self, start=START):
+        self.now = start
+
+    def time(self):
+        """Возвращает текущее виртуальное время."""
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        """Мгновенно сдвигает время на seconds секунд."""
+        self.now += max(seconds, 0)
+
+    def advance_to(self, moment):
+        """Переводит часы на moment, если он ещё не наступил."""
+        self.now = max(self.now, moment)
+
+
+def format_date(timestamp):
+    """Возвращает время в формате date_updated API практикума."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+class SimulatedAPI:
+    """Модель API практикума для одного аккаунта.
+
+    Статус единственной домашки меняется через случайные промежутки
+    со средним change_interval секунд. Доля error_rate запросов
+    завершается ошибкой сервера, во время простоев outages - все
+    запросы.
+    """
+
+    def __init__(self, number, clock, rng, change_interval=CHANGE_INTERVAL,
+                 error_rate=0.0, outages=()):
+        self.clock = clock
+        self.rng = rng
+        self.change_interval = change_interval
+        self.error_rate = error_rate
+        self.outages = outages
+        self.updated_at = clock.time()
+        self.next_change = self.updated_at + self._interval()
+        self.homework = {
+            'id': number,
+            'status': STATUSES[0],
+            'homework_name': f'student{number}__homework.zip',
+            'date_updated': format_date(self.updated_at),
+        }
+        self.requests = 0
+        self.changes = 0
+
+    def _interval(self):
+        """Возвращает случайный промежуток до следующей смены статуса."""
+        return self.rng.expovariate(1 / self.change_interval)
+
+    def fetch(self, timestamp):
+        """Возвращает ответ API на запрос с from_date=timestamp."""
+        self.requests += 1
+        now = self.clock.time()
+        while self.next_change <= now:
+            self.updated_at = self.next_change
+            self.homework = dict(
+                self.homework,
+                status=self.rng.choice(STATUSES),
+                date_updated=format_date(self.updated_at),
+            )
+            self.next_change += self._interval()
+            self.changes += 1
+        if self.rng.random() < self.error_rate or any(
+            start <= now < end for start, end in self.outages
+        ):
+            raise EX.ErrorRequestGetApiServer(
+                'Ошибка статуса 500 при запросе к эндпоинту API-сервиса'
+            )
+        homeworks = []
+        if int(self.updated_at) >= timestamp:
+            homeworks.append(self.homework)
+        return {'homeworks': homeworks, 'current_date': int(now)}
+
+
+class SimulatedBot:
+    """Заменитель TeleBot, записывающий сообщения с виртуальным временем."""
+
+    def __init__(self, account, clock, messages):
+        self.account = account
+        self.clock = clock
+        self.messages = messages
+
+    def send_message(self, chat_id, text):
+        """Записывает сообщение (account, text, time)."""
+        self.messages.append((self.account, text, self.clock.time()))
+
+
+class Simulation:
+    """Опрос accounts аккаунтов в виртуальном времени.
+
+    Первые опросы аккаунтов равномерно распределены по RETRY_PERIOD,
+    дальше каждый аккаунт опрашивается через паузу, которую вернул его
+    Poller: по статусу аккаунта из PollPolicy или, с fixed_period,
+    RETRY_PERIOD, а после ошибки - задержку повтора. Аккаунт с
+    постоянной ошибкой больше не опрашивается. Простои API
+    outages задаются парами (начало, конец) виртуального времени.
+    Результат определяется seed.
+    """
+
+    def __init__(self, accounts, change_interval=CHANGE_INTERVAL,
+                 error_rate=0.0, start=START, seed=0, outages=(),
+                 fixed_period=False):
+        self.clock = VirtualClock(start)
+        self.rng = random.Random(seed)
+        self.store = storage.MemoryStateStore()
+        self.lags = lag.LagTracker()
+        self.outbox = OB.Outbox(
+            self.store, clock=self.clock.time, lags=self.lags
+        )
+        self.policy = None if fixed_period else scheduler.PollPolicy(
+            default_period=homework.RETRY_PERIOD, rng=self.rng
+        )
+        self.breaker = breaker.CircuitBreaker(clock=self.clock.monotonic)
+        self.messages = []
+        self.polls = 0
+        self.skipped = 0
+        self.apis = []
+        self.scheduler = scheduler.PollScheduler()
+        for number in range(accounts):
+            api = SimulatedAPI(
+                number, self.clock, self.rng, change_interval, error_rate,
+                outages
+            )
+            account = f'account{number}'
+            poller = homework.Poller(
+                SimulatedBot(account, self.clock, self.messages),
+                self.store,
+                account,
+                self.outbox,
+                homework.make_error_suppressor(self.clock.monotonic),
+                fetch=partial(self.fetch, api),
+                clock=self.clock.time,
+                policy=self.policy
+            )
+            self.apis.append(api)
+            self.scheduler.schedule(
+                poller, start + self.rng.uniform(0, homework.RETRY_PERIOD)
+            )
+
+    def fetch(self, api, timestamp):
+        """Запрашивает api через общий автомат размыкания цепи."""
+        if not self.breaker.allow():
+            self.skipped += 1
+            raise EX.ErrorCircuitOpen(
+                f'запрос c from_date "{timestamp}" пропущен',
+                self.breaker.remaining()
+            )
+        try:
+            response = api.fetch(timestamp)
+        except EX.ErrorRequestGetApiServer:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return response
+
+    def run(self, duration):
+        """Прогоняет duration секунд виртуального времени.
+
+        Возвращает число опросов за всё время симуляции.
+        """
+        end = self.clock.time() + duration
+        while True:
+            deadline = self.scheduler.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            self.clock.advance_to(deadline)
+            for poller in self.scheduler.pop_due(deadline):
+                delay = poller.iteration()
+                self.polls += 1
+                if not poller.stopped:
+                    self.scheduler.schedule(
+                        poller, self.clock.time() + delay
+                    )
+        self.clock.advance_to(end)
+        return self.polls
+
+
+def main():
+    """Прогоняет симуляцию и печатает её итоги."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--days', type=float, default=1)
+    parser.add_argument(
+        '--change-interval', type=float, default=CHANGE_INTERVAL
+    )
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--outage', type=float, nargs=2, action='append', default=[],
+        metavar=('HOUR', 'HOURS'),
+        help='простой API с часа HOUR длительностью HOURS часов'
+    )
+    parser.add_argument(
+        '--fixed-period', action='store_true',
+        help='опрашивать раз в RETRY_PERIOD, как main()'
+    )
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    outages = [
+        (START + hour * 3600, START + (hour + hours) * 3600)
+        for hour, hours in args.outage
+    ]
+    simulation = Simulation(
+        args.accounts, args.change_interval, args.error_rate,
+        seed=args.seed, outages=outages, fixed_period=args.fixed_period
+    )
+    started = time.perf_counter()
+    simulation.run(args.days * DAY)
+    elapsed = time.perf_counter() - started
+    percentiles = simulation.lags.percentiles()
+    print(f'Опросов: {simulation.polls}')
+    print(
+        f'Запросов к API: {sum(api.requests for api in simulation.apis)}, '
+        f'пропущено при разомкнутой цепи: {simulation.skipped}'
+    )
+    print(f'Сообщений: {len(simulation.messages)}')
+    print(
+        'Задержка уведомлений p50/p90/p99, с: ' + ' / '.join(
+            '-' if value is None else f'{value:.0f}'
+            for value in percentiles.values()
+        )
+    )
+    print(
+        f'Время симуляции: {elapsed:.2f} с, '
+        f'ускорение x{args.days * DAY / elapsed:.0f}'
+    )
+
+
+if __name__ == '__main__':
+    main()
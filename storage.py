@@ -0,0 +1,411 @@
+import abc
+import hashlib
+import itertools
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import exceptions as EX
+
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 1.0
+
+
+def account_key(token):
+    """Возвращает ключ аккаунта, не раскрывающий токен практикума."""
+    return hashlib.sha256(str(token).encode()).hexdigest()[:16]
+
+
+class StateStore(abc.ABC):
+    """Хранилище контрольных точек опроса и доставленных статусов.
+
+    Контрольная точка - значение current_date из последнего
+    обработанного ответа API, с которого продолжается опрос после
+    перезапуска. Там же хранится outbox - исходящие сообщения, ещё
+    не доставленные в Telegram. Записи outbox фиксируются вместе
+    с остальными изменениями при flush, поэтому сообщение, точка
+    опроса и отметка о статусе сохраняются или теряются вместе.
+    """
+
+    @abc.abstractmethod
+    def get_checkpoint(self, account):
+        """Возвращает сохранённый current_date аккаунта или None."""
+
+    @abc.abstractmethod
+    def set_checkpoint(self, account, current_date):
+        """Сохраняет current_date аккаунта."""
+
+    @abc.abstractmethod
+    def get_status(self, account, homework_id):
+        """Возвращает пару (status, date_updated) домашки или None."""
+
+    @abc.abstractmethod
+    def set_status(self, account, homework_id, status, date_updated):
+        """Сохраняет последний доставленный статус домашки."""
+
+    @abc.abstractmethod
+    def add_outbox(self, account, chat_id, text, key, next_attempt_at,
+                   origin=None):
+        """Добавляет сообщение в outbox.
+
+        origin - unix-время проверки работы, о которой сообщение.
+        Возвращает id сообщения или None, если сообщение с таким key
+        уже есть в outbox.
+        """
+
+    @abc.abstractmethod
+    def due_outbox(self, now, limit):
+        """Возвращает недоставленные сообщения, срок отправки которых
+        наступил, как кортежи (id, chat_id, text, attempts, origin).
+        """
+
+    @abc.abstractmethod
+    def update_outbox(self, message_id, attempts, next_attempt_at):
+        """Сохраняет число попыток и время следующей отправки."""
+
+    @abc.abstractmethod
+    def mark_outbox_delivered(self, message_id, delivered_at):
+        """Отмечает сообщение доставленным, повторная отметка игнорируется."""
+
+    @abc.abstractmethod
+    def is_backfilled(self, account, start, end):
+        """Проверяет, что окно догрузки [start, end) аккаунта обработано."""
+
+    @abc.abstractmethod
+    def mark_backfilled(self, account, start, end):
+        """Отмечает окно догрузки [start, end) аккаунта обработанным."""
+
+    @abc.abstractmethod
+    def prune_outbox(self, delivered_before):
+        """Удаляет сообщения, доставленные раньше delivered_before.
+
+        Возвращает число удалённых сообщений. Ключи удалённых сообщений
+        перестают защищать от повторного добавления.
+        """
+
+    def flush(self):
+        """Фиксирует накопленные изменения."""
+
+    def close(self):
+        """Фиксирует изменения и освобождает ресурсы."""
+        self.flush()
+
+
+class MemoryStateStore(StateStore):
+    """Хранилище состояния в памяти процесса, без сохранения на диск."""
+
+    def __init__(self):
+        self.checkpoints = {}
+        self.statuses = {}
+        self.outbox = {}
+        self.outbox_keys = set()
+        self.delivered_keys = {}
+        self.backfilled = set()
+        self._outbox_ids = itertools.count(1)
+
+    def get_checkpoint(self, account):
+        """Возвращает сохранённый current_date аккаунта или None."""
+        return self.checkpoints.get(account)
+
+    def set_checkpoint(self, account, current_date):
+        """Сохраняет current_date аккаунта."""
+        self.checkpoints[account] = current_date
+
+    def get_status(self, account, homework_id):
+        """Возвращает пару (status, date_updated) домашки или None."""
+        return self.statuses.get((account, str(homework_id)))
+
+    def set_status(self, account, homework_id, status, date_updated):
+        """Сохраняет последний доставленный статус домашки."""
+        self.statuses[(account, str(homework_id))] = (status, date_updated)
+
+    def add_outbox(self, account, chat_id, text, key, next_attempt_at,
+                   origin=None):
+        """Добавляет сообщение в outbox."""
+        if key is not None:
+            if key in self.outbox_keys:
+                return None
+            self.outbox_keys.add(key)
+        message_id = next(self._outbox_ids)
+        self.outbox[message_id] = {
+            'chat_id': str(chat_id),
+            'text': text,
+            'attempts': 0,
+            'next_attempt_at': next_attempt_at,
+            'origin': origin,
+            'key': key,
+        }
+        return message_id
+
+    def due_outbox(self, now, limit):
+        """Возвращает недоставленные сообщения, срок отправки которых
+        наступил.
+        """
+        due = sorted(
+            (message['next_attempt_at'], message_id)
+            for message_id, message in self.outbox.items()
+            if message['next_attempt_at'] <= now
+        )[:limit]
+        return [
+            (
+                message_id,
+                self.outbox[message_id]['chat_id'],
+                self.outbox[message_id]['text'],
+                self.outbox[message_id]['attempts'],
+                self.outbox[message_id]['origin']
+            )
+            for _, message_id in due
+        ]
+
+    def update_outbox(self, message_id, attempts, next_attempt_at):
+        """Сохраняет число попыток и время следующей отправки."""
+        message = self.outbox.get(message_id)
+        if message is not None:
+            message['attempts'] = attempts
+            message['next_attempt_at'] = next_attempt_at
+
+    def mark_outbox_delivered(self, message_id, delivered_at):
+        """Удаляет доставленное сообщение из outbox.
+
+        Ключ сообщения хранится до prune_outbox.
+        """
+        message = self.outbox.pop(message_id, None)
+        if message is not None and message['key'] is not None:
+            self.delivered_keys[message['key']] = delivered_at
+
+    def is_backfilled(self, account, start, end):
+        """Проверяет, что окно догрузки [start, end) аккаунта обработано."""
+        return (account, start, end) in self.backfilled
+
+    def mark_backfilled(self, account, start, end):
+        """Отмечает окно догрузки [start, end) аккаунта обработанным."""
+        self.backfilled.add((account, start, end))
+
+    def prune_outbox(self, delivered_before):
+        """Забывает ключи сообщений, доставленных раньше delivered_before."""
+        expired = [
+            key for key, delivered_at in self.delivered_keys.items()
+            if delivered_at < delivered_before
+        ]
+        for key in expired:
+            del self.delivered_keys[key]
+            self.outbox_keys.discard(key)
+        return len(expired)
+
+
+class SQLiteStateStore(StateStore):
+    """Хранилище состояния в SQLite в режиме WAL.
+
+    Изменения копятся в открытой транзакции и фиксируются пачкой, когда
+    набирается batch_size записей или проходит flush_interval секунд.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS checkpoints ('
+        'account TEXT PRIMARY KEY, from_date INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS statuses ('
+        'account TEXT NOT NULL, homework_id TEXT NOT NULL, '
+        'status TEXT NOT NULL, date_updated TEXT, '
+        'PRIMARY KEY (account, homework_id))',
+        'CREATE TABLE IF NOT EXISTS outbox ('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, account TEXT NOT NULL, '
+        'chat_id TEXT NOT NULL, text TEXT NOT NULL, key TEXT UNIQUE, '
+        'attempts INTEGER NOT NULL DEFAULT 0, '
+        'next_attempt_at REAL NOT NULL, delivered_at REAL, origin REAL)',
+        'CREATE INDEX IF NOT EXISTS outbox_pending '
+        'ON outbox (next_attempt_at) WHERE delivered_at IS NULL',
+        'CREATE TABLE IF NOT EXISTS backfill_windows ('
+        'account TEXT NOT NULL, start INTEGER NOT NULL, '
+        '"end" INTEGER NOT NULL, PRIMARY KEY (account, start, "end"))',
+    )
+
+    def __init__(self, path, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        try:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.SCHEMA:
+                self.connection.execute(statement)
+            self._migrate()
+            self.connection.commit()
+        except sqlite3.Error as error:
+            raise EX.ErrorStateStore(
+                f'Не удалось открыть хранилище состояния "{path}": {error}'
+            )
+
+    def _migrate(self):
+        """Добавляет колонки, которых нет в базах прежних версий."""
+        columns = {
+            row[1] for row in self.connection.execute(
+                'PRAGMA table_info(outbox)'
+            )
+        }
+        if 'origin' not in columns:
+            self.connection.execute(
+                'ALTER TABLE outbox ADD COLUMN origin REAL'
+            )
+
+    def _fetchone(self, query, params):
+        """Выполняет запрос и возвращает первую строку результата."""
+        with self._lock:
+            return self.connection.execute(query, params).fetchone()
+
+    def _write(self, query, params):
+        """Выполняет запись и фиксирует пачку при необходимости.
+
+        Возвращает курсор выполненного запроса.
+        """
+        with self._lock:
+            cursor = self.connection.execute(query, params)
+            self._pending += 1
+            if (
+                self._pending >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+            return cursor
+
+    def get_checkpoint(self, account):
+        """Возвращает сохранённый current_date аккаунта или None."""
+        row = self._fetchone(
+            'SELECT from_date FROM checkpoints WHERE account = ?',
+            (account,)
+        )
+        return row[0] if row else None
+
+    def set_checkpoint(self, account, current_date):
+        """Сохраняет current_date аккаунта."""
+        self._write(
+            'INSERT INTO checkpoints (account, from_date) VALUES (?, ?) '
+            'ON CONFLICT(account) DO UPDATE SET '
+            'from_date = excluded.from_date',
+            (account, current_date)
+        )
+
+    def get_status(self, account, homework_id):
+        """Возвращает пару (status, date_updated) домашки или None."""
+        row = self._fetchone(
+            'SELECT status, date_updated FROM statuses '
+            'WHERE account = ? AND homework_id = ?',
+            (account, str(homework_id))
+        )
+        return tuple(row) if row else None
+
+    def set_status(self, account, homework_id, status, date_updated):
+        """Сохраняет последний доставленный статус домашки."""
+        self._write(
+            'INSERT INTO statuses '
+            '(account, homework_id, status, date_updated) '
+            'VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(account, homework_id) DO UPDATE SET '
+            'status = excluded.status, date_updated = excluded.date_updated',
+            (account, str(homework_id), status, date_updated)
+        )
+
+    def add_outbox(self, account, chat_id, text, key, next_attempt_at,
+                   origin=None):
+        """Добавляет сообщение в outbox."""
+        with self._lock:
+            cursor = self._write(
+                'INSERT OR IGNORE INTO outbox '
+                '(account, chat_id, text, key, next_attempt_at, origin) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (account, str(chat_id), text, key, next_attempt_at, origin)
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def due_outbox(self, now, limit):
+        """Возвращает недоставленные сообщения, срок отправки которых
+        наступил.
+        """
+        with self._lock:
+            return self.connection.execute(
+                'SELECT id, chat_id, text, attempts, origin FROM outbox '
+                'WHERE delivered_at IS NULL AND next_attempt_at <= ? '
+                'ORDER BY next_attempt_at LIMIT ?',
+                (now, limit)
+            ).fetchall()
+
+    def update_outbox(self, message_id, attempts, next_attempt_at):
+        """Сохраняет число попыток и время следующей отправки."""
+        self._write(
+            'UPDATE outbox SET attempts = ?, next_attempt_at = ? '
+            'WHERE id = ? AND delivered_at IS NULL',
+            (attempts, next_attempt_at, message_id)
+        )
+
+    def mark_outbox_delivered(self, message_id, delivered_at):
+        """Отмечает сообщение доставленным, повторная отметка игнорируется."""
+        self._write(
+            'UPDATE outbox SET delivered_at = ? '
+            'WHERE id = ? AND delivered_at IS NULL',
+            (delivered_at, message_id)
+        )
+
+    def is_backfilled(self, account, start, end):
+        """Проверяет, что окно догрузки [start, end) аккаунта обработано."""
+        return self._fetchone(
+            'SELECT 1 FROM backfill_windows '
+            'WHERE account = ? AND start = ? AND "end" = ?',
+            (account, start, end)
+        ) is not None
+
+    def mark_backfilled(self, account, start, end):
+        """Отмечает окно догрузки [start, end) аккаунта обработанным."""
+        self._write(
+            'INSERT OR IGNORE INTO backfill_windows '
+            '(account, start, "end") VALUES (?, ?, ?)',
+            (account, start, end)
+        )
+
+    def prune_outbox(self, delivered_before):
+        """Удаляет сообщения, доставленные раньше delivered_before."""
+        return self._write(
+            'DELETE FROM outbox WHERE delivered_at < ?',
+            (delivered_before,)
+        ).rowcount
+
+    def flush(self):
+        """Фиксирует накопленные изменения."""
+        with self._lock:
+            if self._pending:
+                self.connection.commit()
+                self._pending = 0
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        """Фиксирует изменения и закрывает соединение."""
+        with self._lock:
+            self.flush()
+            self.connection.close()
+
+
+BACKENDS = {
+    'sqlite': lambda location: SQLiteStateStore(location),
+    'memory': lambda location: MemoryStateStore(),
+}
+
+
+def open_state_store(url):
+    """Открывает хранилище состояния по адресу вида backend://location.
+
+    Например, sqlite:///homework_bot.db или memory://.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in BACKENDS:
+        raise EX.ErrorStateStore(
+            f'Неизвестный тип хранилища состояния: "{parts.scheme}"'
+        )
+    if parts.netloc:
+        location = parts.netloc + parts.path
+    else:
+        location = parts.path[1:]
+    return BACKENDS[parts.scheme](location)
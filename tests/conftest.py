@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 import pytest_timeout
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -53,3 +54,11 @@ pytest_timeout.write = write_timeout_reasons
 os.environ['PRACTICUM_TOKEN'] = 'sometoken'
 os.environ['TELEGRAM_TOKEN'] = '1234:abcdefg'
 os.environ['TELEGRAM_CHAT_ID'] = '12345'
+os.environ['STATE_STORE'] = 'memory://'
+
+from tests.fakes import RecordingBot  # noqa: E402
+
+
+@pytest.fixture
+def recording_bot():
+    return RecordingBot()
@@ -0,0 +1,28 @@
+import requests
+
+
+class RecordingBot:
+    """Заменитель TeleBot, записывающий пары (chat_id, text).
+
+    failures - число первых отправок, завершающихся ошибкой соединения,
+    или список исключений, которые отправки выбрасывают по очереди.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = (
+            failures if isinstance(failures, int) else list(failures)
+        )
+        self.messages = []
+
+    def send_message(self, chat_id, text):
+        if isinstance(self.failures, list):
+            if self.failures:
+                raise self.failures.pop(0)
+        elif self.failures:
+            self.failures -= 1
+            raise requests.ConnectionError('Telegram недоступен')
+        self.messages.append((chat_id, text))
+
+    @property
+    def texts(self):
+        return [text for _, text in self.messages]
@@ -0,0 +1,44 @@
+import random
+
+import fake_servers
+
+
+def valid_homework(number, rng):
+    """Возвращает корректную домашку из ответа API практикума."""
+    return {
+        'id': number,
+        'status': rng.choice(fake_servers.STATUSES),
+        'homework_name': f'student__homework{number}.zip',
+        'reviewer_comment': '',
+        'date_updated': '2024-01-01T00:00:00Z',
+        'lesson_name': 'Итоговый проект',
+    }
+
+
+def malformed_homework(number, rng):
+    """Возвращает домашку с одной из ошибок, которые ловит parse_status."""
+    homework = valid_homework(number, rng)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return [homework]
+    if kind == 1:
+        del homework['status']
+    elif kind == 2:
+        homework['status'] = 'unknown'
+    else:
+        del homework['homework_name']
+    return homework
+
+
+def make_homeworks(size, malformed_every=0, seed=0):
+    """Возвращает список из size домашек для больших ответов API.
+
+    Каждая malformed_every-я домашка некорректна, 0 - все корректны.
+    """
+    rng = random.Random(seed)
+    return [
+        malformed_homework(number, rng)
+        if malformed_every and number % malformed_every == 0
+        else valid_homework(number, rng)
+        for number in range(size)
+    ]
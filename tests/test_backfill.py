@@ -0,0 +1,235 @@
+import asyncio
+import time
+
+import backfill
+import delivery
+import engine
+import exceptions as EX
+import homework
+import lag
+import simulation
+import storage
+
+START = 1700000000
+HOUR = 3600
+HOMEWORKS = [
+    {
+        'id': number % 5,
+        'status': ('reviewing', 'rejected', 'approved')[number % 3],
+        'homework_name': f'дз {number % 5}',
+        'date_updated': simulation.format_date(START + number * HOUR),
+    }
+    for number in range(24)
+]
+ACCOUNTS = [engine.Account('first', 1), engine.Account('second', 2)]
+
+
+class FakeAPI:
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.requests = []
+
+    def fetch(self, token, from_date):
+        self.requests.append((token, from_date))
+        if (token, from_date) in self.failing:
+            self.failing.discard((token, from_date))
+            raise EX.ErrorRequestGetApiServer('Ошибка статуса 500')
+        # Повтор первой домашки: API может отдать запись дважды.
+        return {
+            'homeworks': [
+                item for item in HOMEWORKS + HOMEWORKS[:1]
+                if lag.parse_date(item['date_updated']) >= from_date
+            ],
+            'current_date': START + 24 * HOUR,
+        }
+
+
+def expected_messages(chat_id):
+    return [
+        (str(chat_id), homework.parse_status(item)) for item in HOMEWORKS
+    ]
+
+
+class TestHelpers:
+
+    def test_split_windows(self):
+        assert backfill.split_windows(0, 25, 10) == [
+            (0, 10), (10, 20), (20, 25)
+        ]
+        assert backfill.split_windows(10, 10, 10) == []
+
+    def test_split_by_windows(self):
+        undated = {'id': 100, 'status': 'approved'}
+        windows = [
+            (START, START + 6 * HOUR), (START + 12 * HOUR, START + 18 * HOUR)
+        ]
+        batches = backfill.split_by_windows(HOMEWORKS + [undated], windows)
+        assert batches == [
+            HOMEWORKS[:6] + [undated], HOMEWORKS[12:18]
+        ]
+
+    def test_retry_delay_is_short_and_bounded(self):
+        error = EX.ErrorRequestGetApiServer('Ошибка статуса 500')
+        assert [
+            backfill.retry_delay(error, attempts) for attempts in (1, 2, 3)
+        ] == [1, 2, 4]
+        assert backfill.retry_delay(error, 20) == backfill.BACKOFF_MAX
+        throttled = EX.ErrorRequestGetApiTooManyRequests('429', 3600)
+        assert backfill.retry_delay(throttled, 1) == backfill.BACKOFF_MAX
+
+    def test_merge_homeworks_dedups_and_sorts(self):
+        seen = set()
+        merged = backfill.merge_homeworks(
+            HOMEWORKS[3:1:-1] + HOMEWORKS[2:3], seen
+        )
+        assert merged == HOMEWORKS[2:4]
+        assert backfill.merge_homeworks(HOMEWORKS[2:3], seen) == []
+
+
+class TestBackfill:
+
+    def make_backfill(self, api, store, bot, attempts=1, sleeps=None,
+                      hours=24, outbound=None):
+        sleeps = [] if sleeps is None else sleeps
+        if outbound is None:
+            outbound = delivery.DeliveryQueue(
+                bot, global_rate=1000, chat_rate=1000
+            )
+        return backfill.Backfill(
+            bot, store, ACCOUNTS, START, START + hours * HOUR,
+            window=6 * HOUR, concurrency=4, attempts=attempts,
+            fetch=api.fetch, sleep=sleeps.append, outbound=outbound
+        )
+
+    def run(self, job):
+        return asyncio.run(job.run())
+
+    def messages(self, bot, chat_id):
+        return [
+            message for message in bot.messages
+            if message[0] == str(chat_id)
+        ]
+
+    def test_delivers_each_status_once_in_order(self, recording_bot):
+        api = FakeAPI()
+        job = self.make_backfill(
+            api, storage.MemoryStateStore(), recording_bot
+        )
+        assert self.run(job) == 2 * len(HOMEWORKS)
+        assert sorted(api.requests) == [('first', START), ('second', START)]
+        for account in ACCOUNTS:
+            assert self.messages(recording_bot, account.chat_id) == (
+                expected_messages(account.chat_id)
+            )
+
+    def test_resumes_from_first_pending_window(self, recording_bot):
+        store = storage.MemoryStateStore()
+        api = FakeAPI()
+        self.run(self.make_backfill(api, store, recording_bot, hours=12))
+        assert self.messages(recording_bot, 1) == expected_messages(1)[:12]
+        api.requests.clear()
+        job = self.make_backfill(api, store, recording_bot)
+        self.run(job)
+        assert job.skipped == 2 * 2
+        assert not store.checkpoints
+        assert sorted(api.requests) == [
+            ('first', START + 12 * HOUR), ('second', START + 12 * HOUR)
+        ]
+        for account in ACCOUNTS:
+            assert self.messages(recording_bot, account.chat_id) == (
+                expected_messages(account.chat_id)
+            )
+
+    def test_resumes_failed_account(self, recording_bot):
+        store = storage.MemoryStateStore()
+        api = FakeAPI(failing={('first', START)})
+        first = self.make_backfill(api, store, recording_bot)
+        self.run(first)
+        assert first.failed == {ACCOUNTS[0]}
+        assert self.messages(recording_bot, 1) == []
+        api.requests.clear()
+        second = self.make_backfill(api, store, recording_bot)
+        self.run(second)
+        assert second.skipped == 4
+        assert api.requests == [('first', START)]
+        assert self.messages(recording_bot, 1) == expected_messages(1)
+        assert self.messages(recording_bot, 2) == expected_messages(2)
+
+    def test_retries_transient_errors(self, recording_bot):
+        sleeps = []
+        api = FakeAPI(failing={('second', START)})
+        job = self.make_backfill(
+            api, storage.MemoryStateStore(), recording_bot,
+            attempts=3, sleeps=sleeps
+        )
+        self.run(job)
+        assert not job.failed
+        assert sleeps == [backfill.BACKOFF_BASE]
+        assert len(recording_bot.messages) == 2 * len(HOMEWORKS)
+
+    def test_fails_fast_on_permanent_errors(self, recording_bot):
+        sleeps = []
+        api = FakeAPI()
+
+        def fetch(token, from_date):
+            api.requests.append((token, from_date))
+            raise EX.ErrorRequestGetApiUnauthorized('Ошибка статуса 401')
+
+        api.fetch = fetch
+        job = self.make_backfill(
+            api, storage.MemoryStateStore(), recording_bot,
+            attempts=3, sleeps=sleeps
+        )
+        self.run(job)
+        assert job.failed == set(ACCOUNTS)
+        assert len(api.requests) == len(ACCOUNTS)
+        assert sleeps == []
+
+    def test_skips_malformed_homeworks(self, recording_bot):
+        api = FakeAPI()
+        broken = dict(HOMEWORKS[1], id=99, status='new_status')
+        fetch = api.fetch
+
+        def fetch_with_broken(token, from_date):
+            response = fetch(token, from_date)
+            response['homeworks'].append(broken)
+            return response
+
+        api.fetch = fetch_with_broken
+        job = self.make_backfill(
+            api, storage.MemoryStateStore(), recording_bot
+        )
+        self.run(job)
+        assert len(recording_bot.messages) == 2 * len(HOMEWORKS)
+        assert len(job.invalid) == 2
+        assert not job.failed
+
+    def test_sends_through_rate_limited_queue(self, recording_bot):
+        outbound = delivery.DeliveryQueue(recording_bot, global_rate=1000)
+        outbound.chat_buckets = delivery.ratelimit.KeyedTokenBuckets(
+            40, capacity=1
+        )
+        job = self.make_backfill(
+            FakeAPI(), storage.MemoryStateStore(), recording_bot,
+            outbound=outbound
+        )
+        started = time.monotonic()
+        self.run(job)
+        # 24 сообщения в чат при 40 сообщениях в секунду на чат.
+        assert time.monotonic() - started >= 23 / 40
+        assert len(recording_bot.messages) == 2 * len(HOMEWORKS)
+
+    def test_drains_outbox_before_exit(self, monkeypatch, recording_bot):
+        monkeypatch.setattr(backfill.engine.OB, 'POLL_INTERVAL', 0.01)
+        recording_bot.failures = 3
+        store = storage.MemoryStateStore()
+        job = self.make_backfill(FakeAPI(), store, recording_bot)
+        job.outbox = backfill.engine.OB.Outbox(store, backoff_base=0.01)
+        assert self.run(job) == 2 * len(HOMEWORKS)
+        assert not store.outbox
+        for account in ACCOUNTS:
+            messages = self.messages(recording_bot, account.chat_id)
+            assert sorted(messages) == sorted(
+                expected_messages(account.chat_id)
+            )
@@ -26,6 +26,24 @@ def create_mock_response_get_with_custom_status_and_data(
     return mocked_response
 
 
+def patch_requests_get(monkeypatch, mock):
+    """Подменяет requests.get и GET-запросы через requests.Session.
+
+    HEAD-запрос прогрева соединения получает пустой ответ 200.
+    """
+    def mock_session_get(session, *args, **kwargs):
+        return mock(*args, **kwargs)
+
+    def mock_session_head(session, *args, **kwargs):
+        response = requests.Response()
+        response.status_code = HTTPStatus.OK
+        return response
+
+    monkeypatch.setattr(requests, 'get', mock)
+    monkeypatch.setattr(requests.Session, 'get', mock_session_get)
+    monkeypatch.setattr(requests.Session, 'head', mock_session_head)
+
+
 def get_mock_telegram_bot(monkeypatch, random_message):
     def mock_telegram_bot(random_message=random_message, *args, **kwargs):
         return check_utils.MockTelegramBot(
@@ -203,7 +221,7 @@ class TestHomework:
                     'Проверьте, что в параметре `from_date` передано число.'
                 )
 
-        monkeypatch.setattr(requests, 'get', check_request_call)
+        patch_requests_get(monkeypatch, check_request_call)
         try:
             homework_module.get_api_answer(current_timestamp)
         except AssertionError:
@@ -228,7 +246,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_requests_get(monkeypatch, mock_response_get)
 
         result = homework_module.get_api_answer(current_timestamp)
         assert isinstance(result, dict), (
@@ -246,7 +264,7 @@ class TestHomework:
             self.HOMEWORK_FUNC_WITH_PARAMS_QTY[func_name]
         )
 
-        monkeypatch.setattr(requests, 'get', response)
+        patch_requests_get(monkeypatch, response)
         try:
             homework_module.get_api_answer(current_timestamp)
         except Exception:
@@ -270,7 +288,7 @@ class TestHomework:
         def mock_request_get_with_exception(*args, **kwargs):
             raise requests.RequestException('Something wrong')
 
-        monkeypatch.setattr(requests, 'get', mock_request_get_with_exception)
+        patch_requests_get(monkeypatch, mock_request_get_with_exception)
         try:
             homework_module.get_api_answer(current_timestamp)
         except requests.RequestException as e:
@@ -594,11 +612,7 @@ class TestHomework:
                 http_status=HTTPStatus.OK,
                 data=response_data
             ))
-        monkeypatch.setattr(
-            requests,
-            'get',
-            mock_response_get_with_new_status
-        )
+        patch_requests_get(monkeypatch, mock_response_get_with_new_status)
         if platform.system() != 'Windows':
             homework_module.main = (
                 check_utils.with_timeout(homework_module.main)
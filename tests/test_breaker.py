@@ -0,0 +1,47 @@
+import breaker
+import simulation
+
+
+class TestCircuitBreaker:
+
+    def make_breaker(self, clock):
+        return breaker.CircuitBreaker(
+            failure_threshold=3, reset_timeout=60, clock=clock.time
+        )
+
+    def test_opens_after_threshold(self):
+        clock = simulation.VirtualClock(0)
+        circuit = self.make_breaker(clock)
+        for _ in range(3):
+            assert circuit.allow()
+            circuit.record_failure()
+        assert circuit.state == breaker.OPEN
+        assert not circuit.allow()
+        clock.now = 30
+        assert circuit.remaining() == 30
+
+    def test_success_resets_failures(self):
+        circuit = self.make_breaker(simulation.VirtualClock(0))
+        circuit.record_failure()
+        circuit.record_failure()
+        circuit.record_success()
+        circuit.record_failure()
+        assert circuit.state == breaker.CLOSED
+
+    def test_half_open_allows_single_probe(self):
+        clock = simulation.VirtualClock(0)
+        circuit = self.make_breaker(clock)
+        for _ in range(3):
+            circuit.record_failure()
+        clock.now = 60
+        assert circuit.allow()
+        assert circuit.state == breaker.HALF_OPEN
+        assert not circuit.allow()
+        circuit.record_failure()
+        assert circuit.state == breaker.OPEN
+        assert not circuit.allow()
+        clock.now = 120
+        assert circuit.allow()
+        circuit.record_success()
+        assert circuit.state == breaker.CLOSED
+        assert circuit.allow()
@@ -0,0 +1,179 @@
+import json
+
+import pytest
+import requests
+
+import cassette
+import homework
+import http_client
+import simulation
+
+
+def make_response(status=200, data=None, headers=None):
+    return cassette.make_response({
+        'status': status,
+        'headers': headers or {'Content-Type': 'application/json'},
+        'body': json.dumps(data or {'homeworks': [], 'current_date': 1}),
+    }, 'https://example.com')
+
+
+class StubClient:
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.budget = http_client.RequestBudget()
+        self.closed = False
+
+    def get(self, url, headers=None, params=None):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def warm_up(self, url):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def headers(token):
+    return homework.make_headers(token)
+
+
+class TestCassette:
+
+    @pytest.mark.parametrize('name', ['cassette.jsonl', 'cassette.jsonl.gz'])
+    def test_record_and_replay(self, tmp_path, name):
+        path = tmp_path / name
+        data = {'homeworks': [{'status': 'approved'}], 'current_date': 5}
+        stub = StubClient([
+            make_response(data=data, headers={
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip',
+            }),
+            make_response(429, headers={'Retry-After': '7'}),
+            requests.ConnectTimeout('timeout'),
+        ])
+        client = cassette.RecordingClient(
+            stub, cassette.CassetteRecorder(str(path))
+        )
+        assert client.get('url', headers('a'), {'from_date': 0}).json() == (
+            data
+        )
+        client.get('url', headers('a'), {'from_date': 5})
+        with pytest.raises(requests.ConnectTimeout):
+            client.get('url', headers('a'), {'from_date': 5})
+        client.close()
+        assert stub.closed
+
+        entries = cassette.load_cassette(str(path))
+        assert [entry['params'] for entry in entries] == [
+            {'from_date': 0}, {'from_date': 5}, {'from_date': 5}
+        ]
+        assert entries[0]['account'] == cassette.request_account(
+            headers('a')
+        )
+        assert 'OAuth' not in str(entries)
+
+        replay = cassette.ReplayClient(str(path), speed=0)
+        response = replay.get('url', headers('a'))
+        assert response.json() == data
+        assert 'Content-Encoding' not in response.headers
+        throttled = replay.get('url', headers('a'))
+        assert throttled.status_code == 429
+        assert http_client.retry_after(throttled) == 7
+        with pytest.raises(requests.ConnectTimeout):
+            replay.get('url', headers('a'))
+        with pytest.raises(cassette.CassetteExhausted):
+            replay.get('url', headers('a'))
+
+    def test_circuit_open_is_not_recorded(self, tmp_path):
+        path = tmp_path / 'cassette.jsonl'
+        client = cassette.RecordingClient(
+            StubClient([http_client.CircuitOpenError(5)]),
+            cassette.CassetteRecorder(str(path))
+        )
+        with pytest.raises(http_client.CircuitOpenError):
+            client.get('url', headers('a'))
+        client.close()
+        assert cassette.load_cassette(str(path)) == []
+
+    def test_replay_per_account_and_in_order(self, tmp_path):
+        path = tmp_path / 'cassette.jsonl'
+        recorder = cassette.CassetteRecorder(str(path))
+        for number, token in enumerate(['a', 'b', 'a']):
+            recorder.record(
+                number, 0, headers(token), {}, make_response(data={
+                    'homeworks': [], 'current_date': number
+                })
+            )
+        recorder.close()
+        replay = cassette.ReplayClient(str(path), speed=0)
+
+        def current_date(token):
+            return replay.get('url', headers(token)).json()['current_date']
+
+        assert current_date('b') == 1
+        assert current_date('unknown') == 0
+        # Ответ 0 уже отдан неизвестному аккаунту и не повторяется.
+        assert current_date('a') == 2
+        with pytest.raises(cassette.CassetteExhausted):
+            current_date('a')
+        with pytest.raises(cassette.CassetteExhausted):
+            current_date('unknown')
+
+    def test_replay_checks_params(self, tmp_path, caplog):
+        path = tmp_path / 'cassette.jsonl'
+        recorder = cassette.CassetteRecorder(str(path))
+        for number in range(3):
+            recorder.record(
+                number, 0, headers('a'), {'from_date': number},
+                make_response()
+            )
+        recorder.close()
+        replay = cassette.ReplayClient(str(path), speed=0)
+        replay.get('url', headers('a'), {'from_date': 0})
+        assert 'не совпадают' not in caplog.text
+        replay.get('url', headers('a'), {'from_date': 5})
+        assert 'не совпадают' in caplog.text
+        strict = cassette.ReplayClient(str(path), speed=0, strict=True)
+        with pytest.raises(cassette.CassetteMismatch):
+            strict.get('url', headers('a'), {'from_date': 1})
+
+    @pytest.mark.parametrize(
+        'speed, expected', [(1, [10, 15]), (10, [1, 1.5])]
+    )
+    def test_replay_timing(self, tmp_path, speed, expected):
+        path = tmp_path / 'cassette.jsonl'
+        recorder = cassette.CassetteRecorder(str(path))
+        recorder.record(100, 10, None, {}, make_response())
+        recorder.record(110, 5, None, {}, make_response())
+        recorder.close()
+        clock = simulation.VirtualClock(0)
+        replay = cassette.ReplayClient(
+            str(path), speed, clock=clock.time, sleep=clock.sleep
+        )
+        moments = []
+        for _ in expected:
+            replay.get('url')
+            moments.append(clock.now)
+        assert moments == pytest.approx(expected)
+
+    def test_homework_replays_cassette(self, tmp_path, monkeypatch):
+        path = tmp_path / 'cassette.jsonl'
+        recorder = cassette.CassetteRecorder(str(path))
+        data = {'homeworks': [], 'current_date': 42}
+        recorder.record(
+            0, 0, homework.HEADERS, {}, make_response(data=data)
+        )
+        recorder.close()
+        monkeypatch.setattr(homework, 'API_CASSETTE_REPLAY', str(path))
+        monkeypatch.setattr(homework, 'API_CASSETTE_SPEED', 0)
+        monkeypatch.setattr(homework, 'API_CLIENT', None)
+        homework.configure_api_client()
+        try:
+            assert homework.get_api_answer(0) == data
+        finally:
+            monkeypatch.setattr(homework, 'API_CASSETTE_REPLAY', None)
+            homework.configure_api_client()
@@ -0,0 +1,43 @@
+import dedup
+import storage
+
+
+class TestDeliveryIndex:
+    HOMEWORK = {
+        'id': 1,
+        'homework_name': 'hw.zip',
+        'status': 'reviewing',
+        'date_updated': '2021-04-11T10:31:09Z'
+    }
+
+    def test_status_transition_is_delivered_once(self):
+        index = dedup.DeliveryIndex()
+        assert not index.is_delivered('account', self.HOMEWORK)
+        index.mark_delivered('account', self.HOMEWORK)
+        assert index.is_delivered('account', self.HOMEWORK)
+        assert not index.is_delivered('other', self.HOMEWORK)
+        approved = dict(self.HOMEWORK, status='approved')
+        assert not index.is_delivered('account', approved)
+
+    def test_index_is_bounded(self):
+        index = dedup.DeliveryIndex(maxsize=10)
+        for homework_id in range(100):
+            index.mark_delivered(
+                'account', dict(self.HOMEWORK, id=homework_id)
+            )
+        assert len(index) == 10
+        assert index.is_delivered('account', dict(self.HOMEWORK, id=99))
+        assert not index.is_delivered('account', dict(self.HOMEWORK, id=0))
+
+    def test_falls_back_to_store(self):
+        store = storage.MemoryStateStore()
+        dedup.DeliveryIndex(store).mark_delivered('account', self.HOMEWORK)
+        assert dedup.DeliveryIndex(store).is_delivered(
+            'account', self.HOMEWORK
+        )
+
+    def test_homework_without_id_is_not_indexed(self):
+        index = dedup.DeliveryIndex()
+        homework = {'homework_name': 'hw.zip', 'status': 'approved'}
+        index.mark_delivered('account', homework)
+        assert not index.is_delivered('account', homework)
@@ -0,0 +1,90 @@
+import asyncio
+
+from telebot import apihelper
+
+import delivery
+from tests.fakes import RecordingBot
+
+
+def too_many_requests(retry_after):
+    return apihelper.ApiTelegramException('sendMessage', None, {
+        'error_code': 429,
+        'description': 'Too Many Requests',
+        'parameters': {'retry_after': retry_after}
+    })
+
+
+def deliver(queue, messages):
+    async def run():
+        queue.start()
+        try:
+            return await asyncio.gather(
+                *(queue.send(chat_id, text) for chat_id, text in messages)
+            )
+        finally:
+            await queue.stop()
+
+    return asyncio.run(run())
+
+
+class TestDeliveryQueue:
+
+    def test_messages_keep_order_within_chat(self):
+        bot = RecordingBot()
+        queue = delivery.DeliveryQueue(bot, workers=4, chat_rate=1000)
+        messages = [(chat_id, f'{chat_id}-{index}')
+                    for index in range(5) for chat_id in range(3)]
+        assert deliver(queue, messages) == [True] * len(messages)
+        for chat_id in range(3):
+            assert [text for sent_chat, text in bot.messages
+                    if sent_chat == chat_id] == [
+                f'{chat_id}-{index}' for index in range(5)
+            ]
+
+    def test_retry_after_is_respected(self):
+        bot = RecordingBot(failures=[too_many_requests(0.05)])
+        queue = delivery.DeliveryQueue(bot, chat_rate=1000)
+        assert deliver(queue, [(1, 'text')]) == [True]
+        assert bot.messages == [(1, 'text')]
+
+    def test_other_errors_fail_delivery(self):
+        error = apihelper.ApiException('error', 'sendMessage', None)
+        bot = RecordingBot(failures=[error])
+        queue = delivery.DeliveryQueue(bot)
+        assert deliver(queue, [(1, 'text')]) == [False]
+
+    def test_unexpected_error_does_not_stop_worker(self):
+        bot = RecordingBot(failures=[ValueError('bad message')])
+        queue = delivery.DeliveryQueue(bot, workers=1, chat_rate=1000)
+
+        async def run():
+            queue.start()
+            try:
+                results = await asyncio.gather(
+                    queue.send(1, 'first'), queue.send(1, 'second')
+                )
+                await asyncio.wait_for(queue.join(), 1)
+                return results
+            finally:
+                await queue.stop()
+
+        assert asyncio.run(run()) == [False, True]
+        assert bot.messages == [(1, 'second')]
+        assert len(queue) == 0
+
+    def test_chat_rate_limit(self):
+        bot = RecordingBot()
+        queue = delivery.DeliveryQueue(bot, chat_rate=20)
+        loop_time = []
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            queue.start()
+            started = loop.time()
+            await asyncio.gather(*(queue.send(1, str(i)) for i in range(23)))
+            loop_time.append(loop.time() - started)
+            await queue.stop()
+
+        asyncio.run(run())
+        assert len(bot.messages) == 23
+        assert loop_time[0] >= 0.1
@@ -0,0 +1,329 @@
+import asyncio
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import engine
+import homework
+import retry_policy
+from tests.fakes import RecordingBot
+
+
+class TestPollingEngine:
+    ACCOUNTS = [
+        engine.Account(practicum_token=f'token{index}', chat_id=index)
+        for index in range(20)
+    ]
+
+    def test_load_accounts(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token', 'chat_id': 42}
+        ]))
+        assert engine.load_accounts(path) == [engine.Account('token', 42)]
+
+    def test_load_accounts_invalid(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([{'chat_id': 42}]))
+        with pytest.raises(ValueError):
+            engine.load_accounts(path)
+
+    def test_poll_all_respects_concurrency(self, monkeypatch):
+        lock = threading.Lock()
+        active = []
+        peak = []
+        bot = RecordingBot()
+
+        def mock_request_api_answer(timestamp, headers):
+            with lock:
+                active.append(headers)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(headers)
+            token = headers['Authorization'].split()[1]
+            return {
+                'homeworks': [
+                    {'homework_name': token, 'status': 'approved'}
+                ],
+                'current_date': timestamp + 1
+            }
+
+        monkeypatch.setattr(
+            homework, 'request_api_answer', mock_request_api_answer
+        )
+        polling = engine.PollingEngine(bot, self.ACCOUNTS, concurrency=4)
+        asyncio.run(polling.poll_all())
+
+        assert max(peak) <= 4
+        assert len(bot.messages) == len(self.ACCOUNTS)
+        for chat_id, message in bot.messages:
+            assert f'"token{chat_id}"' in message
+
+    def test_every_homework_is_delivered_once(self, monkeypatch):
+        bot = RecordingBot()
+        response = {
+            'homeworks': [
+                {
+                    'id': homework_id,
+                    'homework_name': f'hw{homework_id}',
+                    'status': 'approved',
+                    'date_updated': '2021-04-11T10:31:09Z'
+                }
+                for homework_id in range(3)
+            ],
+            'current_date': 1
+        }
+        monkeypatch.setattr(
+            homework, 'request_api_answer', lambda *args: response
+        )
+        polling = engine.PollingEngine(
+            bot, self.ACCOUNTS[:1],
+            outbound=engine.delivery.DeliveryQueue(bot, chat_rate=100)
+        )
+        asyncio.run(polling.poll_all())
+        asyncio.run(polling.poll_all())
+
+        assert len(bot.messages) == 3
+
+    def test_run_polls_due_accounts_again(self, monkeypatch):
+        polled = []
+
+        def mock_request_api_answer(timestamp, headers):
+            polled.append(headers['Authorization'])
+            return {'homeworks': [], 'current_date': timestamp}
+
+        monkeypatch.setattr(
+            homework, 'request_api_answer', mock_request_api_answer
+        )
+        policy = engine.scheduler.PollPolicy(default_period=0.01, jitter=0)
+        polling = engine.PollingEngine(
+            RecordingBot(), self.ACCOUNTS[:3], policy=policy
+        )
+
+        async def run_briefly():
+            try:
+                await asyncio.wait_for(polling.run(), 0.2)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(run_briefly())
+        assert len(polled) > 2 * 3
+        assert len(set(polled)) == 3
+
+    def test_fatal_error_stops_account(self, monkeypatch):
+        def mock_request_api_answer(timestamp, headers):
+            raise engine.EX.ErrorRequestGetApiUnauthorized('401')
+
+        monkeypatch.setattr(
+            homework, 'request_api_answer', mock_request_api_answer
+        )
+        bot = RecordingBot()
+        account = self.ACCOUNTS[0]
+        polling = engine.PollingEngine(bot, [account])
+
+        async def poll():
+            polling._start()
+            try:
+                await polling._poll_and_reschedule(account)
+            finally:
+                await polling._stop()
+
+        asyncio.run(poll())
+        assert polling.states[account].stopped
+        assert account not in polling.scheduler
+        assert len(bot.messages) == 1
+
+    def test_suppressor_is_sized_by_accounts(self, monkeypatch):
+        monkeypatch.setattr(homework, 'ERROR_FINGERPRINTS', 10)
+        polling = engine.PollingEngine(RecordingBot(), self.ACCOUNTS)
+        errors = [
+            engine.EX.ErrorRequestGetApi('timeout'),
+            engine.EX.ErrorRequestGetApiServer('status 502'),
+            engine.EX.ErrorCircuitOpen('circuit open'),
+        ]
+        notified = [
+            polling.suppressor.should_notify(error, account)
+            for _ in range(2)
+            for account in self.ACCOUNTS
+            for error in errors
+        ]
+        assert notified.count(True) == len(self.ACCOUNTS) * len(errors)
+        assert homework.make_error_suppressor().maxsize == 10
+
+    def test_malformed_homework_does_not_block_others(self, monkeypatch):
+        bot = RecordingBot()
+        response = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'first', 'status': 'approved'},
+                {'id': 2, 'homework_name': 'broken', 'status': 'new'},
+                {'id': 3, 'status': 'approved'},
+                {'id': 4, 'homework_name': 'fourth', 'status': 'rejected'},
+            ],
+            'current_date': 123
+        }
+        monkeypatch.setattr(
+            homework, 'request_api_answer', lambda *args: response
+        )
+        account = self.ACCOUNTS[0]
+        polling = engine.PollingEngine(
+            bot, [account],
+            outbound=engine.delivery.DeliveryQueue(bot, chat_rate=100)
+        )
+        asyncio.run(polling.poll_all())
+
+        assert [
+            text for _, text in bot.messages if text.startswith('Изменился')
+        ] == [
+            homework.parse_status(response['homeworks'][0]),
+            homework.parse_status(response['homeworks'][3]),
+        ]
+        assert polling.store.get_checkpoint(
+            engine.storage.account_key(account.practicum_token)
+        ) == 123
+
+    def test_queued_outbox_message_is_not_resent(self, monkeypatch):
+        bot = RecordingBot()
+        response = {
+            'homeworks': [
+                {
+                    'id': homework_id,
+                    'homework_name': f'hw{homework_id}',
+                    'status': 'approved',
+                    'date_updated': '2021-04-11T10:31:09Z'
+                }
+                for homework_id in range(4)
+            ],
+            'current_date': 1
+        }
+        monkeypatch.setattr(
+            homework, 'request_api_answer', lambda *args: response
+        )
+        monkeypatch.setattr(engine.OB, 'POLL_INTERVAL', 0.01)
+        outbound = engine.delivery.DeliveryQueue(bot)
+        # Очередь чата копится дольше аренды сообщения в outbox.
+        outbound.chat_buckets = engine.delivery.ratelimit.KeyedTokenBuckets(
+            20, capacity=1
+        )
+        polling = engine.PollingEngine(
+            bot, self.ACCOUNTS[:1], outbound=outbound
+        )
+        polling.outbox = engine.OB.Outbox(polling.store, lease=0.01)
+        asyncio.run(polling.poll_all())
+
+        assert len(bot.messages) == 4
+        assert not polling.store.outbox
+
+    def test_repeated_parse_error_counts_attempts(self, monkeypatch):
+        response = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'broken', 'status': 'new'}
+            ],
+            'current_date': 1
+        }
+        monkeypatch.setattr(
+            homework, 'request_api_answer', lambda *args: response
+        )
+        account = self.ACCOUNTS[0]
+        polling = engine.PollingEngine(RecordingBot(), [account])
+
+        async def poll(times):
+            polling._start()
+            try:
+                for _ in range(times):
+                    await polling.poll_account(account)
+            finally:
+                await polling._stop()
+
+        asyncio.run(poll(3))
+        assert polling.states[account].attempts == 3
+        assert polling.states[account].retry == (
+            retry_policy.SCHEMA.delay(3)
+        )
+
+    def test_store_is_flushed_while_running(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(
+            homework, 'request_api_answer',
+            lambda timestamp, headers: {
+                'homeworks': [], 'current_date': timestamp
+            }
+        )
+        monkeypatch.setattr(engine.OB, 'POLL_INTERVAL', 0.01)
+        path = tmp_path / 'state.db'
+        store = engine.storage.SQLiteStateStore(
+            str(path), batch_size=1000, flush_interval=3600
+        )
+        polling = engine.PollingEngine(
+            RecordingBot(), self.ACCOUNTS[:2], store=store
+        )
+
+        async def run_and_read():
+            task = asyncio.create_task(polling.run())
+            await asyncio.sleep(0.1)
+            with sqlite3.connect(path) as reader:
+                rows = reader.execute(
+                    'SELECT COUNT(*) FROM checkpoints'
+                ).fetchone()[0]
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return rows
+
+        assert asyncio.run(run_and_read()) == 2
+        store.close()
+
+    def test_sigterm_stops_engine_gracefully(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'request_api_answer',
+            lambda timestamp, headers: {
+                'homeworks': [], 'current_date': timestamp
+            }
+        )
+        polling = engine.PollingEngine(RecordingBot(), self.ACCOUNTS[:1])
+        flushed = []
+        monkeypatch.setattr(
+            polling.store, 'flush', lambda: flushed.append(True)
+        )
+
+        async def terminate_soon():
+            asyncio.get_running_loop().call_later(
+                0.05, os.kill, os.getpid(), signal.SIGTERM
+            )
+            await engine.serve(polling)
+
+        asyncio.run(terminate_soon())
+        assert flushed
+        assert polling._retry_task.cancelled()
+
+    def test_main_configures_tracing(self, monkeypatch, tmp_path):
+        traced = []
+
+        async def mock_serve(polling):
+            with engine.tracing.trace('poll_account', account='1'):
+                traced.append(engine.tracing.TRACER.sample_rate)
+
+        class MockClient:
+            def warm_up(self, url):
+                pass
+
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'STATE_STORE', 'memory://')
+        monkeypatch.setattr(homework, 'TRACE_SAMPLE_RATE', 1)
+        monkeypatch.setattr(homework, 'TRACE_FILE', tmp_path / 'traces')
+        monkeypatch.setattr(
+            homework, 'configure_api_client', lambda **kwargs: MockClient()
+        )
+        monkeypatch.setattr(
+            engine, 'load_accounts', lambda path: self.ACCOUNTS[:1]
+        )
+        monkeypatch.setattr(engine, 'TeleBot', lambda token: RecordingBot())
+        monkeypatch.setattr(engine, 'serve', mock_serve)
+        engine.main()
+
+        assert traced == [1]
+        assert engine.tracing.TRACER.exporter is None
+        assert 'poll_account' in (tmp_path / 'traces').read_text()
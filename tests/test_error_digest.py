@@ -0,0 +1,61 @@
+import exceptions as EX
+import error_digest
+import simulation
+
+
+class TestErrorSuppressor:
+
+    def make_suppressor(self, clock, maxsize=100):
+        return error_digest.ErrorSuppressor(
+            window=600, digest_interval=3600, maxsize=maxsize,
+            clock=clock.time
+        )
+
+    def test_fingerprint_ignores_numbers_and_quoted_values(self):
+        first = EX.ErrorRequestGetApi('from_date "1000" timeout 5.0')
+        second = EX.ErrorRequestGetApi('from_date "2000" timeout 3.5')
+        assert error_digest.fingerprint(first) == (
+            error_digest.fingerprint(second)
+        )
+        assert error_digest.fingerprint(first) != (
+            error_digest.fingerprint(EX.ErrorRequestGetApiServer('502'))
+        )
+
+    def test_alternating_errors_notified_once_per_window(self):
+        clock = simulation.VirtualClock(0)
+        suppressor = self.make_suppressor(clock)
+        errors = [
+            EX.ErrorRequestGetApi('timeout'),
+            EX.ErrorRequestGetApiServer('status 502'),
+        ] * 10
+        notified = [suppressor.should_notify(error) for error in errors]
+        assert notified.count(True) == 2
+        clock.now = 600
+        assert suppressor.should_notify(errors[0])
+
+    def test_digest_counts_suppressed_errors(self):
+        clock = simulation.VirtualClock(0)
+        suppressor = self.make_suppressor(clock)
+        for _ in range(38):
+            suppressor.should_notify(EX.ErrorRequestGetApi('timeout'))
+        assert suppressor.digests() == {}
+        clock.now = 3600
+        digest = suppressor.digests()[None]
+        assert 'ErrorRequestGetApi x37' in digest
+        clock.now = 7200
+        assert suppressor.digests() == {}
+
+    def test_scopes_are_independent(self):
+        suppressor = self.make_suppressor(simulation.VirtualClock(0))
+        error = EX.ErrorRequestGetApi('timeout')
+        assert suppressor.should_notify(error, 'first')
+        assert suppressor.should_notify(error, 'second')
+        assert not suppressor.should_notify(error, 'first')
+
+    def test_fingerprints_are_bounded(self):
+        suppressor = self.make_suppressor(
+            simulation.VirtualClock(0), maxsize=10
+        )
+        for index in range(100):
+            suppressor.should_notify(KeyError(f'key{index}'), index)
+        assert len(suppressor._entries) == 10
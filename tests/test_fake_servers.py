@@ -0,0 +1,76 @@
+import pytest
+from telebot import TeleBot, apihelper
+
+import exceptions as EX
+import fake_servers
+import homework
+
+
+HOMEWORK = {
+    'id': 1,
+    'status': 'approved',
+    'homework_name': 'hw.zip',
+    'date_updated': '2021-04-11T10:31:09Z',
+}
+
+
+@pytest.fixture
+def practicum(monkeypatch):
+    server = fake_servers.FakePracticum(
+        homeworks=lambda token, from_date: [HOMEWORK]
+    ).start()
+    monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+    monkeypatch.setattr(homework, 'API_CLIENT', None)
+    homework.configure_api_client(dns_ttl=0, rate_limit=1000)
+    yield server
+    homework.API_CLIENT.close()
+    server.stop()
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    server = fake_servers.FakeTelegram(global_rate=100, chat_rate=1).start()
+    monkeypatch.setattr(homework, 'TELEGRAM_API_URL', server.api_url)
+    monkeypatch.setattr(apihelper, 'API_URL', None)
+    homework.configure_telegram_api()
+    yield server
+    server.stop()
+
+
+class TestFakeServers:
+
+    def test_practicum_serves_homeworks(self, practicum):
+        response = homework.get_api_answer(0)
+        assert homework.check_response(response) == [HOMEWORK]
+        assert practicum.responses == {200: 1}
+
+    def test_practicum_errors(self, practicum):
+        practicum.too_many_rate = 1
+        practicum.retry_after = 0
+        with pytest.raises(EX.ErrorRequestGetApiTooManyRequests) as error:
+            homework.get_api_answer(0)
+        assert error.value.retry_after == 0
+
+        practicum.too_many_rate = 0
+        practicum.error_rate = 1
+        with pytest.raises(EX.ErrorRequestGetApiServer):
+            homework.get_api_answer(0)
+
+    def test_telegram_accepts_and_throttles(self, telegram):
+        bot = TeleBot(token=homework.TELEGRAM_TOKEN)
+        assert homework.send_message_to_chat(bot, 42, 'первое')
+        assert not homework.send_message_to_chat(bot, 42, 'второе')
+        assert homework.send_message_to_chat(bot, 43, 'третье')
+        assert [message[:2] for message in telegram.messages] == [
+            ('42', 'первое'), ('43', 'третье')
+        ]
+        assert telegram.throttled == 1
+
+    def test_refused_message_keeps_quota(self):
+        server = fake_servers.FakeTelegram(global_rate=1, chat_rate=1)
+        try:
+            assert server.throttle(42) == 0
+            assert server.throttle(43) == 1
+            assert server.chat_buckets.get(43).wait_time() == 0
+        finally:
+            server.server_close()
@@ -0,0 +1,149 @@
+import socket
+from http import HTTPStatus
+
+import requests
+
+import exceptions as EX
+import fake_servers
+import homework
+import http_client
+
+
+class MockResponse:
+    def __init__(self, status_code=HTTPStatus.OK, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class TestPracticumClient:
+
+    def test_get_uses_session_with_timeout(self, monkeypatch):
+        calls = []
+
+        def mock_session_get(session, url, **kwargs):
+            calls.append((session, url, kwargs))
+            return MockResponse()
+
+        monkeypatch.setattr(requests.Session, 'get', mock_session_get)
+        client = http_client.PracticumClient(
+            connect_timeout=1, read_timeout=2, dns_ttl=0
+        )
+        client.get('https://example.com', headers={}, params={})
+        client.get('https://example.com', headers={}, params={})
+
+        assert [call[0] for call in calls] == [client.session] * 2
+        assert calls[0][2]['timeout'] == (1, 2)
+
+    def test_dns_cache(self, monkeypatch):
+        lookups = []
+
+        def mock_getaddrinfo(host, port, *args, **kwargs):
+            lookups.append(host)
+            return [('address', host)]
+
+        monkeypatch.setattr(
+            http_client.socket, 'getaddrinfo', mock_getaddrinfo
+        )
+        cache = http_client.DNSCache(ttl=60)
+        for _ in range(3):
+            assert cache.getaddrinfo('host', 443) == [('address', 'host')]
+
+        assert lookups == ['host']
+        assert http_client.socket.getaddrinfo is mock_getaddrinfo
+
+    def test_client_connections_resolve_through_cache(self, monkeypatch):
+        lookups = []
+        getaddrinfo = socket.getaddrinfo
+
+        def counting_getaddrinfo(host, *args, **kwargs):
+            lookups.append(host)
+            return getaddrinfo(host, *args, **kwargs)
+
+        monkeypatch.setattr(socket, 'getaddrinfo', counting_getaddrinfo)
+        with fake_servers.FakePracticum() as server:
+            url = server.endpoint.replace('127.0.0.1', 'localhost')
+            client = http_client.PracticumClient(dns_ttl=60)
+            for _ in range(3):
+                response = client.get(
+                    url, headers={'Connection': 'close'}
+                )
+                assert response.status_code == HTTPStatus.UNAUTHORIZED
+            client.close()
+
+        assert lookups.count('localhost') == 1
+        assert socket.getaddrinfo is counting_getaddrinfo
+
+    def test_warm_up_goes_through_budget(self):
+        with fake_servers.FakePracticum() as server:
+            client = http_client.PracticumClient(dns_ttl=60)
+            client.warm_up(server.endpoint)
+            client.close()
+
+        assert client.budget.snapshot()['granted'] == 1
+        assert client.breaker.failures == 0
+        assert server.responses == {}
+
+    def test_too_many_requests_pauses_budget(self, monkeypatch):
+        monkeypatch.setattr(
+            requests.Session, 'get',
+            lambda session, url, **kwargs: MockResponse(
+                HTTPStatus.TOO_MANY_REQUESTS, {'Retry-After': '120'}
+            )
+        )
+        client = http_client.PracticumClient(dns_ttl=0)
+        client.get('https://example.com')
+        usage = client.budget.snapshot()
+        assert usage['granted'] == 1
+        assert usage['rejected'] == 1
+        assert 119 < usage['paused_for'] <= 120
+
+    def test_parse_retry_after(self):
+        assert http_client.parse_retry_after('30') == 30
+        assert http_client.parse_retry_after(
+            'Wed, 21 Oct 2015 07:28:30 GMT', now=1445412480
+        ) == 30
+        assert http_client.parse_retry_after('soon') is None
+        assert http_client.parse_retry_after(None) is None
+
+    def test_status_errors(self):
+        expected = {
+            HTTPStatus.UNAUTHORIZED: EX.ErrorRequestGetApiUnauthorized,
+            HTTPStatus.TOO_MANY_REQUESTS: (
+                EX.ErrorRequestGetApiTooManyRequests
+            ),
+            HTTPStatus.BAD_GATEWAY: EX.ErrorRequestGetApiServer,
+            HTTPStatus.NOT_FOUND: EX.ErrorRequestGetApiHttpsStatus,
+        }
+        for status, error_class in expected.items():
+            error = homework.api_status_error(
+                MockResponse(status, {'Retry-After': '5'})
+            )
+            assert type(error) is error_class
+        assert homework.api_status_error(
+            MockResponse(HTTPStatus.TOO_MANY_REQUESTS, {'Retry-After': '5'})
+        ).retry_after == 5
+
+    def test_open_circuit_skips_network(self, monkeypatch):
+        calls = []
+
+        def mock_session_get(session, url, **kwargs):
+            calls.append(url)
+            raise requests.ConnectionError('down')
+
+        monkeypatch.setattr(requests.Session, 'get', mock_session_get)
+        client = http_client.PracticumClient(dns_ttl=0, breaker_threshold=2)
+        monkeypatch.setattr(homework, 'API_CLIENT', client)
+        for _ in range(2):
+            try:
+                homework.get_api_answer(0)
+            except EX.ErrorCircuitOpen:
+                raise AssertionError('Цепь разомкнулась раньше порога')
+            except EX.ErrorRequestGetApi:
+                pass
+        try:
+            homework.get_api_answer(0)
+        except EX.ErrorCircuitOpen as error:
+            assert error.retry_after > 0
+        else:
+            raise AssertionError('Запрос выполнен при разомкнутой цепи')
+        assert len(calls) == 2
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+import engine
+import exceptions as EX
+import fake_servers
+import homework
+import json_stream
+import metrics
+import outbox as OB
+import storage
+
+HOMEWORKS = [
+    {'id': number, 'status': 'approved', 'homework_name': f'дз {number}'}
+    for number in range(20)
+]
+RESPONSE = {
+    'current_date': 1234567,
+    'homeworks': HOMEWORKS,
+    'extra': [1, 2.5, None, True, {'nested': 'value'}],
+}
+
+
+def chunks(data, size):
+    body = data if isinstance(data, bytes) else data.encode('utf-8')
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 100000])
+    def test_matches_json_loads(self, size):
+        body = json.dumps(RESPONSE, ensure_ascii=False)
+        stream = json_stream.HomeworkStream(chunks(body, size))
+        assert list(stream) == HOMEWORKS
+        assert stream.count == len(HOMEWORKS)
+        assert stream.fields == {
+            'current_date': RESPONSE['current_date'],
+            'extra': RESPONSE['extra'],
+        }
+
+    def test_yields_before_body_is_read(self):
+        read = []
+
+        def body():
+            for chunk in chunks(json.dumps(RESPONSE), 16):
+                read.append(chunk)
+                yield chunk
+
+        stream = iter(json_stream.HomeworkStream(body()))
+        assert next(stream) == HOMEWORKS[0]
+        assert len(read) < len(chunks(json.dumps(RESPONSE), 16)) // 2
+
+    @pytest.mark.parametrize('body, error', [
+        ('[]', EX.ErrorResponseNotDict),
+        ('{}', EX.ErrorResponseDictKey),
+        ('{"homeworks": null}', EX.ErrorResponseDictKey),
+        ('{"homeworks": 5}', EX.ErrorResponseNotList),
+        ('{"homeworks": [1 2]}', json.JSONDecodeError),
+        ('{"homeworks": [], "current_date": 1', json.JSONDecodeError),
+        ('{"homeworks": []} tail', json.JSONDecodeError),
+    ])
+    def test_errors(self, body, error):
+        with pytest.raises(error):
+            list(json_stream.HomeworkStream(chunks(body, 3)))
+
+
+class TestStreamingPoll:
+
+    @pytest.fixture
+    def practicum(self, monkeypatch):
+        server = fake_servers.FakePracticum(
+            homeworks=lambda token, from_date: HOMEWORKS
+        ).start()
+        monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+        monkeypatch.setattr(homework, 'API_CLIENT', None)
+        monkeypatch.setattr(homework, 'API_STREAM_JSON', True)
+        monkeypatch.setattr(homework, 'STREAM_CHUNK_SIZE', 64)
+        homework.configure_api_client(dns_ttl=0, rate_limit=1000)
+        yield server
+        homework.API_CLIENT.close()
+        server.stop()
+
+    def test_poller_delivers_streamed_homeworks(
+        self, practicum, recording_bot
+    ):
+        store = storage.MemoryStateStore()
+        poller = homework.Poller(
+            recording_bot, store, 'account', OB.Outbox(store),
+            homework.make_error_suppressor()
+        )
+        assert poller.iteration() == homework.RETRY_PERIOD
+        assert recording_bot.texts == [
+            homework.parse_status(homework_data)
+            for homework_data in HOMEWORKS
+        ]
+        assert store.get_checkpoint('account') == poller.timestamp
+        poller.iteration()
+        assert len(recording_bot.messages) == len(HOMEWORKS)
+
+    def test_poll_stage_lasts_until_body_is_parsed(self, practicum):
+        polls = metrics.STAGE_SECONDS.count('poll')
+        headers = homework.make_headers('token')
+        with homework.open_api_stream(0, headers) as stream:
+            assert metrics.STAGE_SECONDS.count('poll') == polls
+            assert list(stream) == HOMEWORKS
+        assert metrics.STAGE_SECONDS.count('poll') == polls + 1
+
+    def test_engine_uses_streaming_parser(
+        self, practicum, recording_bot, monkeypatch
+    ):
+        parsed = []
+        request_api_stream = homework.request_api_stream
+
+        def tracking_request_api_stream(timestamp, headers):
+            parsed.append(timestamp)
+            return request_api_stream(timestamp, headers)
+
+        monkeypatch.setattr(
+            homework, 'request_api_stream', tracking_request_api_stream
+        )
+        polling = engine.PollingEngine(
+            recording_bot, [engine.Account('token', 42)],
+            outbound=engine.delivery.DeliveryQueue(
+                recording_bot, chat_rate=1000
+            )
+        )
+        asyncio.run(polling.poll_all())
+        assert len(parsed) == 1
+        assert recording_bot.texts == [
+            homework.parse_status(homework_data)
+            for homework_data in HOMEWORKS
+        ]
@@ -0,0 +1,37 @@
+import lag
+
+
+class TestLagTracker:
+
+    def test_parse_date(self):
+        assert lag.parse_date('2021-04-11T10:31:09Z') == 1618137069
+        assert lag.parse_date('вчера') is None
+        assert lag.parse_date(None) is None
+
+    def test_percentiles_per_account_and_global(self):
+        tracker = lag.LagTracker(quantiles=(0.5, 0.9))
+        for seconds in range(1, 11):
+            tracker.record('fast', 0, seconds)
+        tracker.record('slow', 0, 1000)
+
+        assert tracker.percentiles('fast') == {0.5: 5, 0.9: 9}
+        assert tracker.percentiles('slow') == {0.5: 1000, 0.9: 1000}
+        assert tracker.percentiles() == {0.5: 6, 0.9: 10}
+        assert tracker.percentiles('unknown') == {0.5: None, 0.9: None}
+        assert tracker.samples()[('all', 0.9)] == 10
+        assert tracker.samples()[('slow', 0.5)] == 1000
+
+    def test_unknown_origin_is_ignored(self):
+        tracker = lag.LagTracker()
+        assert tracker.record('account', None) is None
+        assert tracker.percentiles() == dict.fromkeys(lag.QUANTILES)
+
+    def test_accounts_are_bounded(self):
+        tracker = lag.LagTracker(window=2, max_accounts=2)
+        for account in ('first', 'second', 'third'):
+            for seconds in (1, 2, 3):
+                tracker.record(account, 0, seconds)
+        assert tracker.percentiles('first')[0.5] is None
+        assert tracker.percentiles('third') == {
+            0.5: 2, 0.9: 3, 0.99: 3
+        }
@@ -0,0 +1,42 @@
+import json
+import logging
+
+import logging_setup
+
+
+class TestLoggingSetup:
+
+    def test_records_are_written_by_listener(self, tmp_path):
+        path = tmp_path / 'main.log'
+        root = logging.getLogger()
+        handlers = list(root.handlers)
+        level = root.level
+        listener = logging_setup.configure_logging(str(path), json_lines=True)
+        try:
+            logging.getLogger('homework').info(
+                'Опрос %s', 'аккаунта', extra={'account': 42}
+            )
+        finally:
+            listener.stop()
+            root.handlers = handlers
+            root.setLevel(level)
+
+        record = json.loads(path.read_text(encoding='utf-8'))
+        assert record['message'] == 'Опрос аккаунта'
+        assert record['level'] == 'INFO'
+        assert record['account'] == 42
+
+    def test_records_are_not_formatted_on_enqueue(self):
+        class Exploding:
+            def __str__(self):
+                raise AssertionError('Сообщение отформатировано при записи')
+
+        handler = logging_setup.LazyQueueHandler(
+            logging_setup.queue.Queue(1)
+        )
+        record = logging.LogRecord(
+            'homework', logging.DEBUG, '', 0, '%s', (Exploding(),), None
+        )
+        handler.emit(record)
+        handler.emit(record)
+        assert handler.queue.get_nowait() is record
@@ -0,0 +1,73 @@
+from urllib.request import urlopen
+
+import pytest
+
+import metrics
+
+
+class TestMetrics:
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram(
+            'stage_seconds', 'Этапы.', ('stage',), buckets=(0.1, 1)
+        )
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value, 'poll')
+
+        text = histogram.render()
+        assert 'stage_seconds_bucket{stage="poll",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{stage="poll",le="1"} 3' in text
+        assert 'stage_seconds_bucket{stage="poll",le="+Inf"} 4' in text
+        assert 'stage_seconds_sum{stage="poll"} 6.05' in text
+        assert 'stage_seconds_count{stage="poll"} 4' in text
+
+    def test_labels_are_checked_and_escaped(self):
+        counter = metrics.Counter('errors_total', 'Ошибки.', ('error',))
+        counter.inc('say "hi"')
+        assert 'errors_total{error="say \\"hi\\""} 1' in counter.render()
+        with pytest.raises(ValueError):
+            counter.inc()
+
+    def test_gauge_function(self):
+        gauge = metrics.Gauge('queue_depth', 'Очереди.', ('queue',))
+        depths = {('delivery',): 3}
+        gauge.set_function(lambda: depths)
+        assert 'queue_depth{queue="delivery"} 3' in gauge.render()
+        depths[('delivery',)] = 0
+        assert 'queue_depth{queue="delivery"} 0' in gauge.render()
+
+    def test_timed_counts_latency_and_errors(self):
+        calls = metrics.STAGE_SECONDS.count('test_stage')
+        errors = metrics.STAGE_ERRORS.value('test_stage', 'KeyError')
+
+        @metrics.timed('test_stage')
+        def failing(homework):
+            """Падает на отсутствующем ключе."""
+            return homework['status']
+
+        with pytest.raises(KeyError):
+            failing({})
+        assert failing({'status': 'approved'}) == 'approved'
+        assert failing.__doc__ == 'Падает на отсутствующем ключе.'
+        assert metrics.STAGE_SECONDS.count('test_stage') == calls + 2
+        assert metrics.STAGE_ERRORS.value(
+            'test_stage', 'KeyError'
+        ) == errors + 1
+
+    def test_serve(self):
+        registry = metrics.Registry()
+        registry.register(
+            metrics.Counter('polls_total', 'Опросы.')
+        ).inc(amount=5)
+        server = metrics.serve(0, registry=registry)
+        try:
+            port = server.server_address[1]
+            with urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+                body = response.read().decode('utf-8')
+                content_type = response.headers['Content-Type']
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert content_type.startswith('text/plain')
+        assert '# TYPE polls_total counter' in body
+        assert 'polls_total 5' in body
@@ -0,0 +1,89 @@
+import lag
+import outbox
+import simulation
+import storage
+
+
+class TestOutbox:
+    HOMEWORK = {'id': 7, 'status': 'approved', 'date_updated': 'date'}
+
+    def make_outbox(self, tmp_path, clock):
+        store = storage.SQLiteStateStore(str(tmp_path / 'state.db'))
+        return outbox.Outbox(
+            store, backoff_base=1, lease=30, clock=clock.time
+        )
+
+    def test_put_is_idempotent(self, tmp_path):
+        box = self.make_outbox(tmp_path, simulation.VirtualClock(1000))
+        key = outbox.outbox_key('account', self.HOMEWORK)
+        message = box.put('account', 42, 'text', key)
+        assert message.chat_id == '42'
+        assert box.put('account', 42, 'text', key) is None
+
+    def test_failed_message_is_retried_with_backoff(self, tmp_path):
+        clock = simulation.VirtualClock(1000)
+        box = self.make_outbox(tmp_path, clock)
+        sent = []
+
+        def send(chat_id, text):
+            sent.append(text)
+            return len(sent) > 2
+
+        message = box.put('account', 42, 'text')
+        assert not box.deliver(message, send)
+        assert box.claim_due() == []
+        clock.now += 1
+        assert box.deliver_due(send) == 0
+        clock.now += 1
+        assert box.deliver_due(send) == 0
+        clock.now += 2
+        assert box.deliver_due(send) == 1
+        clock.now += 1000
+        assert box.claim_due() == []
+        assert sent == ['text'] * 3
+
+    def test_unsent_message_survives_restart(self, tmp_path):
+        clock = simulation.VirtualClock(1000)
+        box = self.make_outbox(tmp_path, clock)
+        box.put('account', 42, 'text')
+        box.store.close()
+
+        box = self.make_outbox(tmp_path, clock)
+        assert box.claim_due() == []
+        clock.now += 30
+        assert [message.text for message in box.claim_due()] == ['text']
+
+    def test_delivery_records_lag_from_origin(self, tmp_path):
+        clock = simulation.VirtualClock(1000)
+        box = self.make_outbox(tmp_path, clock)
+        box.lags = lag.LagTracker()
+        attempts = []
+
+        def send(chat_id, text):
+            attempts.append(text)
+            return len(attempts) > 1
+
+        message = box.put('account', 42, 'text', origin=clock.now - 600)
+        box.deliver(message, send)
+        clock.now += 1
+        assert box.deliver_due(send) == 1
+        assert box.lags.percentiles('42')[0.5] == 601
+
+    def test_prune_keeps_recent_deliveries(self, tmp_path):
+        clock = simulation.VirtualClock(1000)
+        box = self.make_outbox(tmp_path, clock)
+        box.retention = 100
+        box.prune_interval = 50
+        box.deliver(box.put('account', 42, 'old', 'old'), lambda *args: True)
+
+        assert box.prune() == 0
+        clock.now += 60
+        box.deliver(box.put('account', 42, 'new', 'new'), lambda *args: True)
+        clock.now += 60
+        assert box.prune() == 1
+        assert box.put('account', 42, 'old', 'old') is not None
+        assert box.put('account', 42, 'new', 'new') is None
+        clock.now += 30
+        assert box.prune() == 0
+        clock.now += 50
+        assert box.prune() == 1
@@ -0,0 +1,61 @@
+import os
+import signal
+import tracemalloc
+
+import homework
+import profiling
+
+
+HOMEWORK = {'homework_name': 'hw.zip', 'status': 'approved'}
+
+
+class TestSignalProfiler:
+
+    def test_sigusr1_profiles_iterations(self, tmp_path):
+        profiler = profiling.SignalProfiler(str(tmp_path), iterations=2)
+        profiler.install()
+        try:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert profiler.profile is not None
+            for _ in range(2):
+                homework.parse_status(HOMEWORK)
+                profiler.tick()
+        finally:
+            profiler.uninstall()
+
+        assert profiler.profile is None
+        names = sorted(os.listdir(tmp_path))
+        assert [name.rsplit('.', 1)[1] for name in names] == ['prof', 'txt']
+        report = (tmp_path / names[1]).read_text(encoding='utf-8')
+        assert 'Итераций: 2' in report
+        assert 'homework.py' in report and 'parse_status' in report
+
+    def test_second_sigusr1_stops_session(self, tmp_path):
+        profiler = profiling.SignalProfiler(str(tmp_path), iterations=100)
+        profiler.install()
+        try:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            profiler.tick()
+            os.kill(os.getpid(), signal.SIGUSR1)
+        finally:
+            profiler.uninstall()
+        assert profiler.profile is None
+        assert len(os.listdir(tmp_path)) == 2
+
+    def test_sigusr2_dumps_memory_diff(self, tmp_path):
+        profiler = profiling.SignalProfiler(str(tmp_path))
+        profiler.install()
+        try:
+            os.kill(os.getpid(), signal.SIGUSR2)
+            assert tracemalloc.is_tracing()
+            assert os.listdir(tmp_path) == []
+            grown = [bytearray(1000) for _ in range(100)]
+            os.kill(os.getpid(), signal.SIGUSR2)
+        finally:
+            profiler.uninstall()
+            tracemalloc.stop()
+
+        [name] = os.listdir(tmp_path)
+        report = (tmp_path / name).read_text(encoding='utf-8')
+        assert 'test_profiling.py' in report
+        assert grown
@@ -0,0 +1,43 @@
+import ratelimit
+import simulation
+
+
+class TestTokenBucket:
+
+    def test_reserve_and_refill(self):
+        clock = simulation.VirtualClock(0)
+        bucket = ratelimit.TokenBucket(rate=2, capacity=2, clock=clock.time)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0.5
+        clock.now = 0.5
+        assert bucket.reserve() == 0
+
+    def test_wait_time_keeps_tokens(self):
+        clock = simulation.VirtualClock(0)
+        bucket = ratelimit.TokenBucket(rate=1, clock=clock.time)
+        assert bucket.wait_time() == 0
+        assert bucket.reserve() == 0
+        assert bucket.wait_time() == 1
+        clock.now = 1
+        assert bucket.wait_time() == 0
+        assert bucket.reserve() == 0
+
+    def test_pause(self):
+        clock = simulation.VirtualClock(0)
+        bucket = ratelimit.TokenBucket(rate=10, clock=clock.time)
+        bucket.pause(3)
+        assert bucket.reserve() == 3
+        clock.now = 3
+        assert bucket.reserve() == 0
+
+    def test_keyed_buckets_prune_idle(self):
+        clock = simulation.VirtualClock(0)
+        buckets = ratelimit.KeyedTokenBuckets(
+            rate=1, max_keys=2, clock=clock.time
+        )
+        buckets.get('a').reserve()
+        buckets.get('b').reserve()
+        clock.now = 10
+        buckets.get('c')
+        assert len(buckets) == 1
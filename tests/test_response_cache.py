@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+import fake_servers
+import homework
+import metrics
+import outbox as OB
+import response_cache
+import storage
+
+HOMEWORKS = [
+    {'id': number, 'status': 'approved', 'homework_name': f'дз {number}'}
+    for number in range(50)
+]
+
+
+def body(current_date, homeworks=HOMEWORKS):
+    return json.dumps(
+        {'homeworks': homeworks, 'current_date': current_date}
+    ).encode('utf-8')
+
+
+class TestBodyDigest:
+
+    def test_ignores_current_date(self):
+        first, first_date = response_cache.body_digest(body(100))
+        second, second_date = response_cache.body_digest(body(200))
+        assert first == second
+        assert (first_date, second_date) == (100, 200)
+
+    def test_detects_changes(self):
+        changed = [dict(HOMEWORKS[0], status='rejected')] + HOMEWORKS[1:]
+        assert (
+            response_cache.body_digest(body(100))[0]
+            != response_cache.body_digest(body(100, changed))[0]
+        )
+
+    def test_without_current_date(self):
+        digest, current_date = response_cache.body_digest(b'{"homeworks":[]}')
+        assert current_date is None
+        assert digest
+
+
+class TestResponseCache:
+
+    def decode_counter(self, data):
+        calls = []
+
+        def decode():
+            calls.append(data)
+            return json.loads(data)
+        return decode, calls
+
+    def test_skips_decoding_of_unchanged_body(self):
+        cache = response_cache.ResponseCache()
+        skipped = metrics.UNCHANGED_RESPONSES.value()
+        skipped_bytes = metrics.UNCHANGED_BYTES.value()
+        decode, calls = self.decode_counter(body(100))
+        first = cache.decode('token', body(100), decode)
+        decode, calls = self.decode_counter(body(200))
+        second = cache.decode('token', body(200), decode)
+        assert calls == []
+        assert second['current_date'] == 200
+        assert first['current_date'] == 100
+        assert second['homeworks'] is first['homeworks']
+        assert metrics.UNCHANGED_RESPONSES.value() == skipped + 1
+        assert metrics.UNCHANGED_BYTES.value() == (
+            skipped_bytes + len(body(200))
+        )
+
+    def test_accounts_are_separate(self):
+        cache = response_cache.ResponseCache()
+        cache.decode('first', body(100), self.decode_counter(body(100))[0])
+        decode, calls = self.decode_counter(body(100))
+        cache.decode('second', body(100), decode)
+        assert len(calls) == 1
+
+    def test_evicts_least_recent_account(self):
+        cache = response_cache.ResponseCache(maxsize=2)
+        for account in ('first', 'second', 'first', 'third'):
+            cache.decode(account, body(1), self.decode_counter(body(1))[0])
+        assert len(cache) == 2
+        decode, calls = self.decode_counter(body(1))
+        cache.decode('second', body(1), decode)
+        assert len(calls) == 1
+
+    def test_does_not_cache_invalid_response(self):
+        cache = response_cache.ResponseCache()
+        cache.decode('token', b'[]', self.decode_counter(b'[]')[0])
+        assert len(cache) == 0
+
+
+class TestUnchangedPoll:
+
+    @pytest.fixture
+    def practicum(self, monkeypatch):
+        server = fake_servers.FakePracticum(
+            homeworks=lambda token, from_date: HOMEWORKS, compress=True
+        ).start()
+        monkeypatch.setattr(homework, 'ENDPOINT', server.endpoint)
+        monkeypatch.setattr(homework, 'API_CLIENT', None)
+        monkeypatch.setattr(homework, 'API_SKIP_UNCHANGED', True)
+        monkeypatch.setattr(
+            homework, 'RESPONSE_CACHE', response_cache.ResponseCache()
+        )
+        homework.configure_api_client(dns_ttl=0, rate_limit=1000)
+        yield server
+        homework.API_CLIENT.close()
+        server.stop()
+
+    def test_requests_compressed_response(self, practicum):
+        wire = metrics.RESPONSE_WIRE_BYTES.value()
+        decoded = metrics.RESPONSE_BYTES.value()
+        homework.get_api_answer(0)
+        wire = metrics.RESPONSE_WIRE_BYTES.value() - wire
+        decoded = metrics.RESPONSE_BYTES.value() - decoded
+        assert 0 < wire < decoded
+
+    def test_poller_skips_validation_of_unchanged_response(
+        self, practicum, monkeypatch, recording_bot
+    ):
+        checked = []
+        check_response = homework.check_response
+
+        def mock_check_response(response):
+            checked.append(response)
+            return check_response(response)
+
+        monkeypatch.setattr(homework, 'check_response', mock_check_response)
+        store = storage.MemoryStateStore()
+        poller = homework.Poller(
+            recording_bot, store, 'account', OB.Outbox(store),
+            homework.make_error_suppressor()
+        )
+        for _ in range(3):
+            assert poller.iteration() == homework.RETRY_PERIOD
+        assert len(checked) == 1
+        assert len(recording_bot.messages) == len(HOMEWORKS)
+        assert poller.attempts == 0
@@ -0,0 +1,41 @@
+import exceptions as EX
+import retry_policy
+
+
+class TestRetryPolicy:
+
+    def test_every_exception_has_rule(self):
+        for name in dir(EX):
+            error_class = getattr(EX, name)
+            if isinstance(error_class, type) and name.startswith('Error'):
+                assert error_class in retry_policy.POLICIES, name
+
+    def test_transient_error_retried_within_seconds(self):
+        error = EX.ErrorRequestGetApi('timeout')
+        assert retry_policy.retry_delay(error, 1) <= 10
+        assert retry_policy.rule_for(error).notify
+
+    def test_subclass_inherits_rule(self):
+        class CustomError(EX.ErrorRequestGetApi):
+            pass
+
+        assert retry_policy.rule_for(CustomError()) is (
+            retry_policy.rule_for(EX.ErrorRequestGetApi())
+        )
+        assert retry_policy.rule_for(KeyError()) is retry_policy.DEFAULT
+
+    def test_fatal_error_is_not_retried(self):
+        error = EX.ErrorRequestGetApiUnauthorized('401')
+        rule = retry_policy.rule_for(error)
+        assert rule.exhausted(1)
+        assert retry_policy.retry_delay(error, 1) == rule.backoff_max
+
+    def test_schema_error_gives_up_after_max_attempts(self):
+        rule = retry_policy.rule_for(EX.ErrorResponseNotList())
+        delays = [rule.delay(attempts) for attempts in range(1, 8)]
+        assert delays == sorted(delays)
+        assert rule.exhausted(rule.max_attempts)
+
+    def test_retry_after_is_respected(self):
+        error = EX.ErrorRequestGetApiTooManyRequests('429', retry_after=900)
+        assert retry_policy.retry_delay(error, 1) == 900
@@ -0,0 +1,66 @@
+import random
+
+import scheduler
+
+
+class TestPollPolicy:
+
+    def make_policy(self, jitter=0):
+        return scheduler.PollPolicy(jitter=jitter, rng=random.Random(0))
+
+    def test_delay_depends_on_status(self):
+        policy = self.make_policy()
+        assert policy.next_delay('reviewing') < policy.next_delay('rejected')
+        assert policy.next_delay('rejected') < policy.next_delay('approved')
+
+    def test_periods_are_bounded_by_default_period(self):
+        assert max(scheduler.STATUS_PERIODS.values()) <= (
+            scheduler.DEFAULT_PERIOD
+        )
+
+    def test_account_status_prefers_fastest(self):
+        policy = self.make_policy()
+        homeworks = [{'status': 'approved'}, {'status': 'reviewing'}]
+        assert policy.account_status(homeworks) == 'reviewing'
+        assert policy.account_status([], 'approved') == 'approved'
+
+    def test_jitter(self):
+        policy = self.make_policy(jitter=0.1)
+        delays = {policy.next_delay('reviewing') for _ in range(100)}
+        assert len(delays) > 1
+        period = scheduler.STATUS_PERIODS['reviewing']
+        assert all(
+            period * 0.9 <= delay <= period * 1.1 for delay in delays
+        )
+
+
+class TestPollScheduler:
+
+    def test_pop_due_in_deadline_order(self):
+        poll_scheduler = scheduler.PollScheduler()
+        poll_scheduler.schedule('b', 20)
+        poll_scheduler.schedule('a', 10)
+        poll_scheduler.schedule('c', 30)
+        assert poll_scheduler.next_deadline() == 10
+        assert poll_scheduler.pop_due(25) == ['a', 'b']
+        assert len(poll_scheduler) == 1
+        assert poll_scheduler.next_deadline() == 30
+
+    def test_reschedule_replaces_deadline(self):
+        poll_scheduler = scheduler.PollScheduler()
+        poll_scheduler.schedule('a', 10)
+        poll_scheduler.schedule('b', 15)
+        poll_scheduler.schedule('a', 50)
+        assert poll_scheduler.pop_due(20) == ['b']
+        assert poll_scheduler.next_deadline() == 50
+        poll_scheduler.remove('a')
+        assert poll_scheduler.next_deadline() is None
+        assert poll_scheduler.pop_due(100) == []
+
+    def test_heap_is_compacted(self):
+        poll_scheduler = scheduler.PollScheduler()
+        for due in range(1000):
+            poll_scheduler.schedule('a', due)
+        assert len(poll_scheduler) == 1
+        assert len(poll_scheduler._heap) < 100
+        assert poll_scheduler.pop_due(1000) == ['a']
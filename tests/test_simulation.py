@@ -0,0 +1,208 @@
+import breaker
+import exceptions as EX
+import homework
+import metrics
+import outbox as OB
+import retry_policy
+import scheduler
+import simulation
+import storage
+
+
+class FailingAPI:
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def fetch(self, timestamp):
+        if self.failures:
+            self.failures -= 1
+            raise EX.ErrorRequestGetApiServer('Ошибка статуса 500')
+        return {'homeworks': [], 'current_date': timestamp}
+
+
+class MixedAPI:
+
+    def __init__(self):
+        self.homeworks = [
+            {'id': 1, 'status': 'approved', 'homework_name': 'first'},
+            {'id': 2, 'status': 'new_status', 'homework_name': 'broken'},
+            {'id': 3, 'status': 'rejected', 'homework_name': 'third'},
+        ]
+
+    def fetch(self, timestamp):
+        return {'homeworks': self.homeworks, 'current_date': timestamp + 1}
+
+
+class TestVirtualClock:
+
+    def test_sleep_and_advance(self):
+        clock = simulation.VirtualClock(100)
+        clock.sleep(50)
+        assert clock.time() == clock.monotonic() == 150
+        clock.advance_to(120)
+        assert clock.time() == 150
+        clock.advance_to(200)
+        assert clock.time() == 200
+
+
+class TestPoller:
+
+    def make_poller(self, api, clock, policy=None):
+        store = storage.MemoryStateStore()
+        return homework.Poller(
+            simulation.SimulatedBot('account', clock, []),
+            store,
+            'account',
+            OB.Outbox(store, clock=clock.time),
+            homework.make_error_suppressor(clock.monotonic),
+            fetch=api.fetch,
+            clock=clock.time,
+            policy=policy
+        )
+
+    def test_starts_from_clock(self):
+        clock = simulation.VirtualClock(1000)
+        poller = self.make_poller(FailingAPI(0), clock)
+        assert poller.timestamp == 1000
+        assert poller.iteration() == homework.RETRY_PERIOD
+
+    def test_saves_start_checkpoint(self):
+        clock = simulation.VirtualClock(1000)
+        poller = self.make_poller(FailingAPI(0), clock)
+        clock.sleep(poller.iteration())
+        clock.sleep(poller.iteration())
+        assert poller.store.get_checkpoint('account') == 1000
+        restarted = homework.Poller(
+            poller.bot, poller.store, 'account', poller.outbox,
+            poller.suppressor, fetch=FailingAPI(0).fetch, clock=clock.time
+        )
+        assert restarted.timestamp == 1000
+
+    def test_backoff_after_errors_and_reset(self):
+        clock = simulation.VirtualClock()
+        poller = self.make_poller(FailingAPI(3), clock)
+        delays = [poller.iteration() for _ in range(4)]
+        assert delays[:3] == [15, 30, 60]
+        assert delays[3] == homework.RETRY_PERIOD
+        assert poller.attempts == 0
+        assert len(poller.bot.messages) == 1
+
+    def test_skips_homework_with_unknown_status(self):
+        clock = simulation.VirtualClock(1000)
+        poller = self.make_poller(MixedAPI(), clock)
+        skipped = metrics.SKIPPED_HOMEWORKS.value(
+            'ErrorDictKeyStatusInParseStatus'
+        )
+        poller.iteration()
+        assert [
+            text for _, text, _ in poller.bot.messages
+            if text.startswith('Изменился')
+        ] == [
+            homework.parse_status(item)
+            for item in MixedAPI().homeworks[::2]
+        ]
+        assert poller.store.get_checkpoint('account') == 1001
+        assert metrics.SKIPPED_HOMEWORKS.value(
+            'ErrorDictKeyStatusInParseStatus'
+        ) == skipped + 1
+
+    def test_repeated_parse_error_backs_off(self):
+        clock = simulation.VirtualClock(1000)
+        api = MixedAPI()
+        api.homeworks = api.homeworks[1:2]
+        poller = self.make_poller(api, clock)
+        delays = [poller.iteration() for _ in range(7)]
+        assert poller.attempts == 7
+        assert delays == [
+            retry_policy.SCHEMA.delay(attempts) for attempts in range(1, 8)
+        ]
+        assert delays[1] > delays[0]
+        api.homeworks = MixedAPI().homeworks[:1]
+        assert poller.iteration() == homework.RETRY_PERIOD
+        assert poller.attempts == 0
+
+    def test_fatal_error_stops_polling(self):
+        clock = simulation.VirtualClock(1000)
+
+        def fetch(timestamp):
+            raise EX.ErrorRequestGetApiUnauthorized('Ошибка статуса 401')
+
+        poller = self.make_poller(FailingAPI(0), clock)
+        poller.fetch = fetch
+        poller.iteration()
+        assert poller.stopped
+        assert len(poller.bot.messages) == 1
+
+    def test_policy_delays(self):
+        clock = simulation.VirtualClock(1000)
+        api = MixedAPI()
+        api.homeworks = [dict(api.homeworks[0], status='reviewing')]
+        poller = self.make_poller(
+            api, clock, scheduler.PollPolicy(jitter=0)
+        )
+        assert poller.iteration() == scheduler.STATUS_PERIODS['reviewing']
+        api.homeworks = [dict(api.homeworks[0], status='approved')]
+        assert poller.iteration() == scheduler.STATUS_PERIODS['approved']
+        api.homeworks = []
+        assert poller.iteration() == scheduler.STATUS_PERIODS['approved']
+
+    def test_policy_defers_while_circuit_is_open(self):
+        clock = simulation.VirtualClock(1000)
+
+        def fetch(timestamp):
+            raise EX.ErrorCircuitOpen('цепь разомкнута', 42)
+
+        poller = self.make_poller(
+            FailingAPI(0), clock, scheduler.PollPolicy(jitter=0)
+        )
+        poller.fetch = fetch
+        assert poller.iteration() == 42
+        assert poller.attempts == 0
+        assert poller.bot.messages == []
+
+
+class TestSimulation:
+
+    def test_polls_every_retry_period(self):
+        sim = simulation.Simulation(10, fixed_period=True)
+        assert sim.run(simulation.DAY) == 10 * simulation.DAY // 600
+        assert sim.clock.time() == simulation.START + simulation.DAY
+
+    def test_polls_by_account_status(self):
+        # Статус не меняется, и аккаунты остаются на ревью.
+        sim = simulation.Simulation(10, change_interval=10 * simulation.DAY)
+        polls = sim.run(simulation.DAY)
+        period = scheduler.STATUS_PERIODS['reviewing']
+        assert polls > 10 * simulation.DAY / (period * 1.2)
+
+    def test_circuit_breaker_defers_polls_during_outage(self):
+        start = simulation.START + 3600
+        sim = simulation.Simulation(20, outages=[(start, start + 3600)])
+        sim.run(simulation.DAY)
+        requests = sum(api.requests for api in sim.apis)
+        assert sim.skipped > 0
+        assert requests + sim.skipped == sim.polls
+        assert sim.breaker.state == breaker.CLOSED
+        assert sim.messages[-1][2] > start + 3600
+
+    def test_is_deterministic(self):
+        first = simulation.Simulation(20, error_rate=0.1, seed=1)
+        second = simulation.Simulation(20, error_rate=0.1, seed=1)
+        first.run(simulation.DAY)
+        second.run(simulation.DAY)
+        assert first.messages == second.messages
+        assert first.polls == second.polls
+
+    def test_statuses_are_delivered_within_period(self):
+        sim = simulation.Simulation(
+            20, change_interval=3600, fixed_period=True
+        )
+        sim.run(simulation.DAY)
+        changes = sum(api.changes for api in sim.apis)
+        # Первый опрос каждого аккаунта сообщает и начальный статус.
+        assert 0 < len(sim.messages) <= changes + 20
+        assert all(
+            value <= homework.RETRY_PERIOD
+            for value in sim.lags.percentiles().values()
+        )
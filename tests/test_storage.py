@@ -0,0 +1,130 @@
+import sqlite3
+
+import pytest
+
+import storage
+
+
+class TestSQLiteStateStore:
+
+    def test_checkpoint_survives_reopen(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = storage.open_state_store(f'sqlite:///{path}')
+        store.set_checkpoint('account', 1000)
+        store.set_status('account', 42, 'approved', '2021-04-11T10:31:09Z')
+        store.close()
+
+        store = storage.SQLiteStateStore(str(path))
+        assert store.get_checkpoint('account') == 1000
+        assert store.get_checkpoint('other') is None
+        assert store.get_status('account', 42) == (
+            'approved', '2021-04-11T10:31:09Z'
+        )
+        store.close()
+
+    def test_writes_are_batched(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = storage.SQLiteStateStore(
+            path, batch_size=3, flush_interval=3600
+        )
+        reader = sqlite3.connect(path)
+        count_query = 'SELECT COUNT(*) FROM checkpoints'
+
+        store.set_checkpoint('a', 1)
+        store.set_checkpoint('b', 2)
+        assert reader.execute(count_query).fetchone()[0] == 0
+        store.set_checkpoint('c', 3)
+        assert reader.execute(count_query).fetchone()[0] == 3
+        assert reader.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        reader.close()
+        store.close()
+
+    def test_outbox_writes_are_batched(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = storage.SQLiteStateStore(
+            path, batch_size=1000, flush_interval=3600
+        )
+        reader = sqlite3.connect(path)
+        count_query = 'SELECT COUNT(*) FROM outbox'
+
+        message_id = store.add_outbox('account', 42, 'text', 'key', 0)
+        store.mark_outbox_delivered(message_id, 10)
+        assert reader.execute(count_query).fetchone()[0] == 0
+        store.flush()
+        assert reader.execute(count_query).fetchone()[0] == 1
+        reader.close()
+        store.close()
+
+    @pytest.mark.parametrize('backend', ['sqlite', 'memory'])
+    def test_delivered_outbox_is_pruned(self, tmp_path, backend):
+        if backend == 'sqlite':
+            store = storage.SQLiteStateStore(str(tmp_path / 'state.db'))
+        else:
+            store = storage.MemoryStateStore()
+        old = store.add_outbox('account', 42, 'old', 'old', 0)
+        new = store.add_outbox('account', 42, 'new', 'new', 0)
+        store.add_outbox('account', 42, 'pending', 'pending', 0)
+        store.mark_outbox_delivered(old, 10)
+        store.mark_outbox_delivered(new, 100)
+
+        assert store.prune_outbox(50) == 1
+        assert store.add_outbox('account', 42, 'old', 'old', 0) is not None
+        assert store.add_outbox('account', 42, 'new', 'new', 0) is None
+        assert [row[2] for row in store.due_outbox(1, 10)] == [
+            'pending', 'old'
+        ]
+        store.close()
+
+    def test_backfill_windows_survive_reopen(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = storage.SQLiteStateStore(path)
+        store.mark_backfilled('account', 0, 10)
+        store.mark_backfilled('account', 0, 10)
+        store.close()
+
+        store = storage.SQLiteStateStore(path)
+        assert store.is_backfilled('account', 0, 10)
+        assert not store.is_backfilled('account', 10, 20)
+        assert store.get_checkpoint('account') is None
+        store.close()
+
+    def test_unknown_backend(self):
+        with pytest.raises(storage.EX.ErrorStateStore):
+            storage.open_state_store('redis://localhost')
+
+    def test_incomplete_store_cannot_be_created(self):
+        class CheckpointStore(storage.StateStore):
+            def get_checkpoint(self, account):
+                return None
+
+        with pytest.raises(TypeError):
+            CheckpointStore()
+
+    def test_memory_backend(self):
+        store = storage.open_state_store('memory://')
+        store.set_checkpoint('account', 5)
+        assert store.get_checkpoint('account') == 5
+
+    def test_outbox_without_origin_is_migrated(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE outbox ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, account TEXT NOT NULL, '
+            'chat_id TEXT NOT NULL, text TEXT NOT NULL, key TEXT UNIQUE, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'next_attempt_at REAL NOT NULL, delivered_at REAL)'
+        )
+        connection.execute(
+            "INSERT INTO outbox (account, chat_id, text, next_attempt_at) "
+            "VALUES ('account', '42', 'text', 0)"
+        )
+        connection.commit()
+        connection.close()
+
+        store = storage.SQLiteStateStore(path)
+        store.add_outbox('account', 42, 'new', None, 0, 1000.0)
+        assert store.due_outbox(1, 10) == [
+            (1, '42', 'text', 0, None), (2, '42', 'new', 0, 1000.0)
+        ]
+        store.close()
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+import delivery
+import tracing
+from tests.fakes import RecordingBot
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def close(self):
+        pass
+
+
+class TestTracing:
+
+    def test_unsampled_trace_is_noop(self):
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter, sample_rate=0.5, rng=lambda: 0.9)
+
+        @tracing.traced('stage')
+        def stage():
+            return tracing.current_span()
+
+        with tracer.trace('root') as root:
+            assert root is tracing.NOOP_SPAN
+            assert stage() is None
+        assert exporter.spans == []
+
+    def test_spans_share_trace_and_record_errors(self):
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter, sample_rate=1)
+
+        @tracing.traced('parse_status')
+        def parse_status():
+            raise KeyError('status')
+
+        with pytest.raises(KeyError):
+            with tracer.trace('poll_iteration', account='account') as root:
+                with tracing.span('poll'):
+                    pass
+                parse_status()
+
+        poll, parse, iteration = exporter.spans
+        assert {span.trace_id for span in exporter.spans} == {root.trace_id}
+        assert poll.parent_id == parse.parent_id == root.span_id
+        assert parse.status == tracing.STATUS_ERROR
+        assert parse.attributes['exception.type'] == 'KeyError'
+        assert iteration.attributes['account'] == 'account'
+        assert tracing.current_span() is None
+
+    def test_file_exporter_writes_otlp_json(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracer = tracing.Tracer(tracing.FileExporter(path), sample_rate=1)
+        with tracer.trace('poll_iteration', attempts=2):
+            with tracing.span('json_decode'):
+                pass
+        tracer.close()
+
+        lines = path.read_text(encoding='utf-8').splitlines()
+        spans = [
+            json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans'][0]
+            for line in lines
+        ]
+        assert [span['name'] for span in spans] == [
+            'json_decode', 'poll_iteration'
+        ]
+        assert spans[0]['parentSpanId'] == spans[1]['spanId']
+        assert spans[1]['attributes'] == [
+            {'key': 'attempts', 'value': {'intValue': '2'}}
+        ]
+        assert int(spans[1]['endTimeUnixNano']) >= int(
+            spans[1]['startTimeUnixNano']
+        )
+
+    def test_trace_is_carried_to_delivery_queue(self):
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter, sample_rate=1)
+        queue = delivery.DeliveryQueue(RecordingBot(), workers=1)
+
+        async def run():
+            queue.start()
+            try:
+                with tracer.trace('poll_account') as root:
+                    future = await queue.submit(42, 'text')
+                await future
+            finally:
+                await queue.stop()
+            return root
+
+        root = asyncio.run(run())
+        send = [span for span in exporter.spans if span.name != root.name]
+        assert [span.name for span in send] == ['send_message']
+        assert send[0].trace_id == root.trace_id
+        assert send[0].parent_id == root.span_id
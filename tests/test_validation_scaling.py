@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+import dedup
+import homework
+import lag
+import outbox as OB
+import storage
+from tests.fakes import RecordingBot
+from tests.payloads import make_homeworks
+
+SMALL = 500
+LARGE = 5000
+# Линейный рост даёт отношение около LARGE / SMALL = 10,
+# квадратичный - около 100.
+MAX_RATIO = 30
+
+
+def deliver(homeworks, bot=None):
+    store = storage.MemoryStateStore()
+    return homework.deliver_homeworks(
+        RecordingBot() if bot is None else bot,
+        homework.check_response({'homeworks': homeworks, 'current_date': 0}),
+        dedup.DeliveryIndex(store, homework.DEDUP_INDEX_SIZE),
+        'account',
+        OB.Outbox(store, lags=lag.LagTracker())
+    )
+
+
+def best_time(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class TestLargePayloads:
+
+    def test_all_homeworks_are_delivered(self):
+        bot = RecordingBot()
+        assert deliver(make_homeworks(LARGE), bot) == []
+        assert len(bot.messages) == LARGE
+
+    def test_malformed_homeworks_are_skipped(self):
+        bot = RecordingBot()
+        errors = deliver(
+            make_homeworks(LARGE, malformed_every=10), bot
+        )
+        assert len(errors) == LARGE // 10
+        assert len(bot.messages) == LARGE - LARGE // 10
+
+    def test_check_response_returns_same_list(self):
+        homeworks = make_homeworks(LARGE)
+        assert homework.check_response({'homeworks': homeworks}) is homeworks
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize('malformed_every', [0, 2])
+    def test_delivery_scales_linearly(self, malformed_every):
+        small = make_homeworks(SMALL, malformed_every)
+        large = make_homeworks(LARGE, malformed_every)
+        ratio = best_time(deliver, large) / best_time(deliver, small)
+        assert ratio < MAX_RATIO, (
+            f'Рассылка {LARGE} домашек в {ratio:.0f} раз дольше, '
+            f'чем {SMALL}: рост быстрее линейного'
+        )
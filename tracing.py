@@ -0,0 +1,251 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'homework_bot'
+STATUS_OK = 1
+STATUS_ERROR = 2
+SPAN_KIND_INTERNAL = 1
+
+CURRENT_SPAN = contextvars.ContextVar('current_span', default=None)
+
+
+def new_id(bits):
+    """Возвращает случайный идентификатор в hex длиной bits бит."""
+    return '{:0{}x}'.format(random.getrandbits(bits), bits // 4)
+
+
+def attribute_value(value):
+    """Переводит значение атрибута в формат OTLP/JSON."""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+    """Отрезок трассы: этап обработки с временем начала и конца.
+
+    Все спаны одной итерации опроса имеют общий trace_id. Спан
+    становится текущим внутри блока with, поэтому вложенные этапы
+    получают его как родителя.
+    """
+
+    def __init__(self, tracer, name, trace_id, parent_id=None,
+                 attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_id(64)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_OK
+        self.start_ns = None
+        self.end_ns = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        """Добавляет атрибут спана."""
+        self.attributes[key] = value
+
+    def child(self, name, **attributes):
+        """Создаёт дочерний спан."""
+        return Span(
+            self.tracer, name, self.trace_id, self.span_id, attributes
+        )
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = CURRENT_SPAN.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end_ns = time.time_ns()
+        CURRENT_SPAN.reset(self._token)
+        if exc_type is not None:
+            self.status = STATUS_ERROR
+            self.attributes['exception.type'] = exc_type.__name__
+            self.attributes['exception.message'] = str(exc_value)
+        self.tracer.export(self)
+
+    def to_otlp(self):
+        """Возвращает спан в формате OTLP/JSON."""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [
+                {'key': key, 'value': attribute_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            'status': {'code': self.status},
+        }
+        if self.parent_id is not None:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class NoopSpan:
+    """Спан невыбранной трассы: ничего не замеряет и не записывает."""
+
+    trace_id = None
+
+    def set_attribute(self, key, value):
+        """Игнорирует атрибут."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class FileExporter:
+    """Пишет спаны в файл по строке OTLP/JSON на каждый спан.
+
+    Формат строки совпадает с ExportTraceServiceRequest, поэтому файл
+    читает file receiver OpenTelemetry Collector.
+    """
+
+    def __init__(self, path, service_name=SERVICE_NAME):
+        self.path = path
+        self.resource = {
+            'attributes': [{
+                'key': 'service.name',
+                'value': attribute_value(service_name),
+            }]
+        }
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        """Записывает завершённый спан."""
+        line = json.dumps({
+            'resourceSpans': [{
+                'resource': self.resource,
+                'scopeSpans': [{
+                    'scope': {'name': SERVICE_NAME},
+                    'spans': [span.to_otlp()],
+                }],
+            }]
+        }, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        """Сбрасывает буфер и закрывает файл."""
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Создаёт трассы с вероятностью sample_rate.
+
+    Решение о записи принимается один раз для корневого спана, и все
+    этапы невыбранной трассы обходятся без создания спанов. При
+    sample_rate=0 трассировка выключена.
+    """
+
+    def __init__(self, exporter=None, sample_rate=0.0, rng=random.random):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.rng = rng
+
+    def trace(self, name, **attributes):
+        """Возвращает корневой спан новой трассы или NOOP_SPAN."""
+        if (
+            self.exporter is None
+            or not self.sample_rate
+            or self.rng() >= self.sample_rate
+        ):
+            return NOOP_SPAN
+        return Span(self, name, new_id(128), attributes=attributes)
+
+    def export(self, span):
+        """Передаёт завершённый спан экспортёру."""
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(span)
+        except (OSError, ValueError) as error:
+            logger.warning('Не удалось записать спан: %s', error)
+
+    def close(self):
+        """Закрывает экспортёр."""
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+
+
+TRACER = Tracer()
+
+
+def configure(sample_rate, path):
+    """Включает трассировку с записью в файл path.
+
+    При sample_rate=0 файл не открывается.
+    """
+    global TRACER
+    TRACER.close()
+    exporter = None
+    if sample_rate:
+        exporter = FileExporter(os.fspath(path))
+    TRACER = Tracer(exporter, sample_rate)
+    return TRACER
+
+
+def close():
+    """Закрывает экспортёр глобального трассировщика."""
+    TRACER.close()
+
+
+def trace(name, **attributes):
+    """Начинает новую трассу в глобальном трассировщике."""
+    return TRACER.trace(name, **attributes)
+
+
+def current_span():
+    """Возвращает текущий спан или None вне выбранной трассы."""
+    return CURRENT_SPAN.get()
+
+
+def span(name, parent=None, **attributes):
+    """Возвращает дочерний спан текущего или parent.
+
+    Вне выбранной трассы возвращает NOOP_SPAN.
+    """
+    parent = parent if parent is not None else CURRENT_SPAN.get()
+    if parent is None:
+        return NOOP_SPAN
+    return parent.child(name, **attributes)
+
+
+def traced(name):
+    """Декоратор: выполняет функцию в спане name текущей трассы."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = CURRENT_SPAN.get()
+            if parent is None:
+                return func(*args, **kwargs)
+            with parent.child(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator